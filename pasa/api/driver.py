@@ -2,9 +2,14 @@ from ..experimenter.experimenter import *
 from ..experimenter.epoch_manager import *
 from ..preprocessor.preprocessor import *
 from ..model.model_api import *
+from ..server.server import Server
 
 from ..utils.io_utils import load_data
 
+# options of the architecture of the trained model, which the saved config supplies;
+# the others are of how to run and taken from the command line
+MODEL_OPTIONS = ['model', 'unit', 'fix', 'layers', 'window', 'dim_emb', 'dim_posit', 'dim_hidden', 'mark_phi', 'res']
+
 
 class Driver(object):
 
@@ -33,14 +38,31 @@ class Driver(object):
                       model_api=model_api(config),
                       config=config)
 
+    def build_server(self):
+        argv = self.argv
+        server = self._select_server(argv)
+        preprocessor = self._select_preprocessor(argv)
+        model_api = self._select_model_api(argv)
+        config = self._load_config(argv)
+        return server(argv=argv,
+                      preprocessor=preprocessor(argv, config),
+                      model_api=model_api(config),
+                      config=config)
+
     @staticmethod
     def _select_trainer(argv):
         return Trainer
 
     @staticmethod
     def _select_tester(argv):
+        if argv.mode == 'soft_label':
+            return Teacher
         return Tester
 
+    @staticmethod
+    def _select_server(argv):
+        return Server
+
     @staticmethod
     def _select_preprocessor(argv):
         return BasePreprocessor
@@ -58,4 +80,7 @@ class Driver(object):
     @staticmethod
     def _load_config(argv):
         config = load_data(argv.load_config)
+        for key, value in vars(argv).items():
+            if key not in MODEL_OPTIONS or not hasattr(config, key):
+                setattr(config, key, value)
         return config
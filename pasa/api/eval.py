@@ -1,19 +1,48 @@
-from ..utils.io_utils import say, CONLLLoader
+import multiprocessing
+
+from ..utils.io_utils import say, CONLLLoader, get_shard_offsets, iter_lines
 from ..experimenter.evaluator import ResultEval
 
 
 def main(argv):
     say('\n\nEVALUATING RESULTS\n')
-    corpus_loader = CONLLLoader(min_unit='word', data_size=argv.data_size)
-    evaluator = ResultEval()
+    n_workers = argv.eval_workers
+    offsets = get_shard_offsets(argv.data, n_workers)
+    shards = [(argv.data, offsets[i], offsets[i + 1], argv.eval_interval) for i in xrange(n_workers)]
 
-    corpus = corpus_loader.load_corpus(argv.data)
-    n_sents = len(corpus)
+    if n_workers > 1:
+        pool = multiprocessing.Pool(n_workers)
+        results = pool.map(_eval_shard, shards)
+        pool.close()
+        pool.join()
+    else:
+        results = [_eval_shard(shards[0])]
+
+    evaluator = ResultEval()
+    n_sents = 0
     n_prds = 0.
-    for sent in corpus:
-        n_prds += sent.size_prds()
-    say('\tSent: %d\tPrds: %d\tPrds/Sent: %f\n' % (n_sents, n_prds, n_prds/n_sents))
+    for data, shard_n_sents, shard_n_prds in results:
+        evaluator.merge(ResultEval.deserialize(data))
+        n_sents += shard_n_sents
+        n_prds += shard_n_prds
+    say('\n\tSent: %d\tPrds: %d\tPrds/Sent: %f\n' % (n_sents, n_prds, n_prds / max(n_sents, 1)))
 
-    evaluator.calc_results(corpus)
+    evaluator.show_results()
 
 
+def _eval_shard(args):
+    """
+    Score the sentences in one byte range of the results, one sentence at a time.
+    :return: (serialized ResultEval, n_sents, n_prds)
+    """
+    path, start, end, interval = args
+    evaluator = ResultEval()
+    n_sents = 0
+    n_prds = 0
+    for sent in CONLLLoader.iter_sents(iter_lines(path, start, end)):
+        evaluator.update_sent(sent)
+        n_sents += 1
+        n_prds += sent.size_prds()
+        if interval > 0 and n_sents % interval == 0:
+            evaluator.show_partial_results('Bytes %d-%d: %d sents' % (start, end, n_sents))
+    return evaluator.serialize(), n_sents, n_prds
@@ -0,0 +1,10 @@
+from driver import Driver
+from ..utils.io_utils import say
+
+
+def main(argv):
+    driver = Driver(argv)
+    tester = driver.build_tester()
+    tester.setup_experiment()
+    say('\n\nEXPORTING THE MODEL\n')
+    tester.model_api.export_numpy_model(argv.quantize)
@@ -13,7 +13,7 @@ if __name__ == '__main__':
     ########
     # Mode #
     ########
-    parser.add_argument('-mode', default='train', help='train/test/eval')
+    parser.add_argument('-mode', default='train', help='train/test/eval/sweep/serve/export/quant_eval/soft_label/significance')
 
     ##########
     # Inputs #
@@ -24,8 +24,13 @@ if __name__ == '__main__':
     parser.add_argument('--test_data', default=None, help='path to test data')
     parser.add_argument('--load_word', type=str, default=None, help='word')
     parser.add_argument('--load_label', type=str, default=None, help='label')
-    parser.add_argument('--load_param', type=str, default=None, help='load trained parameters')
+    parser.add_argument('--load_param', type=str, default=None, help='load trained parameters; comma-separated files for an ensemble')
     parser.add_argument('--load_config', type=str, default=None, help='load configuration')
+    parser.add_argument('--load_soft', type=str, default=None, help='load label distributions of a teacher model for the training data')
+    parser.add_argument('--cache_mb', type=int, default=0, help='memory for the cache of the samples and the predictions (MB); 0: no cache')
+    parser.add_argument('--cache_file', type=str, default=None, help='file to load the cache from and save it to')
+    parser.add_argument('--load_engine', type=str, default=None, help='load an exported model for the NumPy engine')
+    parser.add_argument('--quantize', type=int, default=0, help='export the weight matrices as int8')
 
     ###########
     # Outputs #
@@ -40,11 +45,17 @@ if __name__ == '__main__':
     parser.add_argument('--model', type=str, default='base', help='base/grid')
     parser.add_argument('--save', type=int, default=0, help='save model')
     parser.add_argument('--result', type=bool, default=False, help='output results')
+    parser.add_argument('--gzip_pas', type=int, default=0, help='gzip the pas.*.txt result files')
+    parser.add_argument('--save_probs', type=int, default=0, help='add the label probabilities to the saved result columns')
 
     ###############
     # Data Option #
     ###############
     parser.add_argument('--data_size', type=int, default=100000)
+    parser.add_argument('--eval_workers', type=int, default=1, help='number of processes to evaluate the shards of the results with')
+    parser.add_argument('--load_counts', type=str, default=None, help='comma-separated per-sentence counts of the systems to compare')
+    parser.add_argument('--n_resamples', type=int, default=10000, help='number of resamples of the significance tests')
+    parser.add_argument('--eval_interval', type=int, default=0, help='show the results so far every this number of sentences')
     parser.add_argument('--vocab_cut_off', type=int, default=0)
 
     ########################
@@ -57,6 +68,9 @@ if __name__ == '__main__':
     parser.add_argument('--dim_emb',    type=int, default=32, help='dimension of word embeddings')
     parser.add_argument('--dim_posit',  type=int, default=32, help='dimension of position embeddings')
     parser.add_argument('--dim_hidden', type=int, default=32, help='dimension of hidden layer')
+    parser.add_argument('--max_prds', type=int, default=0, help='grid: split the sentences of more predicates into chunks of max_prds predicates')
+    parser.add_argument('--prd_overlap', type=int, default=2, help='grid: number of predicates shared by the consecutive chunks')
+    parser.add_argument('--ckpt_every', type=int, default=0, help='recompute the rnn layers in the backward pass in blocks of this number of layers')
 
     #######################
     # Training Parameters #
@@ -68,13 +82,49 @@ if __name__ == '__main__':
     parser.add_argument('--lr', type=float, default=0.0075, help='learning rate')
     parser.add_argument('--reg', type=float, default=0.0001, help='learning rate')
     parser.add_argument('--init_emb', default=None, help='Initial embedding to be loaded')
+    parser.add_argument('--sparse_emb', type=int, default=0, help='update only the embeddings looked up in a batch')
     parser.add_argument('--res', type=int, default=1, help='residual connections')
+    parser.add_argument('--soft_weight', type=float, default=0.5, help='weight of the loss against the teacher distributions')
+    parser.add_argument('--parallel', type=str, default=None, help='sync: data-parallel training, hogwild: asynchronous training')
+    parser.add_argument('--n_workers', type=int, default=1, help='number of training processes')
+    parser.add_argument('--sampler', type=str, default='uniform', help='uniform/curriculum/loss: mini-batches of each epoch')
+    parser.add_argument('--curriculum_epochs', type=int, default=5, help='epochs until the curriculum uses all the mini-batches')
+    parser.add_argument('--curriculum_start', type=float, default=0.2, help='fraction of the shortest mini-batches in the first epoch')
+    parser.add_argument('--loss_alpha', type=float, default=1., help='sample the mini-batches in proportion to nll ** loss_alpha')
+    parser.add_argument('--loss_mix', type=float, default=0.3, help='weight of the uniform distribution mixed into the loss sampler')
+
+    ###########
+    # Serving #
+    ###########
+    parser.add_argument('--port', type=int, default=0, help='serve on localhost:port; stdin/stdout if 0')
+    parser.add_argument('--serve_batch_size', type=int, default=32, help='max number of sentences per predict call')
+    parser.add_argument('--serve_wait', type=float, default=5., help='max msec a sentence waits for its batch to fill')
+    parser.add_argument('--raw', type=int, default=0, help='the input has no annotated arguments')
+    parser.add_argument('--prd_pos', type=int, default=0, help='regard the verbs/adjectives/copulas as predicates')
+    parser.add_argument('--stats_interval', type=int, default=0, help='report the serving stats every n sec to stderr')
+
+    #############
+    # Profiling #
+    #############
+    parser.add_argument('--profile', type=int, default=0, help='time the phases of the run and show the summary at the end')
+    parser.add_argument('--profile_trace', type=str, default=None, help='write the time of each timed call as JSON lines')
+    parser.add_argument('--profile_theano', type=int, default=0, help='compile the theano functions with profile=True')
+
+    #########
+    # Sweep #
+    #########
+    parser.add_argument('--sweep', type=str, default=None, help='e.g. "layers=1,2 dim_hidden=32,64 reg=0.0001"')
+    parser.add_argument('--sweep_workers', type=int, default=1, help='number of processes for sweeping')
 
     argv = parser.parse_args()
     print
     print argv
     print
 
+    from ..utils.profiler import PROFILER
+    if argv.profile or argv.profile_trace or argv.profile_theano:
+        PROFILER.enable(trace_fn=argv.profile_trace, theano_profile=argv.profile_theano)
+
     ########
     # Mode #
     ########
@@ -84,6 +134,26 @@ if __name__ == '__main__':
     elif argv.mode == 'test':
         import test
         test.main(argv)
+    elif argv.mode == 'export':
+        import export
+        export.main(argv)
+    elif argv.mode == 'significance':
+        import significance
+        significance.main(argv)
+    elif argv.mode == 'soft_label':
+        import soft_label
+        soft_label.main(argv)
+    elif argv.mode == 'quant_eval':
+        import quant_eval
+        quant_eval.main(argv)
+    elif argv.mode == 'serve':
+        import serve
+        serve.main(argv)
+    elif argv.mode == 'sweep':
+        import sweep
+        sweep.main(argv)
     else:
         import eval
         eval.main(argv)
+
+    PROFILER.show_summary()
@@ -0,0 +1,11 @@
+from driver import Driver
+from ..utils.io_utils import say
+
+
+def main(argv):
+    driver = Driver(argv)
+    tester = driver.build_tester()
+    tester.setup_experiment()
+    say('\n\nCOMPARING THE FLOAT AND THE INT8 ENGINES\n')
+    tester.compare_quantized()
+    tester.save_cache()
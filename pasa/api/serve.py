@@ -0,0 +1,10 @@
+from driver import Driver
+from ..utils.io_utils import say
+
+
+def main(argv):
+    driver = Driver(argv)
+    server = driver.build_server()
+    server.setup_experiment()
+    say('\n\nSERVING\n')
+    server.serve()
@@ -0,0 +1,17 @@
+import numpy as np
+
+from ..experimenter.significance import show_significance
+from ..utils.io_utils import say
+
+
+def main(argv):
+    say('\n\nTESTING SIGNIFICANCE\n')
+    count_files = [np.load(fn) for fn in argv.load_counts.split(',')]
+
+    for name in ['dev', 'test']:
+        if not all(name in f.files for f in count_files):
+            continue
+        sample_counts = [f[name] for f in count_files]
+        assert len(set(len(counts) for counts in sample_counts)) == 1, 'The counts are not of the same samples'
+        say('\n  %s: %d sents  %d resamples\n' % (name.upper(), len(sample_counts[0]), argv.n_resamples))
+        show_significance(sample_counts, n_resamples=argv.n_resamples)
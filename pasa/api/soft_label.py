@@ -0,0 +1,11 @@
+from driver import Driver
+from ..utils.io_utils import say
+
+
+def main(argv):
+    driver = Driver(argv)
+    teacher = driver.build_tester()
+    teacher.setup_experiment()
+    say('\n\nPREDICTING THE SOFT LABELS OF THE TRAINING DATA\n')
+    teacher.save_soft_labels()
+    teacher.save_cache()
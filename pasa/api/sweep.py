@@ -0,0 +1,132 @@
+import os
+import sys
+import copy
+import time
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from driver import Driver
+from ..utils.io_utils import say
+
+SWEEP_KEYS = ['layers', 'dim_hidden', 'reg', 'batch_size', 'unit']
+
+# Filled in by the parent before the pool is forked, so that every worker
+# reads the same corpus, vocabularies and samples without re-building them.
+_SHARED = {}
+
+
+def main(argv):
+    # each configuration is trained in a daemonic worker of a pool, which cannot start processes of its own
+    if argv.parallel:
+        raise ValueError('-mode sweep cannot train with --parallel %s; use --sweep_workers to run '
+                         'the configurations in parallel instead' % argv.parallel)
+
+    say('\n\nSWEEPING HYPERPARAMETERS\n')
+    configs = parse_sweep(argv)
+    say('\tConfigurations: %d\n' % len(configs))
+
+    trainer = Driver(argv).build_trainer()
+    trainer.setup_data()
+    _SHARED['trainer'] = trainer
+
+    n_procs = min(argv.sweep_workers, len(configs))
+    say('\n\nTRAINING %d CONFIGURATIONS WITH %d PROCESSES\n' % (len(configs), n_procs))
+
+    pool = multiprocessing.Pool(processes=n_procs)
+    try:
+        results = pool.map(_train_one_config, [(argv, config) for config in configs], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    fn = save_results(argv, configs, results)
+    show_results(configs, results)
+    say('\n\tSaved the results to %s\n' % fn)
+
+
+def parse_sweep(argv):
+    """
+    :param argv: argv.sweep is a string like 'layers=1,2 reg=0.0001,0.0005'
+    :return: 1D: n_configs; elem=[(key, value), ...]
+    """
+    keys = []
+    values = []
+    for spec in argv.sweep.replace(';', ' ').split():
+        key, vals = spec.split('=')
+        assert key in SWEEP_KEYS, 'Unknown sweep key: %s (%s)' % (key, ', '.join(SWEEP_KEYS))
+        cast = type(getattr(argv, key))
+        keys.append(key)
+        values.append([cast(v) for v in vals.split(',')])
+    return [zip(keys, vals) for vals in itertools.product(*values)]
+
+
+def _train_one_config(args):
+    argv, config = args
+    argv = copy.copy(argv)
+    for key, value in config:
+        setattr(argv, key, value)
+    tag = _get_config_tag(config)
+    if argv.output_fn is None:
+        argv.output_fn = 'sweep.%s' % tag
+    _redirect_output(_get_output_dir(argv), tag)
+
+    np.random.seed(0)
+    start = time.time()
+    trainer = Driver(argv).build_trainer()
+    trainer.setup_from(_SHARED['trainer'])
+    trainer.train()
+    epoch, dev_f1, test_f1 = trainer.epoch_manager.get_best_results()
+    return epoch, dev_f1, test_f1, time.time() - start
+
+
+def _get_config_tag(config):
+    return '.'.join('%s-%s' % (key, value) for key, value in config)
+
+
+def _get_output_dir(argv):
+    output_dir = argv.output_dir if argv.output_dir is not None else 'data/%s/' % argv.model
+    return os.path.join(output_dir, 'sweep')
+
+
+def _redirect_output(output_dir, tag):
+    """
+    Send the worker's stdout (both print and say) to its own log file.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    sys.stdout.flush()
+    log = open(os.path.join(output_dir, 'log.%s.txt' % tag), 'w')
+    os.dup2(log.fileno(), sys.stdout.fileno())
+
+
+def save_results(argv, configs, results):
+    output_dir = _get_output_dir(argv)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    fn = os.path.join(output_dir, 'results.%s.tsv' % time.strftime('%Y%m%d-%H%M%S'))
+    with open(fn, 'w') as fout:
+        header = [key for key, _ in configs[0]] + ['epoch', 'dev_f1', 'test_f1', 'time']
+        fout.write('\t'.join(header) + '\n')
+        for config, result in zip(configs, results):
+            row = [str(value) for _, value in config] + [_format_value(r) for r in result]
+            fout.write('\t'.join(row) + '\n')
+    return fn
+
+
+def _format_value(value):
+    if value is None:
+        return '-'
+    if type(value) == int:
+        return '%d' % value
+    return '%f' % value
+
+
+def show_results(configs, results):
+    say('\n\n\tSWEEP RESULTS')
+    for config, (epoch, dev_f1, test_f1, t) in sorted(zip(configs, results), key=lambda (c, r): -(r[1] or 0.)):
+        dev = '-' if dev_f1 is None else '{:.2%}'.format(dev_f1)
+        test = '-' if test_f1 is None else '{:.2%}'.format(test_f1)
+        say('\n\t%s\tEPOCH-%s\tDEV F:%s\tTEST F:%s\tTime: %f' % (_get_config_tag(config), str(epoch), dev, test, t))
+    say('\n')
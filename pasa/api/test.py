@@ -8,3 +8,4 @@ def main(argv):
     tester.setup_experiment()
     say('\n\nPREDICTING\n')
     tester.predict()
+    tester.save_cache()
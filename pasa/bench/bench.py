@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import theano
+import theano.tensor as T
+
+theano.config.floatX = 'float32'
+
+from synthetic import write_corpus
+from ..decoder.decoder import Decoder
+from ..experimenter.evaluator import SampleEval
+from ..ling.vocab import Vocab, UNK
+from ..nn.layers import StackedBiRNNLayers, GridNetwork
+from ..preprocessor.batch import BaseBatch, GridBatch
+from ..preprocessor.sample import BaseSample
+from ..utils.io_utils import NTCLoader, say
+
+
+def get_peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def measure(name, f, n, unit='sents', repeat=1):
+    """
+    :param f: function to measure; called repeat times, and the fastest call is taken
+    :param n: number of the items f processes in a call
+    :return: (the output of the last call, the result of the benchmark)
+    """
+    seconds = []
+    output = None
+    for i in xrange(repeat):
+        start = time.time()
+        output = f()
+        seconds.append(time.time() - start)
+    sec = min(seconds)
+    result = {'name': name, 'n': n, 'unit': unit, 'sec': sec, 'per_sec': n / sec if sec > 0 else 0.,
+              'peak_rss_mb': get_peak_rss_mb()}
+    say('\t{:<20}{:>10d} {:<6}{:>10.3f} sec{:>12.1f} {}/sec{:>10.1f} MB\n'.format(
+        name, n, unit, sec, result['per_sec'], unit, result['peak_rss_mb']))
+    return output, result
+
+
+def bench_corpus(path, n_sents):
+    loader = NTCLoader(min_unit='word', data_size=None)
+    corpus, result = measure('ntc_load', lambda: loader.load_corpus(path), n_sents)
+    sents = [sent for doc in corpus for sent in doc]
+    assert len(sents) == n_sents
+    return sents, [result]
+
+
+def bench_samples(sents, window=5):
+    vocab_word = Vocab()
+    vocab_word.set_init_word()
+    vocab_word.add_vocab_from_corpus([sents])
+    vocab_word.add_word(UNK)
+    vocab_label = Vocab()
+    vocab_label.set_pas_labels()
+
+    samples, result = measure('sample', lambda: [BaseSample(sent, 1, window, vocab_word, vocab_label)
+                                                 for sent in sents], len(sents))
+    return samples, [result]
+
+
+def bench_batches(samples, batch_size):
+    results = []
+    batches = {}
+    for name, batch_class in [('base', BaseBatch), ('grid', GridBatch)]:
+        batches[name], result = measure('batch.' + name, lambda: batch_class(batch_size, list(samples)), len(samples))
+        results.append(result)
+        _, result = measure('shuffle.' + name, batches[name].shuffle_batches, len(samples))
+        results.append(result)
+    return batches, results
+
+
+def bench_networks(batches, dim_h, layers):
+    """
+    Forward and backward passes of the RNN layers over random inputs of the shapes of the mini-batches.
+    """
+    argv = argparse.Namespace(res=1, ckpt_every=0)
+    ckpt_argv = argparse.Namespace(res=1, ckpt_every=1)
+    rng = np.random.RandomState(0)
+    results = []
+
+    base_inputs = [rng.randn(len(batch[1][0]), len(batch[1]), dim_h).astype(theano.config.floatX)
+                   for batch in batches['base'].batches]
+    grid_inputs = [rng.randn(len(batch[1]), len(batch[1][0]), len(batch[1][0][0]), dim_h).astype(theano.config.floatX)
+                   for batch in batches['grid'].batches]
+    n_prds = sum(x.shape[1] for x in base_inputs)
+
+    for name, network, x, inputs in [('gru', StackedBiRNNLayers(argv, 'gru', layers, dim_h, dim_h), T.ftensor3(),
+                                      base_inputs),
+                                     ('lstm', StackedBiRNNLayers(argv, 'lstm', layers, dim_h, dim_h), T.ftensor3(),
+                                      base_inputs),
+                                     ('gru_ckpt', StackedBiRNNLayers(ckpt_argv, 'gru', layers, dim_h, dim_h),
+                                      T.ftensor3(), base_inputs),
+                                     ('grid', GridNetwork(argv, 'gru', layers, dim_h, dim_h), T.ftensor4(),
+                                      grid_inputs),
+                                     ('grid_ckpt', GridNetwork(ckpt_argv, 'gru', layers, dim_h, dim_h), T.ftensor4(),
+                                      grid_inputs)]:
+        params = [p for layer in network.layers for p in layer.params]
+        h = network.forward(x)
+        start = time.time()
+        forward = theano.function(inputs=[x], outputs=h)
+        backward = theano.function(inputs=[x], outputs=T.grad(T.sum(h), params))
+        say('\t{:<20}{:>10.3f} sec (compile)\n'.format(name, time.time() - start))
+
+        _, result = measure('forward.' + name, lambda: [forward(x_in) for x_in in inputs], n_prds, 'prds')
+        results.append(result)
+        _, result = measure('backward.' + name, lambda: [backward(x_in) for x_in in inputs], n_prds, 'prds')
+        results.append(result)
+    return results
+
+
+def bench_decode_eval(samples, n_labels=5):
+    rng = np.random.RandomState(0)
+    samples = [sample for sample in samples if sample.n_prds > 0]
+    probs = [np.log(rng.dirichlet(np.ones(n_labels), size=(sample.n_prds, sample.n_words))).astype('float32')
+             for sample in samples]
+    decoder = Decoder(argparse.Namespace())
+
+    results, result = measure('decode', lambda: [decoder.decode(prob, sample.prd_indices)
+                                                 for prob, sample in zip(probs, samples)], len(samples))
+
+    def evaluate():
+        pred_eval = SampleEval()
+        for result_sys, sample in zip(results, samples):
+            pred_eval.update_results(result_sys, sample)
+        return pred_eval
+
+    _, eval_result = measure('eval', evaluate, len(samples))
+    return [result, eval_result]
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__)).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(argv):
+    say('\nBENCHMARKS: %d synthetic sentences\n\n' % argv.n_sents)
+    path = os.path.join(tempfile.mkdtemp(), 'synthetic.ntc')
+    write_corpus(path, argv.n_sents, length_dist='uniform', min_words=argv.min_words, max_words=argv.max_words,
+                 prd_rate=argv.prd_rate, seed=argv.seed)
+
+    results = []
+    sents, corpus_results = bench_corpus(path, argv.n_sents)
+    samples, sample_results = bench_samples(sents)
+    batches, batch_results = bench_batches(samples, argv.batch_size)
+    results.extend(corpus_results + sample_results + batch_results)
+    results.extend(bench_decode_eval(samples))
+    if argv.networks:
+        results.extend(bench_networks(batches, argv.dim_hidden, argv.layers))
+    os.remove(path)
+
+    return {'commit': get_commit(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'config': vars(argv),
+            'results': results}
+
+
+def compare(report, baseline, threshold):
+    """
+    Show the throughput of each benchmark against the baseline; the ones slower by more than threshold are marked.
+    """
+    say('\nAGAINST %s (%s)\n' % (baseline['commit'], baseline['time']))
+    base_results = dict((result['name'], result) for result in baseline['results'])
+    for result in report['results']:
+        base = base_results.get(result['name'])
+        if base is None or not base['per_sec']:
+            continue
+        ratio = result['per_sec'] / base['per_sec']
+        mark = '  SLOWER' if ratio < 1. - threshold else ''
+        say('\t{:<20}{:>8.2f}x  RSS {:>+8.1f} MB{}\n'.format(result['name'], ratio,
+                                                               result['peak_rss_mb'] - base['peak_rss_mb'], mark))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and memory benchmarks on a synthetic corpus')
+    parser.add_argument('--n_sents', type=int, default=2000, help='number of synthetic sentences')
+    parser.add_argument('--min_words', type=int, default=5)
+    parser.add_argument('--max_words', type=int, default=60)
+    parser.add_argument('--prd_rate', type=float, default=0.3, help='probability that a chunk is a predicate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--dim_hidden', type=int, default=32)
+    parser.add_argument('--layers', type=int, default=2)
+    parser.add_argument('--networks', type=int, default=1, help='benchmark the RNN layers (compiles theano functions)')
+    parser.add_argument('--output', type=str, default=None, help='write the results into this JSON file')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON file of the results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='mark the benchmarks slower than the baseline by this ratio')
+    argv = parser.parse_args()
+
+    report = run(argv)
+    if argv.output:
+        with open(argv.output, 'w') as fout:
+            json.dump(report, fout, indent=2, sort_keys=True)
+    if argv.baseline:
+        with open(argv.baseline) as fin:
+            compare(report, json.load(fin), argv.threshold)
+
+
+if __name__ == '__main__':
+    main()
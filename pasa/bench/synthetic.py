@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+
+import numpy as np
+
+from ..utils.io_utils import BulkWriter, say
+
+NOUN = u'名詞'
+VERB = u'動詞'
+PARTICLE = u'助詞'
+PARTICLES = [u'が', u'を', u'に', u'は', u'の', u'で', u'と', u'も']
+CASE_NAMES = ['ga', 'o', 'ni']
+EXO_NAMES = ['exog', 'exo1', 'exo2']
+DEP_ARG, ZERO_ARG, INTER_ARG, EXO_ARG = range(4)
+
+# documents of the common train/dev/test split of the NAIST Text Corpus 1.5
+NAIST_DOCS = [('train', 1751), ('dev', 480), ('test', 696)]
+
+
+class NTCGenerator(object):
+    """
+    Generator of documents in the NTC format, which NTCLoader reads like the NAIST Text Corpus:
+    '#' document headers, '*' chunk lines with the heads, and word lines with id=, ga=/o=/ni= and type="pred".
+    Each chunk is a noun or a verb followed by particles, and depends on one of the next three chunks;
+    the last chunk of a sentence is a predicate. The argument of a predicate is the noun of a chunk
+    depending on it or on which it depends (dep), another noun of the sentence (zero), a noun of
+    the previous sentences (inter-sentential zero), or exophoric.
+    """
+
+    def __init__(self, mean_words=26., min_words=2, max_words=120, length_dist='lognormal', sents_per_doc=14.,
+                 prd_rate=0.3, case_rates=(0.9, 0.3, 0.2), zero_rate=0.2, inter_rate=0.1, exo_rate=0.15,
+                 n_forms=30000, seed=0):
+        """
+        :param length_dist: distribution of the number of words of a sentence; lognormal/uniform
+        :param sents_per_doc: mean number of sentences of a document
+        :param prd_rate: probability that a chunk but the last one is a predicate
+        :param case_rates: probability that each case of a predicate (ga, o, ni) has an argument
+        :param zero_rate: probability that an argument is a zero pronoun in the sentence
+        :param inter_rate: probability that an argument is in a previous sentence
+        :param exo_rate: probability that an argument is exophoric
+        """
+        assert length_dist in ['lognormal', 'uniform']
+        assert zero_rate + inter_rate + exo_rate <= 1.
+        self.mean_words = mean_words
+        self.min_words = min_words
+        self.max_words = max_words
+        self.length_dist = length_dist
+        self.sents_per_doc = sents_per_doc
+        self.prd_rate = prd_rate
+        self.case_rates = case_rates
+        # 1D: 4 (dep, zero, inter, exo); cumulative probability of the argument types
+        self.type_cdf = np.cumsum([1. - zero_rate - inter_rate - exo_rate, zero_rate, inter_rate, exo_rate])
+
+        self.rng = np.random.RandomState(seed)
+        self.forms = [u'w%d' % i for i in xrange(n_forms)]
+        # cumulative Zipfian frequencies of the word forms
+        freqs = 1. / np.arange(1, n_forms + 1)
+        self.form_cdf = np.cumsum(freqs) / np.sum(freqs)
+
+    def generate_docs(self, n_docs, n_sents_per_doc=None, first_doc_id=0):
+        """
+        :param n_sents_per_doc: number of sentences of each document; sampled around sents_per_doc if None
+        :return: generator of the lines of a document; 1D: n_lines; elem=line without a newline
+        """
+        for doc_index in xrange(n_docs):
+            n_sents = n_sents_per_doc or self.rng.poisson(self.sents_per_doc - 1) + 1
+            yield self.generate_doc(first_doc_id + doc_index, n_sents)
+
+    def generate_doc(self, doc_id, n_sents):
+        lines = []
+        # ids of the nouns so far; the ids are unique in a document
+        ids = []
+        for sent_index in xrange(n_sents):
+            lines.append(u'# S-ID:%09d-%03d KNP:synthetic' % (doc_id, sent_index + 1))
+            lines.extend(self.generate_sent(self.sample_n_words(), ids))
+        return lines
+
+    def sample_n_words(self):
+        if self.length_dist == 'uniform':
+            n_words = self.rng.randint(self.min_words, self.max_words + 1)
+        else:
+            sigma = 0.5
+            n_words = int(round(self.rng.lognormal(np.log(self.mean_words) - sigma ** 2 / 2, sigma)))
+        return min(max(n_words, self.min_words), self.max_words)
+
+    def generate_sent(self, n_words, ids):
+        """
+        :param ids: ids of the nouns of the previous sentences; the ids of the nouns of this sentence are appended
+        :return: 1D: n_lines; elem=line without a newline; the chunk and word lines, and EOS
+        """
+        rng = self.rng
+        chunks = self._split_chunks(n_words)
+        n_chunks = len(chunks)
+        is_prd = list(rng.rand(n_chunks - 1) < self.prd_rate) + [True]
+
+        # key: chunk index of a noun, value: id
+        chunk_ids = {}
+        for chunk_index in xrange(n_chunks):
+            if not is_prd[chunk_index]:
+                chunk_ids[chunk_index] = len(ids) + len(chunk_ids) + 1
+        prev_ids = list(ids)
+        ids.extend(sorted(chunk_ids.values()))
+
+        forms = np.minimum(np.searchsorted(self.form_cdf, rng.rand(n_chunks)), len(self.forms) - 1)
+        lines = []
+        for chunk_index, (n_chunk_words, chunk_head) in enumerate(chunks):
+            lines.append(u'* %d %dD' % (chunk_index, chunk_head))
+            form = self.forms[forms[chunk_index]]
+            if is_prd[chunk_index]:
+                lines.append(self._format_word(form, VERB, self._generate_prd_info(chunk_index, chunks, chunk_ids,
+                                                                                   prev_ids)))
+            else:
+                lines.append(self._format_word(form, NOUN, u'id="%d"' % chunk_ids[chunk_index]))
+            for i in xrange(n_chunk_words - 1):
+                lines.append(self._format_word(PARTICLES[rng.randint(len(PARTICLES))], PARTICLE, u'_'))
+        lines.append(u'EOS')
+        return lines
+
+    def _split_chunks(self, n_words):
+        """
+        :return: 1D: n_chunks; elem=(n_words, chunk head)
+        """
+        rng = self.rng
+        sizes = []
+        while sum(sizes) < n_words:
+            sizes.append(min(rng.randint(1, 4), n_words - sum(sizes)))
+        n_chunks = len(sizes)
+        heads = [min(i + rng.randint(1, 4), n_chunks - 1) for i in xrange(n_chunks - 1)] + [-1]
+        return zip(sizes, heads)
+
+    def _generate_prd_info(self, prd_chunk, chunks, chunk_ids, prev_ids):
+        """
+        :return: e.g., alt="active"/ga="3"/ga_type="dep"/o="exog"/o_type="exog"/type="pred"
+        """
+        rng = self.rng
+        prd_head = chunks[prd_chunk][1]
+        # 1D: 4 (dep, zero, inter, exo); elem=candidates of the argument
+        candidates = [[], [], prev_ids, EXO_NAMES]
+        for chunk_index, arg_id in chunk_ids.items():
+            if chunks[chunk_index][1] == prd_chunk or chunk_index == prd_head:
+                candidates[DEP_ARG].append(arg_id)
+            else:
+                candidates[ZERO_ARG].append(arg_id)
+        used = set()
+
+        info = [u'alt="active"']
+        for case_name, case_rate in zip(CASE_NAMES, self.case_rates):
+            if rng.rand() >= case_rate:
+                continue
+            arg_type = min(np.searchsorted(self.type_cdf, rng.rand(), side='right'), EXO_ARG)
+            # a noun fills one case of a predicate at most
+            args = [arg for arg in candidates[arg_type] if arg not in used]
+            if not args:
+                continue
+            arg = args[rng.randint(len(args))]
+            used.add(arg)
+            if arg_type == EXO_ARG:
+                type_name = arg
+            elif arg_type == DEP_ARG:
+                type_name = 'dep'
+            else:
+                type_name = 'zero'
+            info.append(u'%s="%s"/%s_type="%s"' % (case_name, arg, case_name, type_name))
+        info.append(u'type="pred"')
+        return u'/'.join(info)
+
+    @staticmethod
+    def _format_word(form, pos, pas_info):
+        return u'\t'.join([form, form, form, pos, u'*', u'*', u'*', pas_info])
+
+    def write(self, path, n_docs, n_sents_per_doc=None):
+        """
+        :return: the number of sentences written
+        """
+        n_sents = 0
+        with BulkWriter(path) as writer:
+            for lines in self.generate_docs(n_docs, n_sents_per_doc):
+                n_sents += lines.count(u'EOS')
+                writer.write(u'\n'.join(lines) + u'\n')
+        return n_sents
+
+
+def write_corpus(path, n_sents, n_sents_per_doc=10, **kwargs):
+    """
+    Write n_sents sentences in documents of n_sents_per_doc sentences; the last document may be shorter.
+    :param kwargs: options of NTCGenerator
+    """
+    generator = NTCGenerator(**kwargs)
+    n_docs, n_rest = divmod(n_sents, n_sents_per_doc)
+    with BulkWriter(path) as writer:
+        for lines in generator.generate_docs(n_docs, n_sents_per_doc):
+            writer.write(u'\n'.join(lines) + u'\n')
+        if n_rest:
+            writer.write(u'\n'.join(generator.generate_doc(n_docs, n_rest)) + u'\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic corpus in the format of the NAIST Text Corpus')
+    parser.add_argument('--output_dir', type=str, default='data/synthetic', help='directory of {train,dev,test}.ntc')
+    parser.add_argument('--scale', type=float, default=1., help='number of documents relative to the NAIST split')
+    parser.add_argument('--n_docs', type=int, default=None, help='write n_docs documents into output_dir/synthetic.ntc instead')
+    parser.add_argument('--sents_per_doc', type=float, default=14., help='mean number of sentences of a document')
+    parser.add_argument('--length_dist', type=str, default='lognormal', help='lognormal/uniform')
+    parser.add_argument('--mean_words', type=float, default=26., help='mean number of words of a sentence')
+    parser.add_argument('--min_words', type=int, default=2)
+    parser.add_argument('--max_words', type=int, default=120)
+    parser.add_argument('--prd_rate', type=float, default=0.3, help='probability that a chunk is a predicate')
+    parser.add_argument('--case_rates', type=str, default='0.9,0.3,0.2', help='probability that ga/o/ni has an argument')
+    parser.add_argument('--zero_rate', type=float, default=0.2, help='rate of the zero arguments in the sentence')
+    parser.add_argument('--inter_rate', type=float, default=0.1, help='rate of the arguments in the previous sentences')
+    parser.add_argument('--exo_rate', type=float, default=0.15, help='rate of the exophoric arguments')
+    parser.add_argument('--seed', type=int, default=0)
+    argv = parser.parse_args()
+
+    generator = NTCGenerator(mean_words=argv.mean_words, min_words=argv.min_words, max_words=argv.max_words,
+                             length_dist=argv.length_dist, sents_per_doc=argv.sents_per_doc,
+                             prd_rate=argv.prd_rate, case_rates=[float(r) for r in argv.case_rates.split(',')],
+                             zero_rate=argv.zero_rate, inter_rate=argv.inter_rate, exo_rate=argv.exo_rate,
+                             seed=argv.seed)
+
+    if argv.n_docs is not None:
+        files = [('synthetic', argv.n_docs)]
+    else:
+        files = [(name, int(round(n_docs * argv.scale))) for name, n_docs in NAIST_DOCS]
+    for name, n_docs in files:
+        path = os.path.join(argv.output_dir, name + '.ntc')
+        n_sents = generator.write(path, n_docs)
+        say('%s: %d docs, %d sents\n' % (path, n_docs, n_sents))
+
+
+if __name__ == '__main__':
+    main()
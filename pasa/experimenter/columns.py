@@ -0,0 +1,68 @@
+import numpy as np
+
+from ..ling.word import BST, DEP, INTRA_ZERO
+
+COLUMN_NAMES = ['sent_id', 'prd_index', 'word_index', 'n_words', 'gold', 'sys', 'case_type']
+
+
+def get_result_columns(batch_y_hat, samples, batch_y_prob=None):
+    """
+    Flatten the results into one row per (sentence, predicate, word), so that the errors can be sliced
+    by case type, sentence length, etc. with array operations.
+
+    :param batch_y_hat: 1D: n_samples, 2D: n_prds, 3D: n_words; label id
+    :param batch_y_prob: 1D: n_samples, 2D: n_prds, 3D: n_words, 4D: n_labels; log probability of a label
+    :return: key: column name, value: 1D: n_rows; 'prob' is 2D: n_rows, n_labels
+    """
+    assert len(batch_y_hat) == len(samples)
+    columns = dict((name, []) for name in COLUMN_NAMES)
+    probs = []
+
+    for sent_id, (result, sample) in enumerate(zip(batch_y_hat, samples)):
+        if len(result) == 0:
+            continue
+        n_prds, n_words = len(result), sample.n_words
+        prd_indices = np.asarray(sample.prd_indices, dtype='int32')
+
+        columns['sent_id'].append(np.full(n_prds * n_words, sent_id, dtype='int32'))
+        columns['prd_index'].append(np.repeat(prd_indices, n_words))
+        columns['word_index'].append(np.tile(np.arange(n_words, dtype='int32'), n_prds))
+        columns['n_words'].append(np.full(n_prds * n_words, n_words, dtype='int32'))
+        columns['sys'].append(np.asarray(result, dtype='int8').ravel())
+        if sample.y is not None:
+            columns['gold'].append(np.asarray(sample.y, dtype='int8').ravel())
+        else:
+            columns['gold'].append(np.full(n_prds * n_words, -1, dtype='int8'))
+        columns['case_type'].append(get_case_types(sample.sent, prd_indices).ravel())
+        if batch_y_prob is not None:
+            probs.append(np.exp(batch_y_prob[sent_id]).reshape((n_prds * n_words, -1)).astype('float16'))
+
+    columns = dict((name, np.concatenate(values) if values else np.zeros(0, dtype='int32'))
+                   for name, values in columns.items())
+    if probs:
+        columns['prob'] = np.concatenate(probs)
+    return columns
+
+
+def get_case_types(sent, prd_indices):
+    """
+    The same case types as Eval._get_case_type, for all the pairs of the predicates and the words at once.
+    :return: 1D: n_prds, 2D: n_words; case type
+    """
+    chunk_index = np.asarray([w.chunk_index for w in sent])
+    chunk_head = np.asarray([w.chunk_head for w in sent])
+    prd_chunk_index = chunk_index[prd_indices][:, None]
+    prd_chunk_head = chunk_head[prd_indices][:, None]
+
+    case_types = np.full((len(prd_indices), len(sent)), INTRA_ZERO, dtype='int8')
+    case_types[(chunk_index == prd_chunk_head) | (chunk_head == prd_chunk_index)] = DEP
+    case_types[chunk_index == prd_chunk_index] = BST
+    return case_types
+
+
+def load_result_columns(fn):
+    """
+    :return: key: column name, value: the column written by IOManager.save_result_columns
+    """
+    with np.load(fn) as data:
+        return dict((name, data[name]) for name in data.files)
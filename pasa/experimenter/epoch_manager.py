@@ -1,5 +1,3 @@
-import numpy as np
-
 from ..utils.io_utils import say
 
 
@@ -10,7 +8,7 @@ class EpochManager(object):
         self.f1_history = {}
         self.best_f1 = -1.
 
-    def train(self, model_api, train_samples, dev_samples, test_samples, untrainable_emb=None):
+    def train(self, model_api, train_samples, dev_samples, test_samples):
         argv = self.argv
 
         for epoch in xrange(argv.epoch):
@@ -18,7 +16,7 @@ class EpochManager(object):
             print '  TRAIN\n\t',
 
             model_api.train_one_epoch(train_samples)
-            dev_results, update, trainable_emb = self._validate(epoch, model_api, dev_samples, untrainable_emb)
+            dev_results, update = self._validate(epoch, model_api, dev_samples)
             test_results = self._test(epoch, model_api, test_samples, update)
 
             if argv.save and update:
@@ -27,20 +25,10 @@ class EpochManager(object):
 #                    model_api.save_pas_results(results=test_results, samples=test_samples)
 #                    model_api.save_outputs(results=test_results)
 
-            if trainable_emb:
-                model_api.model.emb_layer.word_emb.set_value(trainable_emb)
-
             self._show_results()
 
-    def _validate(self, epoch, model_api, samples, untrainable_emb=None):
+    def _validate(self, epoch, model_api, samples):
         results = None
-
-        if untrainable_emb:
-            trainable_emb = model_api.model.emb_layer.word_emb.get_value(True)
-            model_api.model.emb_layer.word_emb.set_value(np.r_[trainable_emb, untrainable_emb])
-        else:
-            trainable_emb = None
-
         update = False
         if samples:
             print '\n  DEV\n\t',
@@ -52,7 +40,7 @@ class EpochManager(object):
                 self.f1_history[epoch+1] = [f1]
                 update = True
 
-        return results, update, trainable_emb
+        return results, update
 
     def _test(self, epoch, model_api, samples, update):
         results = None
@@ -69,6 +57,17 @@ class EpochManager(object):
 
         return results
 
+    def get_best_results(self):
+        """
+        :return: (best epoch, dev F1, test F1); test F1 is None when no test samples are given
+        """
+        if not self.f1_history:
+            return None, None, None
+        epoch = max(self.f1_history.keys())
+        f1s = self.f1_history[epoch]
+        test_f1 = f1s[1] if len(f1s) == 2 else None
+        return epoch, f1s[0], test_f1
+
     def _show_results(self):
         say('\n\n\tF1 HISTORY')
         for k, v in sorted(self.f1_history.items()):
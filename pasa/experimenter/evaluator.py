@@ -1,3 +1,5 @@
+import multiprocessing
+
 import numpy as np
 
 from abc import ABCMeta, abstractmethod
@@ -8,9 +10,14 @@ GA_ID = 1
 O_ID = 2
 NI_ID = 3
 
+# the task of the shard workers, set before forking them
+_SHARED = {}
+
 
 class Eval(object):
     __metaclass__ = ABCMeta
+    # the counts which the metrics are computed from; each evaluator adds up its own
+    COUNTS = ['corrects', 'results_sys', 'results_gold']
 
     def __init__(self):
         self.corrects = None
@@ -48,6 +55,31 @@ class Eval(object):
     def show_results(self):
         raise NotImplementedError
 
+    def merge(self, other):
+        """
+        Add the counts of another evaluator of the same class, e.g., of another shard of the same data.
+        """
+        for name in self.COUNTS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.nll += other.nll
+        return self
+
+    def serialize(self):
+        """
+        :return: byte string of the NLL (float64) and the counts (float32)
+        """
+        counts = np.asarray([getattr(self, name) for name in self.COUNTS], dtype='float32')
+        return np.asarray([self.nll], dtype='float64').tostring() + counts.tostring()
+
+    @classmethod
+    def deserialize(cls, data):
+        evaluator = cls()
+        evaluator.nll = float(np.frombuffer(data[:8], dtype='float64')[0])
+        counts = np.frombuffer(data[8:], dtype='float32').reshape((len(cls.COUNTS),) + evaluator.corrects.shape)
+        for name, count in zip(cls.COUNTS, counts):
+            setattr(evaluator, name, count.copy())
+        return evaluator
+
     @staticmethod
     def _get_case_index(y):
         case_index = -1
@@ -188,6 +220,28 @@ class SampleEval(Eval):
             self.all_f1, self.all_precision, int(self.all_corrects), int(self.all_results_sys),
             self.all_recall, int(self.all_corrects), int(self.all_results_gold)))
 
+    def show_f1_deltas(self, base):
+        """
+        Show the F1 of this evaluation minus that of the base evaluation on the same samples.
+        """
+        self._summarize()
+        base._summarize()
+        say('\n\n\tF1 DELTA')
+
+        for case_index in xrange(len(self.corrects)):
+            f1 = self._calc_metrics(np.sum(self.corrects[case_index][1:]),
+                                    np.sum(self.results_sys[case_index][1:]),
+                                    np.sum(self.results_gold[case_index][1:]))[2]
+            base_f1 = base._calc_metrics(np.sum(base.corrects[case_index][1:]),
+                                         np.sum(base.results_sys[case_index][1:]),
+                                         np.sum(base.results_gold[case_index][1:]))[2]
+            say('\n\tCASE-%s:\n' % self._get_case_name(case_index))
+            say('\tALL:\tF:{:>+8.2%}\n'.format(f1 - base_f1))
+            say('\tDEP:\tF:{:>+8.2%}\n'.format(self.f1[case_index][DEP] - base.f1[case_index][DEP]))
+            say('\tZERO:\tF:{:>+8.2%}\n'.format(self.f1[case_index][INTRA_ZERO] - base.f1[case_index][INTRA_ZERO]))
+
+        say('\n\tTOTAL:\tF:{:>+8.2%}\n'.format(self.all_f1 - base.all_f1))
+
 
 class BatchEval(Eval):
 
@@ -297,13 +351,16 @@ class ResultEval(Eval):
         self._set_params()
 
         for sent in corpus:
-            for pas in sent.pas:
-                self._add_results_gold(pas)
-                self._add_results_sys(pas)
-                self._add_corrects(pas)
+            self.update_sent(sent)
         self._summarize()
         self.show_results()
 
+    def update_sent(self, sent):
+        for pas in sent.pas:
+            self._add_results_gold(pas)
+            self._add_results_sys(pas)
+            self._add_corrects(pas)
+
     def _add_results_gold(self, pas):
         for i, args in enumerate(pas.args_gold):
             for arg in args:
@@ -320,11 +377,10 @@ class ResultEval(Eval):
 
     def _add_corrects(self, pas):
         for case_index, (args_sys, args_gold) in enumerate(zip(pas.args_sys, pas.args_gold)):
+            gold_indices = set(arg_g.word_index for arg_g in args_gold)
             for arg_s in args_sys:
-                for arg_g in args_gold:
-                    if arg_s.word_index == arg_g.word_index:
-                        self.corrects[case_index][arg_s.case_type] += 1
-                        break
+                if arg_s.word_index in gold_indices:
+                    self.corrects[case_index][arg_s.case_type] += 1
 
     def show_results(self):
         self._summarize()
@@ -362,6 +418,12 @@ class ResultEval(Eval):
             self.all_f1, self.all_precision, int(self.all_corrects), int(self.all_results_sys),
             self.all_recall, int(self.all_corrects), int(self.all_results_gold)))
 
+    def show_partial_results(self, header):
+        self._summarize()
+        say('\t{}\tF:{:>7.2%}  P:{:>7.2%} ({:>5}/{:>5})  R:{:>7.2%} ({:>5}/{:>5})\n'.format(
+            header, self.all_f1, self.all_precision, int(self.all_corrects), int(self.all_results_sys),
+            self.all_recall, int(self.all_corrects), int(self.all_results_gold)))
+
 
 class PrdEval(Eval):
 
@@ -471,3 +533,42 @@ class PrdEval(Eval):
         precision, recall, f1 = self._calc_metrics(ttl_crr, ttl_res_sys, ttl_res_gold)
         say('\tTOTAL ALL:\tF:{:>7.2%}  P:{:>7.2%} ({:>5}/{:>5})  R:{:>7.2%} ({:>5}/{:>5})\n'.format(
             f1, precision, int(ttl_crr), int(ttl_res_sys), recall, int(ttl_crr), int(ttl_res_gold)))
+
+
+def eval_in_shards(evaluator_class, update, items, n_workers=1):
+    """
+    Split the items into n_workers shards, fill an evaluator for each shard in a process pool,
+    and merge them. The workers are forked, so that neither the items nor update are pickled.
+    :param update: function of (evaluator, item) that adds the counts of an item
+    :return: evaluator_class() with the counts of all the items
+    """
+    # daemonic processes, e.g., the workers of a sweep, cannot fork a pool
+    if n_workers <= 1 or len(items) < n_workers or multiprocessing.current_process().daemon:
+        return _fill_evaluator(evaluator_class, update, items)
+
+    _SHARED['task'] = (evaluator_class, update, items)
+    bounds = [len(items) * i / n_workers for i in xrange(n_workers + 1)]
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        shards = pool.map(_eval_shard, zip(bounds[:-1], bounds[1:]))
+    finally:
+        pool.close()
+        pool.join()
+        _SHARED.clear()
+
+    evaluator = evaluator_class()
+    for data in shards:
+        evaluator.merge(evaluator_class.deserialize(data))
+    return evaluator
+
+
+def _eval_shard(bounds):
+    evaluator_class, update, items = _SHARED['task']
+    return _fill_evaluator(evaluator_class, update, items[bounds[0]: bounds[1]]).serialize()
+
+
+def _fill_evaluator(evaluator_class, update, items):
+    evaluator = evaluator_class()
+    for item in items:
+        update(evaluator, item)
+    return evaluator
@@ -1,7 +1,13 @@
 import os
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
+
 from ..utils.io_utils import say, dump_data, move_data, load_data
+from ..utils.cache import LRUCache
+from ..utils.profiler import PROFILER
+from significance import get_sample_counts
+from columns import get_result_columns
 from ..utils.stats import corpus_statistics, sample_statistics, show_case_dist
 
 
@@ -21,19 +27,26 @@ class Experimenter(object):
         self.untrainable_emb = None
 
         self.corpus_set = None
+        # the samples of the train set before they are split into predicate chunks and mini-batches
+        self.train_sample_list = None
         self.train_samples = None
         self.dev_samples = None
         self.test_samples = None
+        self.cache = None
 
         self.output_path = 'data/%s' % self.argv.model
 
     def setup_experiment(self):
         say('\n\nSETTING UP A PASA EXPERIMENT\n')
+        self.setup_data()
+        self._setup_model_api()
+
+    def setup_data(self):
         self._setup_corpus()
-        self._setup_word()
-        self._setup_label()
+        with PROFILER.timer('build_vocab'):
+            self._setup_word()
+            self._setup_label()
         self._setup_samples()
-        self._setup_model_api()
 
     def _setup_corpus(self):
         self.corpus_set = self.preprocessor.load_corpus_set()
@@ -100,7 +113,7 @@ class Trainer(Experimenter):
     def _setup_word(self):
         say('\n\nSetting up vocabularies...\n')
         pp = self.preprocessor
-        vocab_word, emb = pp.load_init_emb()
+        vocab_word, emb = pp.load_init_emb(self.corpus_set)
         vocab_word, trainable_emb, untrainable_emb = pp.create_trainable_emb(train_corpus=self.corpus_set[0],
                                                                              vocab_word=vocab_word,
                                                                              emb=emb)
@@ -123,7 +136,10 @@ class Trainer(Experimenter):
         pp.set_sample_factory(self.vocab_word, self.vocab_label)
 
         sample_set = pp.create_sample_set(self.corpus_set)
-        self.train_samples = pp.create_batches(sample_set[0])
+        if self.argv.load_soft:
+            pp.set_soft_labels(sample_set[0], self.load_data(self.argv.load_soft))
+        self.train_sample_list = sample_set[0]
+        self.train_samples = pp.create_batches(self.train_sample_list)
         self.dev_samples = sample_set[1]
         self.test_samples = sample_set[2]
 
@@ -134,21 +150,70 @@ class Trainer(Experimenter):
         say('\n\nSetting up a model API...\n')
         self.model_api.compile(vocab_word=self.vocab_word,
                                vocab_label=self.vocab_label,
-                               init_emb=self.trainable_emb)
-        self.model_api.set_train_f()
+                               init_emb=self.trainable_emb,
+                               frozen_emb=self.untrainable_emb)
+        if self.argv.parallel:
+            self.model_api.set_parallel_trainer(self.argv.n_workers)
+        else:
+            self.model_api.set_train_f()
         self.model_api.set_predict_f()
 
+    def setup_from(self, trainer):
+        """
+        Reuse the vocabularies and samples already built by another trainer;
+        only the mini-batches and the model depend on this trainer's argv.
+        """
+        say('\n\nSETTING UP A PASA EXPERIMENT FROM SHARED DATA\n')
+        self.vocab_word = trainer.vocab_word
+        self.vocab_label = trainer.vocab_label
+        self.trainable_emb = trainer.trainable_emb
+        self.untrainable_emb = trainer.untrainable_emb
+
+        pp = self.preprocessor
+        pp.set_sample_factory(self.vocab_word, self.vocab_label)
+        self.train_sample_list = trainer.train_sample_list
+        self.train_samples = pp.create_batches(self.train_sample_list)
+        self.dev_samples = trainer.dev_samples
+        self.test_samples = trainer.test_samples
+        say('\nMini-Batches: %d\n\n' % (self.train_samples.size()))
+
+        self._setup_model_api()
+
     def train(self):
         say('\n\nTRAINING START\n\n')
         self.epoch_manager.train(model_api=self.model_api,
                                  train_samples=self.train_samples,
                                  dev_samples=self.dev_samples,
-                                 test_samples=self.test_samples,
-                                 untrainable_emb=self.untrainable_emb)
+                                 test_samples=self.test_samples)
 
 
 class Tester(Experimenter):
 
+    def setup_data(self):
+        self._setup_cache()
+        super(Tester, self).setup_data()
+
+    def _setup_cache(self):
+        """
+        The samples and the outputs of the fixed parameters are cached by their contents;
+        the cache file, if any, carries them over to later runs.
+        """
+        argv = self.argv
+        if not argv.cache_mb:
+            return
+        self.cache = LRUCache(argv.cache_mb * 2 ** 20)
+        if argv.cache_file and os.path.exists(argv.cache_file):
+            say('\n\nLoading the cache...\n')
+            self.cache.load(argv.cache_file)
+        self.preprocessor.set_cache(self.cache)
+
+    def save_cache(self):
+        if self.cache is None:
+            return
+        self.cache.show_stats()
+        if self.argv.cache_file:
+            self.cache.save(self.argv.cache_file)
+
     def _setup_word(self):
         self.vocab_word = self.load_data(self.argv.load_word)
 
@@ -165,18 +230,35 @@ class Tester(Experimenter):
         self._show_sample_stats(sample_set, self.vocab_label)
 
     def _setup_model_api(self):
-        self.model_api.compile(vocab_word=self.vocab_word, vocab_label=self.vocab_label, init_emb=None)
-        self.model_api.load_params(self.argv.load_param)
-        self.model_api.set_predict_f()
+        if self.argv.load_engine:
+            # the NumPy engine predicts without the theano graph
+            self.model_api.compile_io(vocab_word=self.vocab_word, vocab_label=self.vocab_label)
+            self.model_api.load_numpy_model(self.argv.load_engine)
+        else:
+            self.model_api.compile(vocab_word=self.vocab_word, vocab_label=self.vocab_label, init_emb=None)
+            if ',' in self.argv.load_param:
+                self.model_api.set_ensemble_predict_f(self.argv.load_param.split(','))
+            else:
+                self.model_api.load_params(self.argv.load_param)
+                self.model_api.set_predict_f()
+        if self.cache is not None:
+            self.model_api.set_predict_cache(self.cache)
 
     def predict(self):
         model_api = self.model_api
+        # per-sentence counts for the significance tests
+        sample_counts = {}
+        # per-(sentence, predicate, word) results for the error analysis
+        columns = {}
 
         if self.dev_samples:
             print '\n  DEV\n\t',
             dev_results = model_api.predict_one_epoch(self.dev_samples)
             dev_f1 = model_api.eval_one_epoch(dev_results, self.dev_samples)
             say('\n\n\tDEV F:{:.2%}\n'.format(dev_f1))
+            if self.argv.save:
+                sample_counts['dev'] = get_sample_counts(dev_results, self.dev_samples)
+                columns['dev'] = self._get_result_columns(dev_results, self.dev_samples)
 
         if self.test_samples:
             print '\n  TEST\n\t',
@@ -186,5 +268,58 @@ class Tester(Experimenter):
 
             if self.argv.save:
                 model_api.save_pas_results(results=test_results, samples=self.test_samples)
+                sample_counts['test'] = get_sample_counts(test_results, self.test_samples)
+                columns['test'] = self._get_result_columns(test_results, self.test_samples)
+
+        if sample_counts:
+            model_api.save_sample_counts(sample_counts)
+            model_api.save_result_columns(columns)
+
+    def _get_result_columns(self, results, samples):
+        # the probabilities take another forward pass, unless they are in the cache of the predictions
+        probs = self.model_api.predict_probs(samples) if self.argv.save_probs else None
+        return get_result_columns(results, samples, probs)
+
+    def compare_quantized(self):
+        """
+        Predict with the float and the int8 weights of the exported model, and show the F1 deltas.
+        """
+        model_api = self.model_api
+        fn = self.argv.load_engine
+
+        for name, samples in [('DEV', self.dev_samples), ('TEST', self.test_samples)]:
+            if not samples:
+                continue
+            evals = []
+            for quantize in [False, True]:
+                print '\n  %s (%s)\n\t' % (name, 'INT8' if quantize else 'FLOAT'),
+                model_api.load_numpy_model(fn, quantize)
+                results = model_api.predict_one_epoch(samples)
+                pred_eval = model_api.get_sample_eval(results, samples)
+                pred_eval.show_results()
+                evals.append(pred_eval)
+            say('\n\n  %s: INT8 - FLOAT' % name)
+            evals[1].show_f1_deltas(evals[0])
+
+
+class Teacher(Tester):
+    """
+    Predict the label distributions of the training samples, which a student model is trained against.
+    """
 
+    def _setup_samples(self):
+        self.preprocessor.set_sample_factory(self.vocab_word, self.vocab_label)
 
+        sample_set = self.preprocessor.create_sample_set(self.corpus_set)
+        self.train_samples = sample_set[0]
+
+        self._show_sample_stats(sample_set[:1], self.vocab_label)
+
+    def save_soft_labels(self):
+        soft_labels = [np.exp(y_prob) for y_prob in self.model_api.predict_probs(self.train_samples)]
+
+        output_fn = 'soft_label.model-%s' % self.argv.model
+        output_path = self.output_path + '/soft_label'
+        self._create_path(output_path)
+        dump_data(soft_labels, output_fn)
+        move_data(output_fn + '.pkl.gz', output_path)
@@ -0,0 +1,152 @@
+import numpy as np
+
+from evaluator import SampleEval
+from ..ling.word import DEP, INTRA_ZERO
+from ..utils.io_utils import say
+
+CASE_NAMES = ['GA', 'WO', 'Ni']
+METRIC_NAMES = ['P', 'R', 'F']
+
+
+def get_sample_counts(batch_y_hat, samples):
+    """
+    :return: 1D: n_samples, 2D: 3 (corrects, results_sys, results_gold), 3D: n_cases, 4D: n_case_types
+    """
+    counts = np.zeros((len(samples), 3, 3, 3), dtype='float32')
+    for i, (result, sample) in enumerate(zip(batch_y_hat, samples)):
+        if len(result) == 0:
+            continue
+        pred_eval = SampleEval()
+        pred_eval.update_results(y_sys_batch=result, sample=sample)
+        counts[i] = [pred_eval.corrects, pred_eval.results_sys, pred_eval.results_gold]
+    return counts
+
+
+def get_group_names():
+    names = []
+    for case_name in CASE_NAMES:
+        names.extend(['%s-DEP' % case_name, '%s-ZERO' % case_name, '%s-ALL' % case_name])
+    names.append('TOTAL')
+    return names
+
+
+def get_group_counts(counts):
+    """
+    :param counts: 1D: batch, 2D: 3 (corrects, results_sys, results_gold), 3D: n_cases, 4D: n_case_types
+    :return: 1D: batch, 2D: 3, 3D: n_groups; the counts of each case and type, as in get_group_names
+    """
+    groups = []
+    for case_index in xrange(counts.shape[2]):
+        dep = counts[:, :, case_index, DEP]
+        zero = counts[:, :, case_index, INTRA_ZERO]
+        groups.extend([dep, zero, dep + zero])
+    groups.append(np.sum(counts[:, :, :, DEP:INTRA_ZERO + 1], axis=(2, 3)))
+    return np.stack(groups, axis=2)
+
+
+def calc_metrics(counts):
+    """
+    :param counts: 1D: batch, 2D: 3 (corrects, results_sys, results_gold), 3D: n_cases, 4D: n_case_types
+    :return: 1D: batch, 2D: 3 (P, R, F), 3D: n_groups; 0 where undefined
+    """
+    group_counts = get_group_counts(counts)
+    corrects, results_sys, results_gold = group_counts[:, 0], group_counts[:, 1], group_counts[:, 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.nan_to_num(corrects / results_sys)
+        recall = np.nan_to_num(corrects / results_gold)
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return np.stack([precision, recall, f1], axis=1)
+
+
+def paired_bootstrap(sample_counts, n_resamples=10000, seed=0, chunk_size=1000):
+    """
+    Resample the sentences with replacement; every system is scored on the same resamples.
+    Each chunk of resamples is a matrix of how many times each sentence is drawn, so that
+    the counts of all the resamples in the chunk are one matrix product.
+
+    :param sample_counts: 1D: n_systems; elem=output of get_sample_counts for the same samples
+    :return: 1D: n_systems; elem=1D: n_resamples, 2D: 3 (P, R, F), 3D: n_groups
+    """
+    rng = np.random.RandomState(seed)
+    n_samples = len(sample_counts[0])
+    shape = sample_counts[0].shape[1:]
+    flat_counts = [counts.reshape((n_samples, -1)) for counts in sample_counts]
+    metrics = [[] for counts in sample_counts]
+
+    for start in xrange(0, n_resamples, chunk_size):
+        n = min(chunk_size, n_resamples - start)
+        indices = rng.randint(0, n_samples, size=(n, n_samples)) + n_samples * np.arange(n)[:, None]
+        weights = np.bincount(indices.ravel(), minlength=n * n_samples).reshape((n, n_samples)).astype('float32')
+        for system_metrics, counts in zip(metrics, flat_counts):
+            system_metrics.append(calc_metrics(weights.dot(counts).reshape((n,) + shape)))
+
+    return [np.concatenate(system_metrics) for system_metrics in metrics]
+
+
+def approximate_randomization(counts_a, counts_b, n_trials=10000, seed=0, chunk_size=1000):
+    """
+    Swap the outputs of the two systems on each sentence with probability 0.5, and count the trials
+    in which the F1 difference is at least the observed one.
+
+    :return: 1D: n_groups; p-value of the F1 difference
+    """
+    rng = np.random.RandomState(seed)
+    n_samples = len(counts_a)
+    shape = counts_a.shape[1:]
+    diff = (counts_b - counts_a).reshape((n_samples, -1))
+    total_a = counts_a.sum(axis=0).reshape(-1)
+    total_b = counts_b.sum(axis=0).reshape(-1)
+
+    observed = np.abs(calc_metrics(counts_a.sum(axis=0, keepdims=True))[0, 2] -
+                      calc_metrics(counts_b.sum(axis=0, keepdims=True))[0, 2])
+    n_extreme = np.zeros(observed.shape)
+    for start in xrange(0, n_trials, chunk_size):
+        n = min(chunk_size, n_trials - start)
+        shift = (rng.rand(n, n_samples) < 0.5).astype('float32').dot(diff)
+        f1_a = calc_metrics((total_a + shift).reshape((n,) + shape))[:, 2]
+        f1_b = calc_metrics((total_b - shift).reshape((n,) + shape))[:, 2]
+        n_extreme += np.sum(np.abs(f1_a - f1_b) >= observed - 1e-7, axis=0)
+    return (n_extreme + 1.) / (n_trials + 1.)
+
+
+def show_significance(sample_counts, n_resamples=10000, seed=0, alpha=0.05):
+    """
+    Show P/R/F1 with the bootstrap confidence intervals of each system, and if there are two systems,
+    the F1 difference with its interval and the p-values of the paired bootstrap and the approximate
+    randomization tests.
+    """
+    names = get_group_names()
+    bounds = [100. * alpha / 2., 100. * (1. - alpha / 2.)]
+    resampled = paired_bootstrap(sample_counts, n_resamples, seed)
+
+    for system_index, (counts, metrics) in enumerate(zip(sample_counts, resampled)):
+        observed = calc_metrics(counts.sum(axis=0, keepdims=True))[0]
+        lower, upper = np.percentile(metrics, bounds, axis=0)
+        say('\n\tSYSTEM-%d (%d%% CI)\n' % (system_index, int(100 * (1. - alpha))))
+        for group_index, name in enumerate(names):
+            say('\t{:<8}'.format(name))
+            for metric_index, metric_name in enumerate(METRIC_NAMES):
+                say('  {}:{:>7.2%} [{:>7.2%}, {:>7.2%}]'.format(metric_name,
+                                                                observed[metric_index, group_index],
+                                                                lower[metric_index, group_index],
+                                                                upper[metric_index, group_index]))
+            say('\n')
+
+    if len(sample_counts) != 2:
+        return
+
+    counts_a, counts_b = sample_counts
+    delta = (calc_metrics(counts_a.sum(axis=0, keepdims=True)) -
+             calc_metrics(counts_b.sum(axis=0, keepdims=True)))[0, 2]
+    resampled_delta = resampled[0][:, 2] - resampled[1][:, 2]
+    lower, upper = np.percentile(resampled_delta, bounds, axis=0)
+    # two-sided: how often the resampled difference falls on the other side of zero
+    p_bootstrap = np.minimum(2. * np.minimum(np.mean(resampled_delta <= 0., axis=0),
+                                             np.mean(resampled_delta >= 0., axis=0)), 1.)
+    p_randomization = approximate_randomization(counts_a, counts_b, n_resamples, seed)
+
+    say('\n\tSYSTEM-0 - SYSTEM-1\n')
+    for group_index, name in enumerate(names):
+        say('\t{:<8}  F:{:>+8.2%} [{:>+8.2%}, {:>+8.2%}]  p(bootstrap):{:.4f}  p(randomization):{:.4f}\n'.format(
+            name, delta[group_index], lower[group_index], upper[group_index],
+            p_bootstrap[group_index], p_randomization[group_index]))
@@ -13,6 +13,9 @@ INTRA_ZERO = 2
 INTER_ZERO = 3
 EXO = 4
 
+# POS of the words regarded as predicates in unannotated text: verb, adjective, copula
+PRD_POS = [u'\u52d5\u8a5e', u'\u5f62\u5bb9\u8a5e', u'\u5224\u5b9a\u8a5e']
+
 
 """
     An example of the pas_info:
@@ -25,6 +28,7 @@ class Word(object):
     def __init__(self, index, elem, file_encoding='utf-8'):
         self.index = index
         self.form = elem[0].decode(file_encoding)
+        self.pos = elem[3].decode(file_encoding) if len(elem) > 4 else u'_'
         self.pas_info = elem[-1].decode(file_encoding).split('/')
         self.alt = self._set_alt(self.pas_info)
 
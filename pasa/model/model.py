@@ -4,16 +4,17 @@ from abc import ABCMeta, abstractmethod
 from ..utils.io_utils import say
 from ..nn.layers import Layer, EmbeddingLayer, SoftmaxLayer, StackedBiRNNLayers, GridNetwork
 from ..nn.nn_utils import L2_sqr, tanh
-from ..nn.optimizers import ada_grad, ada_delta, adam, sgd
+from ..nn.optimizers import ada_grad, ada_delta, adam, sgd, sparse_emb_grads
 
 
 class Model(object):
     __metaclass__ = ABCMeta
 
-    def __init__(self, argv, emb, n_vocab, n_labels):
+    def __init__(self, argv, emb, n_vocab, n_labels, frozen_emb=None):
 
         self.argv = argv
         self.emb = emb
+        self.frozen_emb = frozen_emb
         self.n_vocab = n_vocab
         self.n_labels = n_labels
 
@@ -28,6 +29,7 @@ class Model(object):
         ####################
         self.y_prob = None
         self.y_gold = None
+        self.y_soft = None
         self.y_pred = None
         self.nll = None
         self.cost = None
@@ -55,20 +57,45 @@ class Model(object):
             self.params.extend(l.params)
         say("No. of parameters: {}\n".format(sum(len(x.get_value(borrow=True).ravel()) for x in self.params)))
 
-    def optimize(self, cost, opt, lr):
+    def get_emb_lookups(self):
+        """
+        :return: 1D: n_lookups; elem=(trainable emb, word ids, looked-up embeddings, offset of the ids)
+        """
+        lookups = []
+        for layer in self.emb_layers:
+            if isinstance(layer, EmbeddingLayer) and layer.emb in layer.params:
+                for x, e in layer.lookups:
+                    lookups.append((layer.emb, x, e, layer.offset))
+        return lookups
+
+    def optimize(self, cost, opt, lr, grads=None):
+        """
+        :param grads: gradients of the params; computed from the cost if None
+        """
         params = self.params
+        sparse_grads = None
+        if grads is None and self.argv.sparse_emb and opt in ['adagrad', 'adam']:
+            sparse_grads = sparse_emb_grads(cost=cost, lookups=self.get_emb_lookups(), reg=self.argv.reg)
+            emb_params = [emb for emb, rows, g in sparse_grads]
+            params = [p for p in params if p not in emb_params]
+
         if opt == 'adagrad':
-            return ada_grad(cost=cost, params=params, lr=lr)
+            return ada_grad(cost=cost, params=params, lr=lr, grads=grads, sparse_grads=sparse_grads)
         elif opt == 'ada_delta':
-            return ada_delta(cost=cost, params=params)
+            return ada_delta(cost=cost, params=params, grads=grads)
         elif opt == 'adam':
-            return adam(cost=cost, params=params)
-        return sgd(cost=cost, params=params, lr=lr)
+            return adam(cost=cost, params=params, grads=grads, sparse_grads=sparse_grads)
+        return sgd(cost=cost, params=params, lr=lr, grads=grads)
 
     def objective_f(self, o, reg):
         p_y = self.output_layer.get_y_prob(o, self.y_gold.dimshuffle((1, 0)))
         nll = - T.mean(p_y)
-        cost = nll + reg * L2_sqr(self.params) / 2.
+        loss = nll
+        if self.y_soft is not None:
+            # cross entropy with the label distributions of a teacher model; o: log probabilities
+            soft_nll = - T.mean(T.sum(self.y_soft.dimshuffle(1, 0, 2) * o, axis=[0, 2]))
+            loss = (1. - self.argv.soft_weight) * nll + self.argv.soft_weight * soft_nll
+        cost = loss + reg * L2_sqr(self.params) / 2.
         return nll, cost
 
 
@@ -77,13 +104,19 @@ class BaseModel(Model):
     def compile(self, variables):
         argv = self.argv
 
-        x = variables[:-1]
-        y = variables[-1]
+        if argv.load_soft:
+            # y_soft: 1D: batch, 2D: n_words, 3D: n_labels; label probability of a teacher model
+            x = variables[:-2]
+            y = variables[-2]
+            self.y_soft = variables[-1]
+        else:
+            x = variables[:-1]
+            y = variables[-1]
 
         ###################
         # Input variables #
         ###################
-        self.inputs = x + [y]
+        self.inputs = list(variables)
         self.x = x
 
         self.set_layers()
@@ -122,7 +155,7 @@ class BaseModel(Model):
         dim_out = self.n_labels
 
         self.emb_layers.append(EmbeddingLayer(init_emb=self.emb, n_vocab=self.n_vocab, dim_emb=dim_emb,
-                                              fix=argv.fix, pad=1))
+                                              fix=argv.fix, pad=1, frozen_emb=self.frozen_emb))
         if len(self.x) > 1:
             self.emb_layers.append(EmbeddingLayer(init_emb=None, n_vocab=2, dim_emb=dim_posit, fix=argv.fix, pad=0))
         self.emb_layers.append(Layer(n_in=dim_in, n_h=dim_h))
@@ -171,9 +204,16 @@ class GridModel(Model):
         # x_p: 1D: batch, 2D: n_prds, 3D: n_words; posit id
         # y: 1D: batch, 2D: n_prds, 3D: n_words; elem=label id
 
-        x = variables[:-1]
-        y = variables[-1]
-        self.inputs = x + [y]
+        if argv.load_soft:
+            # y_soft: 1D: batch, 2D: n_prds, 3D: n_words, 4D: n_labels; label probability of a teacher model
+            x = variables[:-2]
+            y = variables[-2]
+            y_soft = variables[-1]
+            self.y_soft = y_soft.reshape((y_soft.shape[0] * y_soft.shape[1], y_soft.shape[2], y_soft.shape[3]))
+        else:
+            x = variables[:-1]
+            y = variables[-1]
+        self.inputs = list(variables)
         self.x = x
 
         self.set_layers()
@@ -201,7 +241,7 @@ class GridModel(Model):
         dim_out = self.n_labels
 
         self.emb_layers.append(EmbeddingLayer(init_emb=self.emb, n_vocab=self.n_vocab, dim_emb=dim_emb,
-                                              fix=argv.fix, pad=1))
+                                              fix=argv.fix, pad=1, frozen_emb=self.frozen_emb))
         if len(self.x) > 1:
             self.emb_layers.append(EmbeddingLayer(init_emb=None, n_vocab=2, dim_emb=dim_posit, fix=argv.fix, pad=0))
         self.emb_layers.append(Layer(n_in=dim_in, n_h=dim_h))
@@ -2,15 +2,21 @@ import math
 import sys
 import time
 
+import numpy as np
 import theano
 import theano.tensor as T
 
 from abc import ABCMeta, abstractmethod
 from model_io import IOManager
+from numpy_model import NumpyModel
 from model import BaseModel, GridModel
+from parallel import DataParallelTrainer, HogwildTrainer
 from ..decoder.decoder import Decoder
-from ..experimenter.evaluator import SampleEval, BatchEval, PrdEval
+from ..preprocessor.sample import get_prd_chunks
+from ..experimenter.evaluator import SampleEval, BatchEval, PrdEval, eval_in_shards
 from ..utils.io_utils import say
+from ..utils.cache import get_fingerprint
+from ..utils.profiler import PROFILER
 
 
 class ModelAPI(object):
@@ -19,6 +25,7 @@ class ModelAPI(object):
     def __init__(self, argv):
         self.argv = argv
         self.emb = None
+        self.frozen_emb = None
         self.vocab_word = None
         self.vocab_label = None
 
@@ -28,18 +35,36 @@ class ModelAPI(object):
 
         self.train = None
         self.predict = None
+        self.grad = None
+        self.sparse_grad = None
+        self.apply = None
+        self.parallel = None
 
-    def compile(self, vocab_word, vocab_label, init_emb=None):
+        # arrays which the outputs of predict depend on, and the cache of the outputs
+        self.predict_values = []
+        self.predict_cache = None
+        self.fingerprint = None
+
+    def compile(self, vocab_word, vocab_label, init_emb=None, frozen_emb=None):
         say('\n\nBuilding a model API...\n')
         self.emb = init_emb
+        self.frozen_emb = frozen_emb
+        self.compile_io(vocab_word, vocab_label)
+        with PROFILER.timer('build_graph'):
+            self._set_model()
+
+    def compile_io(self, vocab_word, vocab_label):
+        """
+        Set up the decoder and the io manager without building the theano graph;
+        enough to predict with the NumPy engine (load_numpy_model).
+        """
         self.vocab_word = vocab_word
         self.vocab_label = vocab_label
-        self._set_model()
         self._set_decoder()
         self._set_io_manager()
 
     @abstractmethod
-    def _set_model(self):
+    def _set_model(self, variables=None):
         raise NotImplementedError
 
     def _set_decoder(self):
@@ -60,17 +85,155 @@ class ModelAPI(object):
 
     def set_train_f(self):
         model = self.model
-        self.train = theano.function(inputs=model.inputs,
-                                     outputs=[model.y_pred, model.y_gold, model.nll],
-                                     updates=model.update
-                                     )
+        self.train = self._compile_function('train',
+                                            inputs=model.inputs,
+                                            outputs=[model.y_pred, model.y_gold, model.nll],
+                                            updates=model.update)
+
+    def set_grad_f(self):
+        model = self.model
+        grads = T.grad(model.cost, model.params)
+        self.grad = self._compile_function('grad',
+                                           inputs=model.inputs,
+                                           outputs=[model.y_pred, model.y_gold, model.nll] + grads)
+
+    def set_apply_f(self):
+        model = self.model
+        grads = [p.type() for p in model.params]
+        self.apply = self._compile_function('apply',
+                                            inputs=grads,
+                                            outputs=[],
+                                            updates=model.optimize(cost=None, opt=self.argv.opt, lr=self.argv.lr,
+                                                                   grads=grads))
+
+    def set_sparse_grad_f(self):
+        """
+        The embeddings get the gradients of the looked-up rows only, along with the word ids of the rows.
+        Outputs: y_pred, y_gold, nll, grads of the other params, and (ids, grads) of each lookup.
+        """
+        model = self.model
+        lookups = model.get_emb_lookups()
+        emb_params = [emb for emb, x, e, offset in lookups]
+        params = [p for p in model.params if p not in emb_params]
+        grads = T.grad(model.cost, params + [e for emb, x, e, offset in lookups])
+
+        emb_outputs = []
+        for (emb, x, e, offset), g in zip(lookups, grads[len(params):]):
+            emb_outputs.extend([x.flatten(), g.reshape((-1, e.shape[-1]))])
+
+        self.sparse_grad = self._compile_function('sparse_grad',
+                                                  inputs=model.inputs,
+                                                  outputs=[model.y_pred, model.y_gold, model.nll] + grads[:len(params)] +
+                                                  emb_outputs)
+
+    def set_parallel_trainer(self, n_workers):
+        """
+        Train with n_workers processes; must be called after compile().
+        """
+        self.parallel = self._select_parallel_trainer(self.argv)(self, n_workers)
+
+    @staticmethod
+    def _select_parallel_trainer(argv):
+        if argv.parallel == 'hogwild':
+            return HogwildTrainer
+        return DataParallelTrainer
 
     def set_predict_f(self):
         model = self.model
         outputs = self._select_outputs(self.argv, model)
-        self.predict = theano.function(inputs=model.x,
-                                       outputs=outputs,
-                                       )
+        self.predict = self._compile_function('predict', inputs=model.x, outputs=outputs)
+        self._set_predict_values(self._get_model_values(model))
+
+    @staticmethod
+    def _get_model_values(model):
+        values = list(model.params)
+        for layer in model.emb_layers:
+            if getattr(layer, 'frozen', None) is not None:
+                values.append(layer.frozen)
+        return values
+
+    def set_ensemble_predict_f(self, param_fns):
+        """
+        Compile one predict function over the models of all the parameter files.
+        The models read the same input variables, and their log probabilities are averaged.
+        """
+        variables = self._get_input_tensor_variables()
+        y_probs = []
+        values = []
+        for fn in param_fns:
+            self._set_model(variables)
+            self.load_params(fn)
+            y_probs.append(self._select_outputs(self.argv, self.model)[0])
+            values.extend(self._get_model_values(self.model))
+
+        self.predict = self._compile_function('predict', inputs=self.model.x, outputs=[T.mean(T.stack(y_probs), axis=0)])
+        self._set_predict_values(values)
+
+    @staticmethod
+    def _compile_function(name, inputs, outputs, updates=None):
+        """
+        :return: the compiled theano function; its calls are timed as <name>_step when profiling
+        """
+        with PROFILER.timer('compile'):
+            f = theano.function(inputs=inputs, outputs=outputs, updates=updates,
+                                profile=PROFILER.get_theano_profile(name))
+        return PROFILER.timed(name + '_step', f)
+
+    def set_predict_cache(self, cache):
+        """
+        Cache the outputs of predict by the sample key and the fingerprint of the current parameters,
+        which must stay fixed until predict is set again.
+        """
+        self.predict_cache = cache
+        self._set_predict_values(self.predict_values)
+
+    def _set_predict_values(self, values):
+        self.predict_values = values
+        if self.predict_cache is not None:
+            self.fingerprint = get_fingerprint(self._get_predict_options() + values)
+
+    def _get_predict_options(self):
+        """
+        :return: the options besides the parameters which the outputs of predict depend on
+        """
+        return [self.argv.model, self.argv.unit]
+
+    def _predict_prob(self, sample):
+        """
+        :return: 1D: n_prds, 2D: n_words, 3D: n_labels; log probability of a label
+        """
+        prob = self._get_cached_prob(sample)
+        if prob is None:
+            prob = self._predict_stacked([sample])[0]
+            self._cache_prob(sample, prob)
+        return prob
+
+    def _predict_stacked(self, samples):
+        """
+        :param samples: samples with the same bucket key, each including at least one predicate
+        :return: 1D: n_samples, 2D: n_prds, 3D: n_words, 4D: n_labels; log probability of a label
+        """
+        inputs = self._format_inputs(samples[0]) if len(samples) == 1 else self._stack_inputs(samples)
+        # 1D: n_samples * n_prds, 2D: n_words, 3D: n_labels
+        output_prob = self.predict(*inputs)[0]
+        probs = []
+        offset = 0
+        for sample in samples:
+            probs.append(output_prob[offset: offset + sample.n_prds])
+            offset += sample.n_prds
+        return probs
+
+    def _get_cached_prob(self, sample):
+        if self.predict_cache is None or sample.key is None:
+            return None
+        return self.predict_cache.get((sample.key, self.fingerprint))
+
+    def _cache_prob(self, sample, prob):
+        if self.predict_cache is None or sample.key is None:
+            return
+        # copy, so that a slice of a batch does not keep the whole batch in memory
+        prob = np.array(prob)
+        self.predict_cache.put((sample.key, self.fingerprint), prob, prob.nbytes)
 
     @abstractmethod
     def _get_input_tensor_variables(self):
@@ -88,23 +251,32 @@ class ModelAPI(object):
     def train_one_epoch(self, batch):
         train_eval = BatchEval()
         start = time.time()
-        batch.shuffle_batches()
+        indices = batch.sample_batches()
 
-        for index, one_batch in enumerate(batch.batches):
+        for index, (result_sys, result_gold, nll) in self._train_batches([batch.batches[i] for i in indices]):
             if index != 0 and index % 1000 == 0:
                 print index,
                 sys.stdout.flush()
 
-            result_sys, result_gold, nll = self.train(*one_batch)
             assert not math.isnan(nll), 'NLL is NAN: Index: %d' % index
 
             train_eval.update_results(result_sys, result_gold)
             train_eval.nll += nll
+            batch.update_loss(indices[index], nll)
+            PROFILER.count('train_batches')
 
         print '\tTime: %f' % (time.time() - start)
-        train_eval.nll /= float(len(batch.batches))
+        train_eval.nll /= float(len(indices))
         train_eval.show_results()
 
+    def _train_batches(self, batches):
+        """
+        :return: generator of (batch index, (y_pred, y_gold, nll))
+        """
+        if self.parallel is not None:
+            return self.parallel.train(batches)
+        return ((index, self.train(*one_batch)) for index, one_batch in enumerate(batches))
+
     def predict_one_epoch(self, samples):
         results = []
         start = time.time()
@@ -117,29 +289,75 @@ class ModelAPI(object):
             if sample.n_prds == 0:
                 outputs = []
             else:
-                model_outputs = self.predict(*self._format_inputs(sample))
-                outputs = self.decoder.decode(output_prob=model_outputs[0], prd_indices=sample.prd_indices)
+                output_prob = self._predict_prob(sample)
+                with PROFILER.timer('decode'):
+                    outputs = self.decoder.decode(output_prob=output_prob, prd_indices=sample.prd_indices)
+            PROFILER.count('predicted_samples')
 
             results.append(outputs)
 
         print '\tTime: %f' % (time.time() - start)
         return results
 
-    @staticmethod
-    def eval_one_epoch(batch_y_hat, samples):
-        pred_eval = SampleEval()
-#        prd_eval = PrdEval()
-        assert len(batch_y_hat) == len(samples)
-        for result, sample in zip(batch_y_hat, samples):
-            if len(result) == 0:
-                continue
-            pred_eval.update_results(y_sys_batch=result, sample=sample)
-#            prd_eval.update_results(y_sys_batch=result, sample=sample)
+    def predict_probs(self, samples):
+        """
+        :return: 1D: n_samples, 2D: n_prds, 3D: n_words, 4D: n_labels; log probability of a label
+        """
+        n_labels = self.vocab_label.size()
+        results = []
+        for sample in samples:
+            if sample.n_prds == 0:
+                results.append(np.zeros((0, sample.n_words, n_labels), dtype=theano.config.floatX))
+            else:
+                results.append(self._predict_prob(sample))
+        return results
 
+    def predict_samples(self, samples):
+        """
+        :param samples: samples with the same bucket key, each including at least one predicate
+        :return: 1D: n_samples, 2D: n_prds, 3D: n_words; label id
+        """
+        probs = [self._get_cached_prob(sample) for sample in samples]
+        missed = [index for index, prob in enumerate(probs) if prob is None]
+        if missed:
+            for index, prob in zip(missed, self._predict_stacked([samples[index] for index in missed])):
+                probs[index] = prob
+                self._cache_prob(samples[index], prob)
+
+        PROFILER.count('predicted_samples', len(samples))
+        with PROFILER.timer('decode'):
+            return [self.decoder.decode(output_prob=prob, prd_indices=sample.prd_indices)
+                    for prob, sample in zip(probs, samples)]
+
+    @abstractmethod
+    def get_bucket_key(self, sample):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _stack_inputs(self, samples):
+        raise NotImplementedError
+
+    def eval_one_epoch(self, batch_y_hat, samples):
+        pred_eval = self.get_sample_eval(batch_y_hat, samples)
+#        prd_eval = PrdEval()
         pred_eval.show_results()
 #        prd_eval.show_results()
         return pred_eval.all_f1
 
+    def get_sample_eval(self, batch_y_hat, samples):
+        assert len(batch_y_hat) == len(samples)
+        with PROFILER.timer('eval'):
+            return eval_in_shards(evaluator_class=SampleEval,
+                                  update=self._update_sample_eval,
+                                  items=zip(batch_y_hat, samples),
+                                  n_workers=self.argv.eval_workers)
+
+    @staticmethod
+    def _update_sample_eval(pred_eval, item):
+        result, sample = item
+        if len(result) > 0:
+            pred_eval.update_results(y_sys_batch=result, sample=sample)
+
     def save_model(self):
         self.io_manager.save_model(self.model)
 
@@ -149,50 +367,116 @@ class ModelAPI(object):
     def save_outputs(self, results):
         self.io_manager.save_outputs(results)
 
+    def save_sample_counts(self, sample_counts):
+        self.io_manager.save_sample_counts(sample_counts)
+
+    def save_result_columns(self, columns):
+        self.io_manager.save_result_columns(columns)
+
     def load_params(self, fn):
         self.model = self.io_manager.load_params(self.model, fn)
 
+    def export_numpy_model(self, quantize=False):
+        self.io_manager.export_numpy_model(self.model, quantize)
+
+    def load_numpy_model(self, fn, quantize=False):
+        """
+        Predict with the NumPy engine of an exported model instead of a compiled theano function.
+        :param quantize: predict with the int8 weights of a float model
+        """
+        engine = NumpyModel(fn, quantize)
+        self.predict = PROFILER.timed('predict_step', engine.predict)
+        self._set_predict_values(engine.get_values())
+
 
 class BaseModelAPI(ModelAPI):
 
-    def _set_model(self):
+    def _set_model(self, variables=None):
         self.model = BaseModel(argv=self.argv,
                                emb=self.emb,
                                n_vocab=self.vocab_word.size(),
-                               n_labels=self.vocab_label.size())
-        self.model.compile(self._get_input_tensor_variables())
+                               n_labels=self.vocab_label.size(),
+                               frozen_emb=self.frozen_emb)
+        self.model.compile(variables if variables is not None else self._get_input_tensor_variables())
 
     def _get_input_tensor_variables(self):
         # x_w: 1D: batch, 2D: n_words, 3D: 5 + window; word id
         # x_p: 1D: batch, 2D: n_words; posit id
         # y: 1D: batch, 2D: n_words; label id
+        # y_soft: 1D: batch, 2D: n_words, 3D: n_labels; label probability of a teacher model
         if self.argv.mark_phi:
-            return [T.itensor3('x_w'), T.imatrix('x_p'), T.imatrix('y')]
-        return [T.itensor3('x_w'), T.imatrix('y')]
+            variables = [T.itensor3('x_w'), T.imatrix('x_p'), T.imatrix('y')]
+        else:
+            variables = [T.itensor3('x_w'), T.imatrix('y')]
+        if self.argv.load_soft:
+            variables.append(T.ftensor3('y_soft'))
+        return variables
 
     def _format_inputs(self, sample):
         return sample.x
 
+    def get_bucket_key(self, sample):
+        return sample.n_words
+
+    def _stack_inputs(self, samples):
+        return [np.concatenate([sample.x[i] for sample in samples]) for i in xrange(len(samples[0].x))]
+
 
 class GridModelAPI(ModelAPI):
 
-    def _set_model(self):
+    def _set_model(self, variables=None):
         self.model = GridModel(argv=self.argv,
                                emb=self.emb,
                                n_vocab=self.vocab_word.size(),
-                               n_labels=self.vocab_label.size())
-        self.model.compile(self._get_input_tensor_variables())
+                               n_labels=self.vocab_label.size(),
+                               frozen_emb=self.frozen_emb)
+        self.model.compile(variables if variables is not None else self._get_input_tensor_variables())
 
     def _get_input_tensor_variables(self):
         # x_w: 1D: batch, 2D: n_prds, 3D: n_words, 4D: 5 + window; elem=word id
         # x_p: 1D: batch, 2D: n_prds, 3D: n_words; elem=posit id
         # y: 1D: batch, 2D: n_prds, 3D: n_words; elem=label id
+        # y_soft: 1D: batch, 2D: n_prds, 3D: n_words, 4D: n_labels; label probability of a teacher model
         if self.argv.mark_phi:
-            return [T.itensor4('x_w'), T.itensor3('x_p'), T.itensor3('y')]
-        return [T.itensor4('x_w'), T.itensor3('y')]
+            variables = [T.itensor4('x_w'), T.itensor3('x_p'), T.itensor3('y')]
+        else:
+            variables = [T.itensor4('x_w'), T.itensor3('y')]
+        if self.argv.load_soft:
+            variables.append(T.ftensor4('y_soft'))
+        return variables
 
     def _format_inputs(self, sample):
         inputs = []
         for x in sample.x:
             inputs.append([x])
         return inputs
+
+    def get_bucket_key(self, sample):
+        return sample.n_prds, sample.n_words
+
+    def _get_predict_options(self):
+        # the predicate chunks change the outputs of the sentences of more than max_prds predicates
+        return super(GridModelAPI, self)._get_predict_options() + [self.argv.max_prds, self.argv.prd_overlap]
+
+    def _predict_stacked(self, samples):
+        """
+        The samples of more than max_prds predicates are predicted chunk by chunk, and each predicate takes
+        the outputs of the chunk which owns it.
+        """
+        n_prds = samples[0].n_prds
+        chunks = get_prd_chunks(n_prds, self.argv.max_prds, self.argv.prd_overlap)
+        if len(chunks) == 1:
+            return super(GridModelAPI, self)._predict_stacked(samples)
+
+        assert all(sample.n_prds == n_prds for sample in samples)
+        # 1D: n_samples, 2D: n_chunks, 3D: n_own_prds, 4D: n_words, 5D: n_labels
+        probs = [[] for sample in samples]
+        for first, last, own_first, own_last in chunks:
+            chunk_probs = super(GridModelAPI, self)._predict_stacked([sample.get_prd_chunk(first, last)
+                                                                      for sample in samples])
+            for prob, chunk_prob in zip(probs, chunk_probs):
+                prob.append(chunk_prob[own_first - first: own_last - first])
+        return [np.concatenate(prob) for prob in probs]
+
+    def _stack_inputs(self, samples):
+        return [np.asarray([sample.x[i] for sample in samples]) for i in xrange(len(samples[0].x))]
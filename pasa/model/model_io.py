@@ -2,7 +2,10 @@ import os
 import gzip
 import cPickle as pickle
 
-from ..utils.io_utils import move_data
+import numpy as np
+
+from numpy_model import export_model
+from ..utils.io_utils import move_data, BulkWriter
 
 
 class IOManager(object):
@@ -66,17 +69,28 @@ class IOManager(object):
             for l, p in zip(model.layers, params):
                 for p1, p2 in zip(l.params, p):
                     p1.set_value(p2.get_value(borrow=True))
+                if len(p) > len(l.params):
+                    l.set_frozen_value(p[-1].get_value(borrow=True))
         return model
 
     def _save_params(self, model, fn, output_dir):
         fn = 'param.' + fn
         fn = self._check_identifier(fn)
         with gzip.open(fn, "w") as fout:
-            pickle.dump([l.params for l in model.layers], fout,
+            pickle.dump([self._get_layer_values(l) for l in model.layers], fout,
                         protocol=pickle.HIGHEST_PROTOCOL)
         output_dir += 'param'
         move_data(fn, output_dir)
 
+    @staticmethod
+    def _get_layer_values(layer):
+        """
+        The frozen embeddings are saved after the params, so that they are restored at test time.
+        """
+        if getattr(layer, 'frozen', None) is not None:
+            return layer.params + [layer.frozen]
+        return layer.params
+
     def _save_config(self, fn, output_dir):
         fn = 'config.' + fn
         fn = self._check_identifier(fn)
@@ -86,6 +100,28 @@ class IOManager(object):
         output_dir += 'config'
         move_data(fn, output_dir)
 
+    def export_numpy_model(self, model, quantize=False):
+        fn = 'numpy.' + self.output_fn + ('.int8' if quantize else '') + '.npz'
+        export_model(model, self.argv, fn, quantize)
+        move_data(fn, self.output_dir + 'numpy')
+
+    def save_sample_counts(self, sample_counts):
+        """
+        :param sample_counts: key: data name (dev/test), value: see significance.get_sample_counts
+        """
+        fn = 'counts.' + self.output_fn + '.npz'
+        np.savez(fn, **sample_counts)
+        move_data(fn, self.output_dir + 'counts')
+
+    def save_result_columns(self, columns):
+        """
+        :param columns: key: data name (dev/test), value: see columns.get_result_columns
+        """
+        for name, data_columns in columns.items():
+            fn = 'columns.%s.%s.npz' % (name, self.output_fn)
+            np.savez(fn, **data_columns)
+            move_data(fn, self.output_dir + 'columns')
+
     def save_outputs(self, results):
         self._save_results(results)
 
@@ -100,62 +136,52 @@ class IOManager(object):
 
     def save_pas_results(self, results, samples):
         fn = 'pas.' + self.output_fn + '.txt'
-        self._output_analyzed_pas(fn, results, samples)
-        output_dir = self.output_dir + 'pas'
-        move_data(fn, output_dir)
+        if self.argv.gzip_pas:
+            fn += '.gz'
+        self._output_analyzed_pas(os.path.join(self.output_dir + 'pas', fn), results, samples)
 
-    def _output_analyzed_pas(self, fn, results, samples):
+    def _output_analyzed_pas(self, path, results, samples):
         assert len(results) == len(samples)
-        with open(fn, 'w') as fout:
+        with BulkWriter(path, compress=self.argv.gzip_pas) as writer:
             for result, sample in zip(results, samples):
-                text = self._generate_sent_info(sample.sent)
-                fout.writelines(text.encode('utf-8'))
-                text = self._generate_analyzed_pas_info(result, sample)
-                fout.writelines(text.encode('utf-8'))
+                writer.write(self.format_pas_result(result, sample))
+
+    def format_pas_result(self, result, sample):
+        """
+        :return: the sentence and its analyzed PAS, as one record of the pas.*.txt files
+        """
+        return self._generate_sent_info(sample.sent) + self._generate_analyzed_pas_info(result, sample)
 
     def _generate_analyzed_pas_info(self, result_sys, sample):
         sent = sample.sent
         prds = [sent[prd_index] for prd_index in sample.prd_indices]
         assert len(result_sys) == len(prds)
 
-        text = ''
+        lines = []
         for prd_i, (r_s, prd) in enumerate(zip(result_sys, prds)):
             prd_index = sample.prd_indices[prd_i]
             prd = sent[prd_index]
-            text += '#\tPRD\t%d:%s\n' % (prd_index, prd.form)
-            text += '*\tGold\t'
-            text += self._generate_analyzed_pas_info_gold(sent, prd)
-            text += '\n*\tSys\t'
-            text += self._generate_analyzed_pas_info_sys(sent, r_s)
-            text += '\n'
-        text += '\n'
-        return text
+            lines.append(u'#\tPRD\t%d:%s\n' % (prd_index, prd.form))
+            if sample.y is not None:
+                lines.append(u'*\tGold\t%s\n' % self._generate_analyzed_pas_info_gold(sent, prd))
+            lines.append(u'*\tSys\t%s\n' % self._generate_analyzed_pas_info_sys(sent, r_s))
+        lines.append(u'\n')
+        return u''.join(lines)
 
     def _generate_analyzed_pas_info_gold(self, sent, prd):
-        text = ''
-        for case_index, index in enumerate(prd.arg_indices):
-            if index > -1:
-                word = sent[index]
-                text += '%s:%d:%s ' % (self.vocab_label.get_word(case_index+1), word.index, word.form)
-        return text
+        return u''.join([u'%s:%d:%s ' % (self.vocab_label.get_word(case_index + 1), sent[index].index, sent[index].form)
+                         for case_index, index in enumerate(prd.arg_indices) if index > -1])
 
     def _generate_analyzed_pas_info_sys(self, sent, labels):
-        text = ''
-        for word, label in zip(sent, labels):
-            if 0 < label < 4:
-                text += '%s:%d:%s ' % (self.vocab_label.get_word(label), word.index, word.form)
-        return text
+        return u''.join([u'%s:%d:%s ' % (self.vocab_label.get_word(label), word.index, word.form)
+                         for word, label in zip(sent, labels) if 0 < label < 4])
 
     def _generate_sent_info(self, sent):
-        text = ''
+        lines = []
         for word in sent:
-            for info in self._generate_word_info(word):
-                if type(info) == int:
-                    text += '%d\t' % info
-                else:
-                    text += '%s\t' % info
-            text += '\n'
-        return text
+            lines.extend([(u'%d\t' if type(info) == int else u'%s\t') % info for info in self._generate_word_info(word)])
+            lines.append(u'\n')
+        return u''.join(lines)
 
     @staticmethod
     def _generate_word_info(word):
@@ -163,13 +189,11 @@ class IOManager(object):
 
     def save_stats_test_format(self, results, samples):
         fn = 'stats.' + self.output_fn + '.txt'
-        self._output_stats_format(fn, results, samples)
-        output_dir = self.output_dir + 'stats'
-        move_data(fn, output_dir)
+        self._output_stats_format(os.path.join(self.output_dir + 'stats', fn), results, samples)
 
-    def _output_stats_format(self, fn, results, samples):
+    def _output_stats_format(self, path, results, samples):
         assert len(results) == len(samples)
-        with open(fn, 'w') as fout:
+        with BulkWriter(path) as writer:
             for result, sample in zip(results, samples):
                 sent = sample.sent
                 for prd_result, prd_answer, prd_index in zip(result, sample.y, sample.prd_indices):
@@ -182,8 +206,7 @@ class IOManager(object):
                             arg_type = 'inner'
                         case_name1 = self._get_case_name(case_index1)
                         case_name2 = self._get_case_name(case_index2)
-                        text = '%s %s %s\n' % (case_name1, arg_type, case_name2)
-                        fout.writelines(text.encode('utf-8'))
+                        writer.write(u'%s %s %s\n' % (case_name1, arg_type, case_name2))
 
     @staticmethod
     def _get_case_name(case_index):
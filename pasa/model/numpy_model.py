@@ -0,0 +1,323 @@
+import json
+
+import numpy as np
+
+GRU_PARAMS = ['W_xr', 'W_hr', 'W_xz', 'W_hz', 'W_xh', 'W_hh']
+LSTM_PARAMS = ['W_xi', 'W_hi', 'W_ci', 'W_xf', 'W_hf', 'W_cf', 'W_xc', 'W_hc', 'W_xo', 'W_ho', 'W_co']
+
+
+def export_model(model, argv, fn, quantize=False):
+    """
+    Write the parameters and the architecture of a BaseModel/GridModel into an npz file,
+    which NumpyModel loads without theano.
+    :param quantize: store the weight matrices of the RNN and the output layers as int8
+    """
+    unit = 'gru' if argv.model == 'grid' else argv.unit.lower()
+    arch = {'model': argv.model,
+            'unit': unit,
+            'layers': argv.layers,
+            'res': argv.res,
+            'mark_phi': len(model.x) > 1}
+
+    arrays = {'word_emb': _get_emb_table(model.emb_layers[0]),
+              'W_in': model.emb_layers[-1].W.get_value(),
+              'W_out': model.output_layer.W.get_value()}
+    if arch['mark_phi']:
+        arrays['posit_emb'] = _get_emb_table(model.emb_layers[1])
+
+    names = LSTM_PARAMS if unit == 'lstm' else GRU_PARAMS
+    for i, layer in enumerate(model.hidden_layers.layers):
+        for name, p in zip(names, layer.params):
+            arrays['rnn.%d.%s' % (i, name)] = p.get_value()
+
+    if quantize:
+        arrays = quantize_arrays(arrays)
+    arrays['arch'] = np.asarray(json.dumps(arch))
+    np.savez(fn, **arrays)
+
+
+def quantize_arrays(arrays):
+    """
+    :return: arrays where each weight matrix W of the RNN and the output layers is replaced with
+             W.q (int8) and W.scale (float32; one scale per output unit, i.e., per row of W.T)
+    """
+    quantized = {}
+    for key, value in arrays.items():
+        if is_quantizable(key, value):
+            matrix = QuantizedMatrix.quantize(value)
+            quantized[key + '.q'] = matrix.q
+            quantized[key + '.scale'] = matrix.scale
+        else:
+            quantized[key] = value
+    return quantized
+
+
+def is_quantizable(key, value):
+    # the embeddings are looked up rather than multiplied, and the peephole weights are vectors
+    return isinstance(value, np.ndarray) and value.ndim == 2 and (key.startswith('rnn.') or key == 'W_out')
+
+
+def load_arrays(data):
+    """
+    :param data: arrays written by export_model; the quantized ones are loaded as QuantizedMatrix
+    """
+    arrays = {}
+    for key in data.files:
+        if key.endswith('.q'):
+            arrays[key[:-2]] = QuantizedMatrix(data[key], data[key[:-2] + '.scale'])
+        elif not key.endswith('.scale'):
+            arrays[key] = data[key]
+    return arrays
+
+
+def _get_emb_table(emb_layer):
+    """
+    :return: the embeddings of all the ids; the padding and the frozen rows included
+    """
+    emb = emb_layer.emb.get_value()
+    tables = []
+    if emb_layer.offset:
+        tables.append(np.zeros((emb_layer.offset, emb.shape[1]), dtype=emb.dtype))
+    tables.append(emb)
+    if emb_layer.frozen is not None:
+        tables.append(emb_layer.frozen.get_value())
+    return np.concatenate(tables)
+
+
+def sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+class QuantizedMatrix(object):
+    """
+    int8 weight matrix with a float32 scale per column: W ~= q * scale.
+    The engine keeps q and scale in memory, and dequantizes W for the duration of a forward pass only.
+    """
+
+    def __init__(self, q, scale):
+        self.q = q
+        self.scale = scale
+        self.shape = q.shape
+
+    @classmethod
+    def quantize(cls, W):
+        scale = np.max(np.abs(W), axis=0) / 127.
+        scale[scale == 0.] = 1.
+        q = np.clip(np.round(W / scale), -127, 127).astype('int8')
+        return cls(q, scale.astype(W.dtype))
+
+    def dequantize(self):
+        return self.q.astype(self.scale.dtype) * self.scale
+
+
+def concat_matrices(matrices):
+    """
+    :return: the float or quantized matrices concatenated along the columns
+    """
+    if isinstance(matrices[0], QuantizedMatrix):
+        return QuantizedMatrix(np.concatenate([m.q for m in matrices], axis=1),
+                               np.concatenate([m.scale for m in matrices]))
+    return np.concatenate(matrices, axis=1)
+
+
+def get_float(W):
+    """
+    :return: W as a float matrix; NumPy has no int8 matrix product, so a QuantizedMatrix is dequantized
+    """
+    if isinstance(W, QuantizedMatrix):
+        return W.dequantize()
+    return W
+
+
+class NumpyGRU(object):
+
+    def __init__(self, params):
+        self.n_h = params['W_hh'].shape[0]
+        # one matrix product for the inputs of all the gates, and one for the recurrent r and z gates
+        self.W_x = concat_matrices([params['W_xr'], params['W_xz'], params['W_xh']])
+        self.W_h = concat_matrices([params['W_hr'], params['W_hz']])
+        self.W_hh = params['W_hh']
+
+    def forward_all(self, x, h0):
+        """
+        :param x: 1D: n_steps, 2D: batch, 3D: n_in
+        :param h0: 1D: batch, 2D: n_h
+        :return: 1D: n_steps, 2D: batch, 3D: n_h
+        """
+        n_h = self.n_h
+        # dequantized once per call rather than per step
+        W_h = get_float(self.W_h)
+        W_hh = get_float(self.W_hh)
+        x = np.dot(x, get_float(self.W_x))
+        h = np.empty(x.shape[:2] + (n_h,), dtype=h0.dtype)
+        h_tm1 = h0
+        for t in xrange(x.shape[0]):
+            rz = sigmoid(x[t, :, :2 * n_h] + np.dot(h_tm1, W_h))
+            r_t = rz[:, :n_h]
+            z_t = rz[:, n_h:]
+            h_hat_t = np.tanh(x[t, :, 2 * n_h:] + np.dot(r_t * h_tm1, W_hh))
+            h[t] = (1. - z_t) * h_tm1 + z_t * h_hat_t
+            h_tm1 = h[t]
+        return h
+
+
+class NumpyLSTM(object):
+
+    def __init__(self, params):
+        self.n_h = params['W_hi'].shape[0]
+        self.W_x = concat_matrices([params['W_xi'], params['W_xf'], params['W_xc'], params['W_xo']])
+        self.W_h = concat_matrices([params['W_hi'], params['W_hf'], params['W_hc'], params['W_ho']])
+        self.W_ci = params['W_ci']
+        self.W_cf = params['W_cf']
+        self.W_co = params['W_co']
+
+    def forward_all(self, x, h0):
+        """
+        :param x: 1D: n_steps, 2D: batch, 3D: n_in
+        :param h0: 1D: batch, 2D: n_h; also the initial memory cell
+        :return: 1D: n_steps, 2D: batch, 3D: n_h
+        """
+        n_h = self.n_h
+        W_h = get_float(self.W_h)
+        x = np.dot(x, get_float(self.W_x))
+        h = np.empty(x.shape[:2] + (n_h,), dtype=h0.dtype)
+        h_tm1 = h0
+        c_tm1 = h0
+        for t in xrange(x.shape[0]):
+            a = x[t] + np.dot(h_tm1, W_h)
+            i_t = sigmoid(a[:, :n_h] + c_tm1 * self.W_ci)
+            f_t = sigmoid(a[:, n_h: 2 * n_h] + c_tm1 * self.W_cf)
+            c_t = f_t * c_tm1 + i_t * np.tanh(a[:, 2 * n_h: 3 * n_h])
+            o_t = sigmoid(a[:, 3 * n_h:] + c_t * self.W_co)
+            h[t] = o_t * np.tanh(c_t)
+            h_tm1 = h[t]
+            c_tm1 = c_t
+        return h
+
+
+class NumpyModel(object):
+    """
+    Forward pass of an exported BaseModel/GridModel in NumPy.
+    predict() takes the same inputs as, and returns the same outputs as, the compiled predict function.
+    """
+
+    def __init__(self, fn, quantize=False):
+        """
+        :param quantize: quantize the weight matrices of a float model to int8 when loading it,
+                         to predict with the same weights as an exported int8 model
+        """
+        data = np.load(fn)
+        self.arch = json.loads(str(data['arch']))
+        arrays = load_arrays(data)
+        data.close()
+
+        del arrays['arch']
+        if quantize:
+            for key, value in arrays.items():
+                if is_quantizable(key, value):
+                    arrays[key] = QuantizedMatrix.quantize(value)
+        self.params = arrays
+
+        self.depth = self.arch['layers']
+        self.res = self.arch['res']
+        self.units = [self._create_unit(i) for i in xrange(self.depth)]
+
+    def _create_unit(self, layer_index):
+        prefix = 'rnn.%d.' % layer_index
+        params = dict((key[len(prefix):], value) for key, value in self.params.items() if key.startswith(prefix))
+        if self.arch['unit'] == 'lstm':
+            return NumpyLSTM(params)
+        return NumpyGRU(params)
+
+    def get_values(self):
+        """
+        :return: the arrays of the parameters in the order of their names
+        """
+        values = []
+        for key in sorted(self.params.keys()):
+            value = self.params[key]
+            if isinstance(value, QuantizedMatrix):
+                values.extend([key, value.q, value.scale])
+            else:
+                values.extend([key, value])
+        return values
+
+    def predict(self, *x):
+        """
+        :param x: x_w (and x_p); see ModelAPI._get_input_tensor_variables
+        :return: [y_prob]; 1D: batch (* n_prds), 2D: n_words, 3D: n_labels; log probability of a label
+        """
+        if self.arch['model'] == 'grid':
+            return [self.grid_forward(x)]
+        return [self.base_forward(x)]
+
+    def emb_layer_forward(self, x):
+        """
+        :param x: 1D: n_phi, 2D: batch, (3D: n_prds), 3D: n_words, 4D: dim_phi
+        :return: 1D: batch, (2D: n_prds), 2D: n_words, 3D: dim_h
+        """
+        x_w = x[0]
+        x_in = self.params['word_emb'][x_w].reshape(x_w.shape[:-1] + (-1,))
+        if len(x) > 1:
+            x_in = np.concatenate([x_in, self.params['posit_emb'][x[1]]], axis=-1)
+        return np.dot(x_in, self.params['W_in'])
+
+    def base_forward(self, x):
+        # 1D: n_words, 2D: batch, 3D: dim_h
+        h = self.emb_layer_forward(x).transpose(1, 0, 2)
+        h0 = np.zeros(h.shape[1:], dtype=h.dtype)
+        for unit in self.units:
+            o = unit.forward_all(h, h0)
+            if self.res:
+                h = (o + h)[::-1]
+            else:
+                h = o[::-1]
+        if (self.depth % 2) == 1:
+            h = h[::-1]
+        return self.output_layer_forward(h).transpose(1, 0, 2)
+
+    def grid_forward(self, x):
+        # 1D: batch, 2D: n_prds, 3D: n_words, 4D: dim_h
+        h = self.emb_layer_forward(x)
+        batch, n_prds, n_words, dim_h = h.shape
+        h0 = np.zeros((batch, dim_h), dtype=h.dtype)
+
+        # 1D: n_prds, 2D: n_words, 3D: batch, 4D: dim_h
+        h = h.transpose(1, 2, 0, 3)
+        for unit in self.units:
+            o = self.oblique_forward(unit, h, h0)
+            if self.res:
+                h = o + h
+            else:
+                h = o
+            h = h[::-1, ::-1]
+        if (self.depth % 2) == 1:
+            h = h[::-1, ::-1]
+
+        # 1D: n_words, 2D: batch * n_prds, 3D: dim_h
+        h = h.transpose(2, 0, 1, 3).reshape((batch * n_prds, n_words, dim_h)).transpose(1, 0, 2)
+        return self.output_layer_forward(h).transpose(1, 0, 2)
+
+    @staticmethod
+    def oblique_forward(unit, x, h0):
+        """
+        :param x: 1D: n_prds, 2D: n_words, 3D: batch, 4D: dim_h
+        :param h0: 1D: batch, 2D: dim_h
+        :return: 1D: n_prds, 2D: n_words, 3D: batch, 4D: dim_h
+        """
+        h = np.empty_like(x)
+        h_prev = np.zeros(x.shape[1:], dtype=x.dtype)
+        for i in xrange(x.shape[0]):
+            h[i] = unit.forward_all(np.concatenate([x[i], h_prev], axis=2), h0)
+            h_prev = h[i]
+        return h
+
+    def output_layer_forward(self, x):
+        """
+        :param x: 1D: n_words, 2D: batch, 3D: dim_h
+        :return: 1D: n_words, 2D: batch, 3D: n_labels; log probability of a label
+        """
+        h = np.dot(x, get_float(self.params['W_out']))
+        h = h - np.max(h, axis=2, keepdims=True)
+        return h - np.log(np.sum(np.exp(h), axis=2, keepdims=True))
+
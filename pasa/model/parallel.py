@@ -0,0 +1,248 @@
+import multiprocessing
+
+import numpy as np
+import theano
+
+
+def alloc_shared_arrays(shapes, n_copies=1):
+    """
+    Allocate float arrays backed by one flat buffer in shared memory.
+    Processes forked after the allocation read and write the same memory.
+
+    :param shapes: 1D: n_arrays; elem=shape
+    :return: flat: 1D: n_copies, 2D: total size; arrays: 1D: n_copies, 2D: n_arrays; elem=view of flat
+    """
+    sizes = [int(np.prod(shape)) for shape in shapes]
+    total = sum(sizes)
+    buf = multiprocessing.RawArray('b', n_copies * total * np.dtype(theano.config.floatX).itemsize)
+    flat = np.frombuffer(buf, dtype=theano.config.floatX).reshape((n_copies, total))
+    arrays = [split_flat_array(flat[i], shapes) for i in xrange(n_copies)]
+    return flat, arrays
+
+
+def split_flat_array(flat, shapes):
+    arrays = []
+    offset = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        arrays.append(flat[offset: offset + size].reshape(shape))
+        offset += size
+    return arrays
+
+
+class ParallelTrainer(object):
+
+    def __init__(self, model_api, n_workers):
+        self.model_api = model_api
+        self.n_workers = n_workers
+        self.params = model_api.model.params
+        self.shapes = [p.get_value(borrow=True).shape for p in self.params]
+
+        self.task_queues = [multiprocessing.Queue() for i in xrange(n_workers)]
+        self.result_queue = multiprocessing.Queue()
+        self.workers = []
+
+    def start(self):
+        for worker_index in xrange(self.n_workers):
+            worker = multiprocessing.Process(target=self._work, args=(worker_index,))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def close(self):
+        for queue in self.task_queues:
+            queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def _bind_shared_params(self, shared_params):
+        """
+        Let the theano shared variables of this process refer to the shared memory without copying.
+        """
+        for p, value in zip(self.params, shared_params):
+            p.set_value(value, borrow=True)
+
+    def _work(self, worker_index):
+        raise NotImplementedError
+
+    def train(self, batches):
+        """
+        :param batches: 1D: n_batches; elem=inputs of the train function
+        :return: generator of (batch index, (y_pred, y_gold, nll))
+        """
+        raise NotImplementedError
+
+
+class DataParallelTrainer(ParallelTrainer):
+    """
+    Synchronous data-parallel training.
+    At each step, every worker computes the gradients on its own mini-batch and writes them into
+    its slot of a shared gradient buffer; the master averages them, applies the optimizer update
+    and copies the new parameters back into the shared parameter buffer read by the workers.
+    """
+
+    def __init__(self, model_api, n_workers):
+        super(DataParallelTrainer, self).__init__(model_api, n_workers)
+        model_api.set_grad_f()
+        model_api.set_apply_f()
+        _, shared_params = alloc_shared_arrays(self.shapes)
+        self.shared_params = shared_params[0]
+        self.flat_grads, self.shared_grads = alloc_shared_arrays(self.shapes, n_workers)
+        self._push_params()
+        self.start()
+
+    def _push_params(self):
+        for p, value in zip(self.params, self.shared_params):
+            np.copyto(value, p.get_value(borrow=True))
+
+    def _work(self, worker_index):
+        self._bind_shared_params(self.shared_params)
+        grad_f = self.model_api.grad
+        grads = self.shared_grads[worker_index]
+        queue = self.task_queues[worker_index]
+
+        while True:
+            batch = queue.get()
+            if batch is None:
+                break
+            outputs = grad_f(*batch)
+            for buf, g in zip(grads, outputs[3:]):
+                np.copyto(buf, g)
+            self.result_queue.put((worker_index, outputs[:3]))
+
+    def train(self, batches):
+        n_workers = self.n_workers
+        for step_index in xrange(0, len(batches), n_workers):
+            step_batches = batches[step_index: step_index + n_workers]
+            n_batches = len(step_batches)
+
+            for worker_index, batch in enumerate(step_batches):
+                self.task_queues[worker_index].put(batch)
+
+            results = [None for i in xrange(n_batches)]
+            for i in xrange(n_batches):
+                worker_index, outputs = self.result_queue.get()
+                results[worker_index] = outputs
+
+            grads = split_flat_array(np.mean(self.flat_grads[:n_batches], axis=0), self.shapes)
+            self.model_api.apply(*grads)
+            self._push_params()
+
+            for i, outputs in enumerate(results):
+                yield step_index + i, outputs
+
+
+class HogwildTrainer(ParallelTrainer):
+    """
+    Lock-free asynchronous training (Hogwild).
+    The parameters and the AdaGrad accumulators live in shared memory. Each worker pulls a mini-batch,
+    computes the gradients against whatever the parameters are at that moment, and updates them in place
+    without locking. The embeddings are updated only at the rows looked up in the mini-batch.
+    """
+
+    # the updates the workers apply in place; adam and ada_delta keep state that is not shared between them
+    OPTIMIZERS = ['adagrad', 'sgd']
+
+    def __init__(self, model_api, n_workers, eps=1., clip=10.):
+        argv = model_api.argv
+        if argv.opt not in self.OPTIMIZERS:
+            raise ValueError('--parallel hogwild supports --opt %s, not %s' % ('/'.join(self.OPTIMIZERS), argv.opt))
+        super(HogwildTrainer, self).__init__(model_api, n_workers)
+        self.lr = argv.lr
+        self.reg = argv.reg
+        self.ada_grad = argv.opt == 'adagrad'
+        self.eps = eps
+        self.clip = clip
+
+        model_api.set_sparse_grad_f()
+        lookups = model_api.model.get_emb_lookups()
+        emb_params = [emb for emb, x, e, offset in lookups]
+        self.dense_indices = [i for i, p in enumerate(self.params) if p not in emb_params]
+        self.emb_lookups = [(self._get_param_index(emb), offset) for emb, x, e, offset in lookups]
+
+        _, (self.shared_params, self.shared_accum) = alloc_shared_arrays(self.shapes, 2)
+        for p, value in zip(self.params, self.shared_params):
+            np.copyto(value, p.get_value(borrow=True))
+        self._bind_shared_params(self.shared_params)
+
+        queue = multiprocessing.Queue()
+        self.task_queues = [queue for i in xrange(n_workers)]
+        self.start()
+
+    def _get_param_index(self, param):
+        for i, p in enumerate(self.params):
+            if p is param:
+                return i
+        raise ValueError('Not a parameter of the model: %s' % str(param))
+
+    def _work(self, worker_index):
+        grad_f = self.model_api.sparse_grad
+        queue = self.task_queues[worker_index]
+        n_dense = len(self.dense_indices)
+
+        while True:
+            task = queue.get()
+            if task is None:
+                break
+            index, batch = task
+            outputs = grad_f(*batch)
+
+            grads = outputs[3: 3 + n_dense]
+            for param_index, g in zip(self.dense_indices, grads):
+                self._update_dense(param_index, g)
+
+            emb_outputs = outputs[3 + n_dense:]
+            for i, (param_index, offset) in enumerate(self.emb_lookups):
+                ids, g = emb_outputs[2 * i], emb_outputs[2 * i + 1]
+                self._update_rows(param_index, ids - offset, g)
+
+            self.result_queue.put((index, outputs[:3]))
+
+    def _update_dense(self, param_index, g):
+        p = self.shared_params[param_index]
+        if self.ada_grad:
+            g = np.clip(g, -self.clip, self.clip)
+            r = self.shared_accum[param_index]
+            r += np.square(g)
+            p -= (self.lr / (np.sqrt(r) + self.eps)) * g
+        else:
+            p -= self.lr * g
+
+    def _update_rows(self, param_index, rows, g):
+        """
+        :param rows: 1D: n_lookups; row index of the embeddings, out-of-range rows (e.g. padding) are skipped
+        :param g: 1D: n_lookups, 2D: dim_emb; gradient of each looked-up embedding
+        """
+        p = self.shared_params[param_index]
+        valid = (rows >= 0) & (rows < p.shape[0])
+        rows, inverse = np.unique(rows[valid], return_inverse=True)
+        g_rows = np.zeros((len(rows), p.shape[1]), dtype=p.dtype)
+        np.add.at(g_rows, inverse, g[valid])
+        # the L2 term is not part of the gradients of the looked-up embeddings
+        g_rows += self.reg * p[rows]
+
+        if self.ada_grad:
+            g_rows = np.clip(g_rows, -self.clip, self.clip)
+            r = self.shared_accum[param_index]
+            r_rows = r[rows] + np.square(g_rows)
+            r[rows] = r_rows
+            p[rows] -= (self.lr / (np.sqrt(r_rows) + self.eps)) * g_rows
+        else:
+            p[rows] -= self.lr * g_rows
+
+    def train(self, batches):
+        queue = self.task_queues[0]
+        n_batches = len(batches)
+        n_sent = 0
+        # keep a few batches ahead of the workers rather than pickling the whole epoch at once
+        while n_sent < min(2 * self.n_workers, n_batches):
+            queue.put((n_sent, batches[n_sent]))
+            n_sent += 1
+
+        for i in xrange(n_batches):
+            index, outputs = self.result_queue.get()
+            if n_sent < n_batches:
+                queue.put((n_sent, batches[n_sent]))
+                n_sent += 1
+            yield index, outputs
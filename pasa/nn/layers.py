@@ -1,18 +1,27 @@
+import numpy as np
 import theano
 import theano.tensor as T
 
 from abc import ABCMeta, abstractmethod
-from nn_utils import sample_weights, build_shared_zeros
+from nn_utils import sample_weights, build_shared_zeros, recompute
 from rnn import GRU, LSTM
 
 
 class EmbeddingLayer(object):
 
-    def __init__(self, init_emb, n_vocab, dim_emb, fix=0, pad=1):
+    def __init__(self, init_emb, n_vocab, dim_emb, fix=0, pad=1, frozen_emb=None):
+        """
+        :param frozen_emb: embeddings of the ids following those of init_emb; looked up, but never trained
+        """
         self.E = None
         self.emb = None
+        self.frozen = None
         self.params = []
+        self.offset = pad
+        self.lookups = []
         self.set_emb(init_emb, n_vocab, dim_emb, fix, pad)
+        if frozen_emb is not None:
+            self.frozen = theano.shared(frozen_emb)
 
     def set_emb(self, init_emb, n_vocab, dim_emb, fix, pad):
         self.emb = self.create_emb(init_emb, n_vocab, dim_emb, pad)
@@ -36,7 +45,34 @@ class EmbeddingLayer(object):
         return theano.shared(init_emb)
 
     def lookup(self, x):
-        return self.E[x]
+        """
+        :param x: word ids; the id (x - offset) is the row of self.emb, and the ids beyond self.emb are
+                  the rows of self.frozen
+        """
+        # one lookup per input variable, so that the sparse updates get each looked-up row once
+        for x_prev, e_prev in self.lookups:
+            if x_prev is x:
+                return e_prev
+
+        if self.frozen is None:
+            e = self.E[x]
+        else:
+            n_trainable = self.offset + self.emb.shape[0]
+            is_frozen = T.ge(x, n_trainable)
+            e_trainable = self.E[T.switch(is_frozen, 0, x)]
+            e_frozen = self.frozen[T.switch(is_frozen, x - n_trainable, 0)]
+            e = T.switch(T.shape_padright(is_frozen), e_frozen, e_trainable)
+        self.lookups.append((x, e))
+        return e
+
+    def set_frozen_value(self, frozen_emb):
+        """
+        Layers built with one table (e.g., at test time) get the frozen rows appended to the table once.
+        """
+        if self.frozen is not None:
+            self.frozen.set_value(frozen_emb)
+        else:
+            self.emb.set_value(np.concatenate([self.emb.get_value(borrow=True), frozen_emb]))
 
 
 class Layer(object):
@@ -113,6 +149,30 @@ class RNNLayers(object):
     def set_layers(self, unit, depth, n_in, n_h):
         raise NotImplementedError
 
+    def forward_layers(self, x, forward_layer):
+        """
+        :param forward_layer: function of (layer, x) returning the input of the next layer
+        :return: the output of the last layer; with ckpt_every, the layers are run in blocks of ckpt_every layers,
+                 and only the outputs of the blocks are kept for the backward pass
+        """
+        ckpt_every = self.argv.ckpt_every
+        if ckpt_every <= 0:
+            for layer in self.layers:
+                x = forward_layer(layer, x)
+            return x
+
+        def forward_block(layers):
+            def forward(x):
+                for layer in layers:
+                    x = forward_layer(layer, x)
+                return x
+            return forward
+
+        for i in xrange(0, len(self.layers), ckpt_every):
+            layers = self.layers[i: i + ckpt_every]
+            x = recompute(forward_block(layers), x, [p for layer in layers for p in layer.params])
+        return x
+
 
 class BiRNNLayers(RNNLayers):
 
@@ -192,30 +252,36 @@ class StackedBiRNNLayers(RNNLayers):
         :param x: 1D: n_words, 2D: batch, 3D: dim_h
         :return: 1D: n_words, 2D: batch, 3D: dim_h
         """
-        h0 = T.zeros_like(x[0], dtype=theano.config.floatX)
-        for layer in self.layers:
-            h = layer.forward_all(x, h0)
-            if self.argv.res:
-                x = (h + x)[::-1]
-            else:
-                x = h[::-1]
+        x = self.forward_layers(x, self.gru_forward_layer)
         if (self.depth % 2) == 1:
             x = x[::-1]
         return x
 
     def lstm_forward(self, x):
-        h0 = T.zeros_like(x[0], dtype=theano.config.floatX)
-        c0 = T.zeros_like(x[0], dtype=theano.config.floatX)
-        for layer in self.layers:
-            h, c = layer.forward_all(x, h0, c0)
-            if self.argv.res:
-                x = (h + x)[::-1]
-            else:
-                x = h[::-1]
+        x = self.forward_layers(x, self.lstm_forward_layer)
         if (self.depth % 2) == 1:
             x = x[::-1]
         return x
 
+    def gru_forward_layer(self, layer, x):
+        """
+        :param x: 1D: n_words, 2D: batch, 3D: dim_h
+        :return: 1D: n_words, 2D: batch, 3D: dim_h; reversed
+        """
+        h0 = T.zeros_like(x[0], dtype=theano.config.floatX)
+        h = layer.forward_all(x, h0)
+        if self.argv.res:
+            return (h + x)[::-1]
+        return h[::-1]
+
+    def lstm_forward_layer(self, layer, x):
+        h0 = T.zeros_like(x[0], dtype=theano.config.floatX)
+        c0 = T.zeros_like(x[0], dtype=theano.config.floatX)
+        h, c = layer.forward_all(x, h0, c0)
+        if self.argv.res:
+            return (h + x)[::-1]
+        return h[::-1]
+
 
 class GridNetwork(RNNLayers):
 
@@ -231,23 +297,28 @@ class GridNetwork(RNNLayers):
         :param h: 1D: batch, 2D: n_prds, 3D: n_words, 4D: dim_h
         :return: 1D: batch, 2D: n_prds, 3D: n_words, 4D: dim_h
         """
-        h0_c = T.zeros((h.shape[0], h.shape[3]), dtype=theano.config.floatX)
-        h0_r = T.zeros((h.shape[2], h.shape[0], h.shape[3]), dtype=theano.config.floatX)
         h = h.dimshuffle(1, 2, 0, 3)
-        for i in xrange(0, self.depth):
-            h_tmp = self.layers[i].forward_all(h, h0_r, h0_c)
-
-            if self.argv.res:
-                h = h_tmp + h
-            else:
-                h = h_tmp
-
-            h = self.flip(h)
-
+        h = self.forward_layers(h, self.forward_layer)
         if (self.depth % 2) == 1:
             h = self.flip(h)
         return h.dimshuffle(2, 0, 1, 3)
 
+    def forward_layer(self, layer, h):
+        """
+        :param h: 1D: n_prds, 2D: n_words, 3D: batch, 4D: dim_h
+        :return: 1D: n_prds, 2D: n_words, 3D: batch, 4D: dim_h; flipped
+        """
+        h0_c = T.zeros((h.shape[2], h.shape[3]), dtype=theano.config.floatX)
+        h0_r = T.zeros((h.shape[1], h.shape[2], h.shape[3]), dtype=theano.config.floatX)
+        h_tmp = layer.forward_all(h, h0_r, h0_c)
+
+        if self.argv.res:
+            h = h_tmp + h
+        else:
+            h = h_tmp
+
+        return self.flip(h)
+
     @staticmethod
     def flip(x):
         x = x[::-1]
@@ -66,6 +66,19 @@ def L2_sqr(params):
     return reduce(lambda a, b: a + T.sum(b ** 2), params, 0.)
 
 
+def recompute(f, x, params):
+    """
+    Gradient checkpointing: f(x) as one op, so that only x and f(x) are kept for the backward pass,
+    where the graph of f, e.g. the scans of a stack of layers, is run again to get the gradients.
+    :param f: function from a tensor to a tensor of the same type
+    :param params: shared variables f uses; passed to the op as inputs to get their gradients
+    """
+    x_in = x.type()
+    param_ins = [p.type() for p in params]
+    y = theano.clone(f(x_in), replace=dict(zip(params, param_ins)))
+    return theano.OpFromGraph([x_in] + param_ins, [y])(x, *params)
+
+
 def normalize_2d(x, eps=1e-8):
     # x is batch*d
     # l2 is batch*1
@@ -3,6 +3,7 @@ from collections import OrderedDict
 import numpy as np
 import theano
 import theano.tensor as T
+from theano.tensor.extra_ops import Unique
 
 from nn_utils import build_shared_zeros
 
@@ -12,9 +13,33 @@ def grad_clipping(g, s):
     return T.switch(g_norm > s, (s * g) / g_norm, g)
 
 
-def sgd(cost, params, lr=0.1):
+def sparse_emb_grads(cost, lookups, reg=0.):
+    """
+    :param lookups: 1D: n_lookups; elem=(emb, word ids, looked-up embeddings, offset of the ids)
+    :return: 1D: n_lookups; elem=(emb, unique row indices, summed gradients of the rows)
+    """
+    sparse_grads = []
+    grads = T.grad(cost, [e for emb, x, e, offset in lookups])
+
+    for (emb, x, e, offset), g in zip(lookups, grads):
+        rows = x.flatten() - offset
+        g = g.reshape((-1, e.shape[-1]))
+
+        """ids out of the table (e.g. padding and frozen rows) are dropped, so that no row is updated unless looked up"""
+        valid = T.and_(T.ge(rows, 0), T.lt(rows, emb.shape[0])).nonzero()[0]
+        rows = rows[valid]
+        g = g[valid]
+
+        unique_rows, inverse = Unique(return_inverse=True)(rows)
+        g_rows = T.zeros((unique_rows.shape[0], emb.shape[1]), dtype=theano.config.floatX)
+        g_rows = T.inc_subtensor(g_rows[inverse], g)
+        sparse_grads.append((emb, unique_rows, g_rows + reg * emb[unique_rows]))
+    return sparse_grads
+
+
+def sgd(cost, params, lr=0.1, grads=None):
     updates = OrderedDict()
-    grads = T.grad(cost, params)
+    grads = T.grad(cost, params) if grads is None else grads
 
     """update parameters"""
     for p, g in zip(params, grads):
@@ -22,9 +47,9 @@ def sgd(cost, params, lr=0.1):
     return updates
 
 
-def ada_grad(cost, params, lr=0.1, eps=1.):
+def ada_grad(cost, params, lr=0.1, eps=1., grads=None, sparse_grads=None):
     updates = OrderedDict()
-    grads = T.grad(cost, params)
+    grads = T.grad(cost, params) if grads is None else grads
 
     """update parameters"""
     for p, g in zip(params, grads):
@@ -34,12 +59,20 @@ def ada_grad(cost, params, lr=0.1, eps=1.):
         p_t = p - (lr / (T.sqrt(r_t) + eps)) * g
         updates[r] = r_t
         updates[p] = p_t
+
+    """update the rows of embeddings looked up in the batch"""
+    for p, rows, g in sparse_grads or []:
+        g = grad_clipping(g, 10.)
+        r = build_shared_zeros(p.get_value(True).shape)
+        r_t = r[rows] + T.sqr(g)
+        updates[r] = T.set_subtensor(r[rows], r_t)
+        updates[p] = T.inc_subtensor(p[rows], - (lr / (T.sqrt(r_t) + eps)) * g)
     return updates
 
 
-def ada_delta(cost, params, b=0.999, eps=1e-8):
+def ada_delta(cost, params, b=0.999, eps=1e-8, grads=None):
     updates = OrderedDict()
-    grads = T.grad(cost, params)
+    grads = T.grad(cost, params) if grads is None else grads
 
     """update parameters"""
     for p, g in zip(params, grads):
@@ -57,9 +90,9 @@ def ada_delta(cost, params, b=0.999, eps=1e-8):
     return updates
 
 
-def adam(cost, params, lr=0.001, b1=0.9, b2=0.999, e=1e-8):
+def adam(cost, params, lr=0.001, b1=0.9, b2=0.999, e=1e-8, grads=None, sparse_grads=None):
     updates = OrderedDict()
-    grads = T.grad(cost, params)
+    grads = T.grad(cost, params) if grads is None else grads
     i = theano.shared(np.float32(0))
     i_t = i + 1.
 
@@ -78,6 +111,26 @@ def adam(cost, params, lr=0.001, b1=0.9, b2=0.999, e=1e-8):
         updates[r] = r_t
         updates[p] = p_t
 
+    """lazy update of the rows of embeddings looked up in the batch"""
+    for p, rows, g in sparse_grads or []:
+        v = build_shared_zeros(p.get_value(True).shape)
+        r = build_shared_zeros(p.get_value(True).shape)
+        t = build_shared_zeros(p.get_value(True).shape[0])
+
+        """the moments decay over the k steps since the row was updated last, where its gradients were zero"""
+        k = (i_t - t[rows]).dimshuffle(0, 'x')
+        v_tm1 = (b1 ** (k - 1.)) * v[rows]
+        v_t = (b1 * v_tm1) + (1. - b1) * g
+        r_t = (b2 ** k) * r[rows] + (1. - b2) * T.sqr(g)
+
+        r_hat = lr / (T.sqrt(r_t / (1 - b2 ** i_t)) + e)
+        v_hat = v_tm1 / (1 - b1 ** i_t)
+
+        updates[v] = T.set_subtensor(v[rows], v_t)
+        updates[r] = T.set_subtensor(r[rows], r_t)
+        updates[t] = T.set_subtensor(t[rows], i_t)
+        updates[p] = T.inc_subtensor(p[rows], - r_hat * v_hat)
+
     updates[i] = i_t
     return updates
 
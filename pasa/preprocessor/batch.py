@@ -1,15 +1,17 @@
 from numpy.random import shuffle
 from abc import ABCMeta, abstractmethod
+from sampler import UniformSampler
 
 
 class Batch(object):
     __metaclass__ = ABCMeta
 
-    def __init__(self, batch_size, samples, n_inputs=None):
+    def __init__(self, batch_size, samples, n_inputs=None, sampler=None):
         self.batch_size = batch_size
-        self.n_inputs = len(samples[0].x) + 1 if n_inputs is None else n_inputs
+        self.n_inputs = len(self._get_sample_inputs(samples[0])) if n_inputs is None else n_inputs
         self.samples = samples
         self.batches = self._set_batches()
+        self.sampler = sampler if sampler is not None else UniformSampler()
 
     def size(self):
         return len(self.batches)
@@ -55,6 +57,17 @@ class Batch(object):
                                                     get_elems=self._get_elems_batches,
                                                     add_input_to_batch=self._add_input_to_batch)
 
+    def sample_batches(self):
+        """
+        :return: 1D: n_batches of the epoch; elem=index of self.batches, in the order to train on
+        """
+        if self.sampler.reshuffle:
+            self.shuffle_batches()
+        return self.sampler.sample(self.batches)
+
+    def update_loss(self, index, nll):
+        self.sampler.update(index, nll)
+
     @abstractmethod
     def _preprocess_samples(self, samples):
         raise NotImplementedError()
@@ -91,6 +104,13 @@ class Batch(object):
     def _add_input_to_batch(self, batch, input_val):
         raise NotImplementedError
 
+    @staticmethod
+    def _get_sample_inputs(sample):
+        inputs = sample.x + [sample.y]
+        if sample.y_soft is not None:
+            inputs.append(sample.y_soft)
+        return inputs
+
     @staticmethod
     def _extract_samples_including_prds(samples):
         return [sample for sample in samples if sample.n_prds > 0]
@@ -146,7 +166,7 @@ class BaseBatch(Batch):
         return False
 
     def _add_sample_to_batch(self, batch, sample):
-        inputs = sample.x + [sample.y]
+        inputs = self._get_sample_inputs(sample)
         for i, elem in enumerate(inputs):
             batch[i].extend(elem)
         return batch
@@ -201,7 +221,7 @@ class GridBatch(BaseBatch):
         return False
 
     def _add_sample_to_batch(self, batch, sample):
-        inputs = sample.x + [sample.y]
+        inputs = self._get_sample_inputs(sample)
         for i, elem in enumerate(inputs):
             batch[i].append(elem)
         return batch
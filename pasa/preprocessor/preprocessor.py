@@ -5,6 +5,7 @@ from abc import ABCMeta, abstractmethod
 from sample_factory import BaseSampleFactory, GridSampleFactory
 from ..ling.vocab import Vocab, UNK, PAD
 from ..utils.io_utils import NTCLoader, say, load_init_emb
+from ..utils.profiler import PROFILER
 
 
 class Preprocessor(object):
@@ -15,6 +16,7 @@ class Preprocessor(object):
         self.window = self._set_window_size(argv, config)
         self.corpus_loader = self._set_corpus_loader(argv)
         self.sample_factory = None
+        self.cache = None
 
     @staticmethod
     def _set_window_size(argv, config):
@@ -26,11 +28,15 @@ class Preprocessor(object):
     def _set_corpus_loader(argv):
         return NTCLoader(min_unit='word', data_size=argv.data_size)
 
+    def set_cache(self, cache):
+        self.cache = cache
+
     def set_sample_factory(self, vocab_word, vocab_label):
         factory = self._select_sample_factory()
         self.sample_factory = factory(argv=self.argv,
                                       vocab_word=vocab_word,
-                                      vocab_label=vocab_label)
+                                      vocab_label=vocab_label,
+                                      cache=self.cache)
 
     def _select_sample_factory(self):
         if self.argv.model == 'grid':
@@ -40,18 +46,22 @@ class Preprocessor(object):
     def load_corpus_set(self):
         cl = self.corpus_loader
         # corpus: 1D: n_sents, 2D: n_words, 3D: Word()
-        train_corpus = cl.load_corpus(path=self.argv.train_data)
-        dev_corpus = cl.load_corpus(path=self.argv.dev_data)
-        test_corpus = cl.load_corpus(path=self.argv.test_data)
+        with PROFILER.timer('load_corpus'):
+            train_corpus = cl.load_corpus(path=self.argv.train_data)
+            dev_corpus = cl.load_corpus(path=self.argv.dev_data)
+            test_corpus = cl.load_corpus(path=self.argv.test_data)
         return train_corpus, dev_corpus, test_corpus
 
     def create_sample_set(self, corpus_set):
         sf = self.sample_factory
         # samples: 1D: n_sents; Sample
         train_corpus, dev_corpus, test_corpus = corpus_set
-        train_samples = sf.create_samples(self._format_corpus(train_corpus))
-        dev_samples = sf.create_samples(self._format_corpus(dev_corpus))
-        test_samples = sf.create_samples(self._format_corpus(test_corpus))
+        with PROFILER.timer('create_samples'):
+            train_samples = sf.create_samples(self._format_corpus(train_corpus))
+            dev_samples = sf.create_samples(self._format_corpus(dev_corpus))
+            test_samples = sf.create_samples(self._format_corpus(test_corpus))
+        for samples in [train_samples, dev_samples, test_samples]:
+            PROFILER.count('samples', len(samples) if samples else 0)
         return train_samples, dev_samples, test_samples
 
     @abstractmethod
@@ -59,7 +69,19 @@ class Preprocessor(object):
         raise NotImplementedError
 
     def create_batches(self, samples):
-        return self.sample_factory.create_batches(samples)
+        with PROFILER.timer('create_batches'):
+            return self.sample_factory.create_batches(samples)
+
+    @staticmethod
+    def set_soft_labels(samples, soft_labels):
+        """
+        :param soft_labels: 1D: n_samples, 2D: n_prds, 3D: n_words, 4D: n_labels; label probability
+                            predicted by a teacher model for the same corpus
+        """
+        assert len(samples) == len(soft_labels), 'The soft labels are not of this corpus'
+        for sample, y_soft in zip(samples, soft_labels):
+            assert y_soft.shape[:2] == (sample.n_prds, sample.n_words), 'The soft labels are not of this corpus'
+            sample.y_soft = y_soft
 
     @staticmethod
     def create_vocab_label():
@@ -76,8 +98,14 @@ class Preprocessor(object):
         say('\nVocab: %d\tType: word\n' % vocab_word.size())
         return vocab_word
 
-    def load_init_emb(self):
-        vocab_word, emb = load_init_emb(self.argv.init_emb, self.argv.dim_emb)
+    def load_init_emb(self, corpus_set=None):
+        """
+        :param corpus_set: if given, only the embeddings of the words in the corpora are loaded
+        """
+        words = None
+        if corpus_set is not None:
+            words = set(w.form for corpus in corpus_set if corpus for doc in corpus for sent in doc for w in sent)
+        vocab_word, emb = load_init_emb(self.argv.init_emb, self.argv.dim_emb, words)
         say('\n\tWord Embedding Size: %d\n' % vocab_word.size())
         return vocab_word, emb
 
@@ -1,8 +1,11 @@
+import copy
+
 import numpy as np
 
 from abc import ABCMeta, abstractmethod
 from ..utils.io_utils import say
 from ..ling.vocab import UNK, NA, GA, O, NI, PRD, GA_INDEX, O_INDEX, NI_INDEX
+from ..ling.word import PRD_POS
 
 
 class Sample(object):
@@ -15,6 +18,8 @@ class Sample(object):
         prd_indices: 1D: n_prds; prd index
         x: 1D: n_elems
         y: 1D: n_prds, 2D: n_words; label id
+        y_soft: 1D: n_prds, 2D: n_words, 3D: n_labels; label probability of a teacher model
+        key: content hash of the sentence and the features; set when the samples are cached
         """
         self.sent = sent
         self.prd_indices = self._set_prd_indices(sent)
@@ -26,6 +31,8 @@ class Sample(object):
 
         self.x = self._set_x(mark_phi=mark_phi, window=window)
         self.y = self._set_y()
+        self.y_soft = None
+        self.key = None
 
     @abstractmethod
     def _set_word_ids(self, sent, vocab_word):
@@ -51,6 +58,45 @@ class Sample(object):
     def _numpize(sample):
         return np.asarray(sample, dtype='int32')
 
+    def get_prd_chunk(self, first, last):
+        """
+        :return: copy of the sample over the predicates first, ..., last - 1
+        """
+        sample = copy.copy(self)
+        sample.prd_indices = self.prd_indices[first: last]
+        sample.n_prds = len(sample.prd_indices)
+        sample.label_ids = self.label_ids[first: last]
+        sample.x = [x[first: last] for x in self.x]
+        if self.y is not None:
+            sample.y = self.y[first: last]
+        if self.y_soft is not None:
+            sample.y_soft = self.y_soft[first: last]
+        if self.key is not None:
+            sample.key = '%s:%d-%d' % (self.key, first, last)
+        return sample
+
+
+def get_prd_chunks(n_prds, max_prds, overlap):
+    """
+    Split the predicates of a sentence into chunks of max_prds predicates, each sharing overlap predicates
+    with the next one; the predicates of an overlap are owned by the chunk where they are farther from the edge.
+    :return: 1D: n_chunks; elem=(first, last, own_first, own_last); the chunk covers the predicates first, ..., last - 1,
+             and its outputs are used for the predicates own_first, ..., own_last - 1
+    """
+    if max_prds <= 0 or n_prds <= max_prds:
+        return [(0, n_prds, 0, n_prds)]
+
+    stride = max(max_prds - overlap, 1)
+    firsts = range(0, n_prds - max_prds, stride) + [n_prds - max_prds]
+    chunks = []
+    own_first = 0
+    for i, first in enumerate(firsts):
+        last = first + max_prds
+        own_last = (firsts[i + 1] + last + 1) / 2 if i + 1 < len(firsts) else n_prds
+        chunks.append((first, last, own_first, own_last))
+        own_first = own_last
+    return chunks
+
 
 class BaseSample(Sample):
 
@@ -140,3 +186,24 @@ class BaseSample(Sample):
             return 1
         return 0
 
+
+class RawSample(BaseSample):
+    """
+    Inference-only sample of unannotated text: the predicates are the words marked as type="pred",
+    or the words of PRD_POS if prd_pos, and neither the labels nor y are built.
+    """
+
+    def __init__(self, sent, mark_phi, window, vocab_word, prd_pos=False):
+        self.prd_pos = prd_pos
+        super(RawSample, self).__init__(sent, mark_phi, window, vocab_word, vocab_label=None)
+
+    def _set_prd_indices(self, sent):
+        if self.prd_pos:
+            return [word.index for word in sent if word.pos in PRD_POS]
+        return [word.index for word in sent if word.is_prd]
+
+    def _set_label_ids(self, sent, vocab_label):
+        return []
+
+    def _set_y(self):
+        return None
@@ -1,17 +1,42 @@
 from abc import ABCMeta, abstractmethod
-from sample import BaseSample
+from sample import BaseSample, RawSample, get_prd_chunks
 from batch import BaseBatch, GridBatch
+from sampler import UniformSampler, CurriculumSampler, LossSampler
+from ..utils.cache import get_fingerprint, get_sent_key, get_nbytes
 
 
 class SampleFactory(object):
     __metaclass__ = ABCMeta
 
-    def __init__(self, argv, vocab_word, vocab_label):
+    def __init__(self, argv, vocab_word, vocab_label, cache=None):
         self.argv = argv
         self.vocab_word = vocab_word
         self.vocab_label = vocab_label
         self.batch_size = argv.batch_size
 
+        self.cache = cache
+        self.fingerprint = None
+        if cache is not None:
+            self.fingerprint = get_fingerprint([self.__class__.__name__, argv.mark_phi, argv.window,
+                                                vocab_word.i2w, vocab_label.i2w if vocab_label else None])
+
+    def _create_cached_sample(self, sent, create_sample, *key_values):
+        """
+        :param create_sample: function from a sentence to a sample
+        :param key_values: options of create_sample that change the sample
+        :return: the sample of the same contents in the cache, or a new sample set with its key
+        """
+        if self.cache is None:
+            return create_sample(sent)
+
+        key = get_fingerprint([self.fingerprint, get_sent_key(sent)] + list(key_values))
+        sample = self.cache.get(key)
+        if sample is None:
+            sample = create_sample(sent)
+            sample.key = key
+            self.cache.put(key, sample, get_nbytes([sample.x, sample.y]))
+        return sample
+
     @abstractmethod
     def create_samples(self, corpus):
         raise NotImplementedError
@@ -24,6 +49,14 @@ class SampleFactory(object):
     def create_batches(self, samples):
         raise NotImplementedError
 
+    def _create_sampler(self):
+        argv = self.argv
+        if argv.sampler == 'curriculum':
+            return CurriculumSampler(n_epochs=argv.curriculum_epochs, start=argv.curriculum_start)
+        if argv.sampler == 'loss':
+            return LossSampler(alpha=argv.loss_alpha, mix=argv.loss_mix)
+        return UniformSampler()
+
 
 class BaseSampleFactory(SampleFactory):
 
@@ -34,16 +67,44 @@ class BaseSampleFactory(SampleFactory):
         """
         if corpus is None:
             return None
-        return [self._create_sample(sent) for sent in corpus]
+        return [self._create_cached_sample(sent, self._create_sample) for sent in corpus]
 
     def _create_sample(self, sent):
         return BaseSample(sent, self.argv.mark_phi, self.argv.window, self.vocab_word, self.vocab_label)
 
+    def create_raw_samples(self, corpus):
+        """
+        :param corpus: 1D: n_sents, 2D: n_words; elem=Word, without annotated arguments
+        :return: samples: 1D: n_samples; RawSample
+        """
+        return [self._create_cached_sample(sent, self._create_raw_sample, 'raw', self.argv.prd_pos) for sent in corpus]
+
+    def _create_raw_sample(self, sent):
+        argv = self.argv
+        return RawSample(sent, argv.mark_phi, argv.window, self.vocab_word, argv.prd_pos)
+
     def create_batches(self, samples):
-        return BaseBatch(self.batch_size, samples)
+        return BaseBatch(self.batch_size, samples, sampler=self._create_sampler())
 
 
 class GridSampleFactory(BaseSampleFactory):
 
     def create_batches(self, samples):
-        return GridBatch(self.batch_size, samples)
+        return GridBatch(self.batch_size, self._split_prds(samples), sampler=self._create_sampler())
+
+    def _split_prds(self, samples):
+        """
+        :return: 1D: n_samples; the samples of more than max_prds predicates are replaced with their predicate chunks
+        """
+        argv = self.argv
+        if argv.max_prds <= 0:
+            return samples
+
+        chunked = []
+        for sample in samples:
+            if sample.n_prds > argv.max_prds:
+                chunked.extend(sample.get_prd_chunk(first, last) for first, last, own_first, own_last
+                               in get_prd_chunks(sample.n_prds, argv.max_prds, argv.prd_overlap))
+            else:
+                chunked.append(sample)
+        return chunked
@@ -0,0 +1,101 @@
+import numpy as np
+
+from abc import ABCMeta, abstractmethod
+
+
+class Sampler(object):
+    """
+    Chooses the mini-batches of an epoch and the order to train on them.
+    """
+    __metaclass__ = ABCMeta
+    # rebuild the mini-batches from the shuffled samples every epoch;
+    # the samplers which keep statistics of each mini-batch keep them fixed instead
+    reshuffle = True
+
+    def __init__(self):
+        self.epoch = 0
+
+    def sample(self, batches):
+        """
+        :param batches: 1D: n_batches; elem=mini-batch, in shuffled order
+        :return: 1D: n_batches of the epoch; elem=index of batches
+        """
+        indices = self._sample(batches)
+        self.epoch += 1
+        return indices
+
+    @abstractmethod
+    def _sample(self, batches):
+        raise NotImplementedError
+
+    def update(self, index, nll):
+        """
+        :param index: index of the mini-batch just trained on
+        :param nll: its loss
+        """
+        pass
+
+    @staticmethod
+    def get_n_words(batch):
+        # x_w of a sample: (1D: n_prds), 1D: n_words, 2D: window + 1
+        return np.shape(batch[0][0])[-2]
+
+
+class UniformSampler(Sampler):
+    """
+    Every mini-batch once in shuffled order.
+    """
+
+    def _sample(self, batches):
+        return range(len(batches))
+
+
+class CurriculumSampler(Sampler):
+    """
+    Length curriculum: the mini-batches of the shortest sentences first, and the cap on the length grows until
+    all the mini-batches are used after n_epochs. The fraction of the mini-batches under the cap (competence)
+    starts from start and grows as sqrt, as in Platanios et al. (2019).
+    """
+
+    def __init__(self, n_epochs=5, start=0.2):
+        super(CurriculumSampler, self).__init__()
+        self.n_epochs = n_epochs
+        self.start = start
+
+    def get_competence(self):
+        progress = min(self.epoch / float(max(self.n_epochs - 1, 1)), 1.)
+        return min(np.sqrt(self.start ** 2 + (1. - self.start ** 2) * progress), 1.)
+
+    def _sample(self, batches):
+        lengths = np.asarray([self.get_n_words(batch) for batch in batches])
+        cap = np.percentile(lengths, 100. * self.get_competence(), interpolation='lower')
+        return [index for index, n_words in enumerate(lengths) if n_words <= cap]
+
+
+class LossSampler(Sampler):
+    """
+    Importance sampling by loss: the mini-batches of an epoch are drawn with replacement with probability
+    proportional to nll ** alpha of their last visit, mixed with the uniform distribution by mix so that
+    every mini-batch keeps being visited. The first epoch visits every mini-batch once.
+    """
+    reshuffle = False
+
+    def __init__(self, alpha=1., mix=0.3):
+        super(LossSampler, self).__init__()
+        self.alpha = alpha
+        self.mix = mix
+        self.losses = None
+
+    def _sample(self, batches):
+        n_batches = len(batches)
+        if self.losses is None or len(self.losses) != n_batches:
+            self.losses = np.full(n_batches, np.inf)
+        if not np.all(np.isfinite(self.losses)):
+            return range(n_batches)
+
+        weights = np.maximum(self.losses, 1e-8) ** self.alpha
+        probs = (1. - self.mix) * weights / np.sum(weights) + self.mix / n_batches
+        return list(np.random.choice(n_batches, size=n_batches, p=probs / np.sum(probs)))
+
+    def update(self, index, nll):
+        self.losses[index] = nll
@@ -0,0 +1,158 @@
+import time
+import threading
+import Queue
+from collections import deque
+
+import numpy as np
+
+
+class Future(object):
+
+    def __init__(self):
+        self._result = None
+        self._exception = None
+        self._done = threading.Event()
+
+    def set_result(self, result):
+        self._result = result
+        self._done.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise RuntimeError('The result is not ready in %s sec' % str(timeout))
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class BatchScheduler(object):
+    """
+    Dynamic micro-batching in front of ModelAPI.predict_samples.
+    The submitted samples are grouped by the bucket key of the model API (the input shape), and a bucket
+    is predicted as one batch when it has max_batch_size samples or its oldest sample has waited max_wait sec.
+    """
+
+    def __init__(self, model_api, max_batch_size=32, max_wait=0.005, n_latencies=10000):
+        self.model_api = model_api
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.queue = Queue.Queue()
+        # key: bucket key, value: [(sample, future, arrival time), ...]
+        self.buckets = {}
+        self.n_pending = 0
+        self.thread = None
+        self.running = False
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=n_latencies)
+        self.n_batches = 0
+        self.n_batched_samples = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit(self, sample):
+        """
+        :return: Future of the predicted labels; 1D: n_prds, 2D: n_words; label id
+        """
+        future = Future()
+        if sample.n_prds == 0:
+            future.set_result([])
+        else:
+            self.queue.put((sample, future, time.time()))
+        return future
+
+    def _loop(self):
+        while self.running:
+            self._receive(self._get_timeout())
+            self._dispatch(time.time())
+        for key in self.buckets.keys():
+            self._predict_bucket(key, len(self.buckets[key]))
+
+    def _get_timeout(self):
+        if not self.buckets:
+            return None
+        oldest = min(bucket[0][2] for bucket in self.buckets.values())
+        return max(oldest + self.max_wait - time.time(), 0.)
+
+    def _receive(self, timeout):
+        try:
+            item = self.queue.get(timeout=timeout) if timeout is None or timeout > 0 else self.queue.get_nowait()
+            while item is not None:
+                self._add_to_bucket(item)
+                item = self.queue.get_nowait()
+        except Queue.Empty:
+            pass
+
+    def _add_to_bucket(self, item):
+        key = self.model_api.get_bucket_key(item[0])
+        if key not in self.buckets:
+            self.buckets[key] = []
+        self.buckets[key].append(item)
+        self.n_pending += 1
+
+    def _dispatch(self, now):
+        for key in self.buckets.keys():
+            bucket = self.buckets[key]
+            while len(bucket) >= self.max_batch_size:
+                self._predict_bucket(key, self.max_batch_size)
+                bucket = self.buckets.get(key, [])
+            if bucket and now - bucket[0][2] >= self.max_wait:
+                self._predict_bucket(key, len(bucket))
+
+    def _predict_bucket(self, key, batch_size):
+        bucket = self.buckets[key]
+        items, rest = bucket[:batch_size], bucket[batch_size:]
+        if rest:
+            self.buckets[key] = rest
+        else:
+            del self.buckets[key]
+        self.n_pending -= len(items)
+
+        try:
+            results = self.model_api.predict_samples([sample for sample, future, arrival in items])
+        except Exception as e:
+            for sample, future, arrival in items:
+                future.set_exception(e)
+            return
+
+        now = time.time()
+        with self.lock:
+            self.n_batches += 1
+            self.n_batched_samples += len(items)
+            for (sample, future, arrival), result in zip(items, results):
+                self.latencies.append(now - arrival)
+                future.set_result(result)
+
+    def get_stats(self):
+        """
+        :return: dict of the queue depth, the batch fill ratio, and the p50/p99 latency (sec)
+        of the recent requests
+        """
+        with self.lock:
+            latencies = list(self.latencies)
+            n_batches = self.n_batches
+            n_batched_samples = self.n_batched_samples
+
+        stats = {'queue_depth': self.queue.qsize() + self.n_pending,
+                 'batches': n_batches,
+                 'fill_ratio': n_batched_samples / float(n_batches * self.max_batch_size) if n_batches else 0.,
+                 'p50_latency': np.percentile(latencies, 50) if latencies else 0.,
+                 'p99_latency': np.percentile(latencies, 99) if latencies else 0.}
+        return stats
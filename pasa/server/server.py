@@ -0,0 +1,108 @@
+import sys
+import time
+import threading
+import Queue
+import SocketServer
+
+from scheduler import BatchScheduler
+from ..experimenter.experimenter import Tester
+from ..utils.io_utils import say
+
+
+class Server(Tester):
+    """
+    Keeps the vocabularies, the parameters and the compiled predict function in memory,
+    and analyzes sentences in the NTC format read from stdin or a local socket.
+    """
+
+    def __init__(self, argv, preprocessor, model_api, epoch_manager=None, config=None):
+        super(Server, self).__init__(argv, preprocessor, model_api, epoch_manager, config)
+        self.scheduler = None
+
+    def _setup_samples(self):
+        self.preprocessor.set_sample_factory(self.vocab_word, self.vocab_label)
+
+    def serve(self):
+        argv = self.argv
+        self.scheduler = BatchScheduler(model_api=self.model_api,
+                                        max_batch_size=argv.serve_batch_size,
+                                        max_wait=argv.serve_wait / 1000.)
+        self.scheduler.start()
+        if argv.stats_interval > 0:
+            reporter = threading.Thread(target=self._report_stats, args=(argv.stats_interval,))
+            reporter.daemon = True
+            reporter.start()
+
+        if argv.port:
+            self._serve_socket(argv.port)
+        else:
+            self._serve_stream(sys.stdin, sys.stdout)
+            self.scheduler.stop()
+            self._show_stats(sys.stderr)
+
+    def analyze(self, sents):
+        """
+        :param sents: 1D: n_sents, 2D: n_words; elem=Word
+        :return: 1D: n_sents; elem=(sample, Future of the predicted labels)
+        """
+        sample_factory = self.preprocessor.sample_factory
+        if self.argv.raw:
+            samples = sample_factory.create_raw_samples(sents)
+        else:
+            samples = sample_factory.create_samples(sents)
+        return [(sample, self.scheduler.submit(sample)) for sample in samples]
+
+    def _report_stats(self, interval):
+        while True:
+            time.sleep(interval)
+            self._show_stats(sys.stderr)
+
+    def _show_stats(self, stream):
+        stats = self.scheduler.get_stats()
+        say('\n\tQueue: %d  Batches: %d  Fill: %.2f  Latency p50: %.2f ms  p99: %.2f ms\n' % (
+            stats['queue_depth'], stats['batches'], stats['fill_ratio'],
+            stats['p50_latency'] * 1000., stats['p99_latency'] * 1000.), stream)
+
+    def _serve_stream(self, fin, fout):
+        """
+        Read sentences from fin while writing the results of the previous ones to fout in order.
+        """
+        pending = Queue.Queue()
+        writer = threading.Thread(target=self._write_results, args=(pending, fout))
+        writer.start()
+
+        loader = self.preprocessor.corpus_loader
+        for sent in loader.iter_sents(iter(fin.readline, '')):
+            for request in self.analyze([sent]):
+                pending.put(request)
+
+        pending.put(None)
+        writer.join()
+
+    def _write_results(self, pending, fout):
+        io_manager = self.model_api.io_manager
+        while True:
+            request = pending.get()
+            if request is None:
+                break
+            sample, future = request
+            try:
+                text = io_manager.format_pas_result(future.result(), sample)
+            except Exception as e:
+                text = u'#\tERROR\t%s\n\n' % str(e)
+            fout.write(text.encode('utf-8'))
+            fout.flush()
+
+    def _serve_socket(self, port):
+        server = self
+
+        class Handler(SocketServer.StreamRequestHandler):
+
+            def handle(self):
+                server._serve_stream(self.rfile, self.wfile)
+
+        SocketServer.ThreadingTCPServer.allow_reuse_address = True
+        tcp_server = SocketServer.ThreadingTCPServer(('localhost', port), Handler)
+        tcp_server.daemon_threads = True
+        say('\n\nSERVING ON localhost:%d\n' % port)
+        tcp_server.serve_forever()
@@ -0,0 +1,48 @@
+import argparse
+import tempfile
+
+import numpy as np
+
+
+def make_argv(**overrides):
+    """
+    :param overrides: options to replace the defaults with
+    :return: the options of a small model for the tests
+    """
+    argv = argparse.Namespace(model='base', unit='gru', fix=0, layers=1, window=5, dim_emb=8, dim_posit=8,
+                              dim_hidden=8, mark_phi=1, batch_size=2, opt='adam', lr=0.0075, reg=0.0001,
+                              res=1, sparse_emb=0, load_soft=None, soft_weight=0.5, ckpt_every=0,
+                              parallel=None, n_workers=1, max_prds=0, prd_overlap=2,
+                              output_fn='test', output_dir=tempfile.mkdtemp() + '/')
+    for key, value in overrides.items():
+        setattr(argv, key, value)
+    return argv
+
+
+def make_vocabs(n_words=20):
+    """
+    :return: the vocabulary of n_words words (w0, w1, ...) besides the initial ones, and that of the PAS labels
+    """
+    from ..ling.vocab import Vocab
+
+    vocab_word = Vocab()
+    vocab_word.set_init_word()
+    for i in xrange(n_words):
+        vocab_word.add_word(u'w%d' % i)
+    vocab_label = Vocab()
+    vocab_label.set_pas_labels()
+    return vocab_word, vocab_label
+
+
+def build_model_api(argv, vocab_word=None, vocab_label=None, init_emb=None, frozen_emb=None):
+    """
+    :return: the BaseModelAPI/GridModelAPI of argv compiled with the parameters of seed 0; make_vocabs by default
+    """
+    from ..model.model_api import BaseModelAPI, GridModelAPI
+
+    if vocab_word is None:
+        vocab_word, vocab_label = make_vocabs()
+    np.random.seed(0)
+    model_api = GridModelAPI(argv) if argv.model == 'grid' else BaseModelAPI(argv)
+    model_api.compile(vocab_word=vocab_word, vocab_label=vocab_label, init_emb=init_emb, frozen_emb=frozen_emb)
+    return model_api
@@ -0,0 +1,38 @@
+import numpy as np
+
+from ..utils.cache import LRUCache, get_fingerprint
+
+
+def test_lru_eviction_by_bytes():
+    cache = LRUCache(max_bytes=3 * 400)
+    for key in 'abc':
+        cache.put(key, np.zeros(100, dtype='float32'))
+    assert cache.get('a') is not None
+
+    cache.put('d', np.zeros(100, dtype='float32'))
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    assert cache.n_bytes == 3 * 400
+
+    cache.put('e', np.zeros(1000, dtype='float32'))
+    assert cache.get('e') is None
+
+
+def test_fingerprint_of_contents():
+    a = np.arange(6, dtype='float32')
+    assert get_fingerprint([a]) == get_fingerprint([a.copy()])
+    assert get_fingerprint([a]) != get_fingerprint([a.reshape((2, 3))])
+    assert get_fingerprint([a]) != get_fingerprint([a + 1])
+
+
+def test_grid_fingerprint_of_prd_chunks():
+    import argparse
+    from ..model.model_api import GridModelAPI
+
+    fingerprints = set()
+    for max_prds, prd_overlap in [(0, 2), (4, 2), (4, 1)]:
+        model_api = GridModelAPI(argparse.Namespace(model='grid', unit='gru', max_prds=max_prds,
+                                                    prd_overlap=prd_overlap))
+        model_api.set_predict_cache(LRUCache(max_bytes=1000))
+        fingerprints.add(model_api.fingerprint)
+    assert len(fingerprints) == 3
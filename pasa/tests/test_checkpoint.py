@@ -0,0 +1,57 @@
+import argparse
+
+import numpy as np
+
+
+def _check_ckpt(create_net, x, x_shape, ckpt_every):
+    """
+    :param create_net: function from argv to a StackedBiRNNLayers/GridNetwork
+    :param x: input tensor variable of the network
+    :param x_shape: shape of the input values
+    """
+    import theano
+    import theano.tensor as T
+
+    np.random.seed(0)
+    argv = argparse.Namespace(res=1, ckpt_every=0)
+    net = create_net(argv)
+    params = [p for layer in net.layers for p in layer.params]
+
+    h = net.forward(x)
+    argv.ckpt_every = ckpt_every
+    h_ckpt = net.forward(x)
+    f = theano.function(inputs=[x], outputs=[h, h_ckpt] + T.grad(T.sum(h ** 2), params) +
+                        T.grad(T.sum(h_ckpt ** 2), params))
+
+    outputs = f(np.random.randn(*x_shape).astype(theano.config.floatX))
+    assert np.allclose(outputs[0], outputs[1], atol=1e-5)
+    grads = outputs[2:]
+    for g, g_ckpt in zip(grads[:len(params)], grads[len(params):]):
+        assert np.allclose(g, g_ckpt, atol=1e-4)
+
+
+def _check_stacked_ckpt(unit, layers, ckpt_every, dim_h=4):
+    import theano.tensor as T
+    from ..nn.layers import StackedBiRNNLayers
+
+    # 1D: n_words, 2D: batch, 3D: dim_h
+    _check_ckpt(create_net=lambda argv: StackedBiRNNLayers(argv, unit, layers, dim_h, dim_h),
+                x=T.ftensor3(), x_shape=(6, 3, dim_h), ckpt_every=ckpt_every)
+
+
+def test_gru_ckpt():
+    _check_stacked_ckpt('gru', layers=4, ckpt_every=2)
+
+
+def test_lstm_ckpt():
+    _check_stacked_ckpt('lstm', layers=3, ckpt_every=2)
+
+
+def test_grid_ckpt():
+    import theano.tensor as T
+    from ..nn.layers import GridNetwork
+
+    dim_h = 4
+    # 1D: batch, 2D: n_prds, 3D: n_words, 4D: dim_h
+    _check_ckpt(create_net=lambda argv: GridNetwork(argv, 'gru', 3, dim_h, dim_h),
+                x=T.ftensor4(), x_shape=(2, 3, 5, dim_h), ckpt_every=2)
@@ -0,0 +1,34 @@
+import argparse
+
+import numpy as np
+
+
+def _create_sample(rng, n_words, n_prds):
+    chunk_index = np.sort(rng.randint(0, n_words / 2 + 1, size=n_words))
+    sent = [argparse.Namespace(chunk_index=c, chunk_head=rng.randint(-1, n_words / 2 + 1)) for c in chunk_index]
+    prd_indices = sorted(rng.choice(n_words, size=n_prds, replace=False))
+    y = rng.randint(0, 4, size=(n_prds, n_words))
+    return argparse.Namespace(sent=sent, prd_indices=prd_indices, y=y, n_words=n_words, n_prds=n_prds)
+
+
+def test_columns_match_samples():
+    from ..experimenter.columns import get_result_columns
+    from ..experimenter.evaluator import Eval
+
+    rng = np.random.RandomState(0)
+    samples = [_create_sample(rng, n_words, n_prds) for n_words, n_prds in [(6, 2), (4, 0), (9, 3)]]
+    results = [rng.randint(0, 4, size=(s.n_prds, s.n_words)) if s.n_prds else [] for s in samples]
+    probs = [np.log(rng.dirichlet(np.ones(5), size=(s.n_prds, s.n_words))) for s in samples]
+
+    columns = get_result_columns(results, samples, probs)
+    assert len(columns['sent_id']) == 6 * 2 + 9 * 3
+    assert columns['prob'].shape == (len(columns['sent_id']), 5)
+
+    for row in xrange(len(columns['sent_id'])):
+        sample = samples[columns['sent_id'][row]]
+        prd_i = sample.prd_indices.index(columns['prd_index'][row])
+        word_index = columns['word_index'][row]
+        assert columns['n_words'][row] == sample.n_words
+        assert columns['gold'][row] == sample.y[prd_i][word_index]
+        assert columns['sys'][row] == results[columns['sent_id'][row]][prd_i][word_index]
+        assert columns['case_type'][row] == Eval._get_case_type(word_index, sample.prd_indices[prd_i], sample)
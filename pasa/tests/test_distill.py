@@ -0,0 +1,23 @@
+import numpy as np
+import theano
+
+from . import make_argv, build_model_api
+
+theano.config.floatX = 'float32'
+
+
+def test_one_hot_soft_labels_match_hard_loss():
+    rng = np.random.RandomState(1)
+    x_w = rng.randint(0, 21, size=(3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(3, 7)).astype('int32')
+    y = rng.randint(0, 5, size=(3, 7)).astype('int32')
+
+    hard = build_model_api(make_argv())
+    hard_cost = theano.function(hard.model.inputs, hard.model.cost)(x_w, x_p, y)
+
+    soft = build_model_api(make_argv(load_soft='soft', soft_weight=0.3))
+    n_labels = soft.vocab_label.size()
+    y_soft = np.eye(n_labels, dtype='float32')[y]
+    soft_cost = theano.function(soft.model.inputs, soft.model.cost)(x_w, x_p, y, y_soft)
+
+    assert np.allclose(hard_cost, soft_cost, atol=1e-5)
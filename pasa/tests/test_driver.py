@@ -0,0 +1,23 @@
+import argparse
+import os
+import tempfile
+
+
+def test_load_config_model_options():
+    from ..api.driver import Driver, MODEL_OPTIONS
+    from ..utils.io_utils import dump_data
+
+    fn = os.path.join(tempfile.mkdtemp(), 'config.pkl.gz')
+    saved = dict((key, 'config') for key in MODEL_OPTIONS if key != 'res')
+    dump_data(argparse.Namespace(eval_workers=1, max_prds=0, output_fn='train', **saved), fn)
+    argv = argparse.Namespace(load_config=fn, eval_workers=4, max_prds=8, output_fn=None, ckpt_every=2,
+                              **dict((key, 'argv') for key in MODEL_OPTIONS))
+
+    config = Driver._load_config(argv)
+    # the architecture comes from the config, all the other options from the command line
+    for key in MODEL_OPTIONS:
+        assert getattr(config, key) == ('config' if key in saved else 'argv')
+    assert config.eval_workers == 4
+    assert config.max_prds == 8
+    assert config.output_fn is None
+    assert config.ckpt_every == 2
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import theano
+
+from . import make_argv, make_vocabs, build_model_api
+
+theano.config.floatX = 'float32'
+
+
+def _create_tables(n_trainable, n_frozen, dim_emb):
+    rng = np.random.RandomState(1)
+    trainable_emb = rng.randn(n_trainable, dim_emb).astype(theano.config.floatX)
+    frozen_emb = rng.randn(n_frozen, dim_emb).astype(theano.config.floatX)
+    return trainable_emb, frozen_emb
+
+
+def test_frozen_lookup():
+    import theano.tensor as T
+    from ..nn.layers import EmbeddingLayer
+
+    trainable_emb, frozen_emb = _create_tables(3, 2, 4)
+    layer = EmbeddingLayer(init_emb=trainable_emb, n_vocab=6, dim_emb=4, pad=1, frozen_emb=frozen_emb)
+    assert layer.params == [layer.emb]
+    assert layer.frozen not in layer.params
+
+    x = T.imatrix('x')
+    f = theano.function(inputs=[x], outputs=layer.lookup(x))
+    # id 0: padding, ids 1-3: trainable rows 0-2, ids 4-5: frozen rows 0-1
+    e = f(np.asarray([[0, 1, 2], [3, 4, 5]], dtype='int32'))
+    assert np.array_equal(e[0, 0], np.zeros(4))
+    assert np.allclose(e[0, 1:], trainable_emb[:2])
+    assert np.allclose(e[1, 0], trainable_emb[2])
+    assert np.allclose(e[1, 1:], frozen_emb)
+
+    # the frozen rows take no gradient
+    g = theano.function(inputs=[x], outputs=T.grad(T.sum(layer.lookup(x) ** 2), layer.emb))
+    assert np.array_equal(g(np.asarray([[4, 5]], dtype='int32')), np.zeros_like(trainable_emb))
+
+
+def test_set_frozen_value():
+    import theano.tensor as T
+    from ..nn.layers import EmbeddingLayer
+
+    trainable_emb, frozen_emb = _create_tables(3, 2, 4)
+    ids = np.asarray([[1, 4, 5]], dtype='int32')
+    x = T.imatrix('x')
+
+    # replaces the frozen table
+    layer = EmbeddingLayer(init_emb=trainable_emb, n_vocab=6, dim_emb=4, pad=1,
+                           frozen_emb=np.zeros_like(frozen_emb))
+    f = theano.function(inputs=[x], outputs=layer.lookup(x))
+    layer.set_frozen_value(frozen_emb)
+    assert np.allclose(f(ids)[0, 1:], frozen_emb)
+
+    # appended to the table of a layer built with one table
+    layer = EmbeddingLayer(init_emb=trainable_emb, n_vocab=4, dim_emb=4, pad=1)
+    f = theano.function(inputs=[x], outputs=layer.lookup(x))
+    layer.set_frozen_value(frozen_emb)
+    assert layer.emb.get_value().shape == (5, 4)
+    e = f(ids)
+    assert np.allclose(e[0, 0], trainable_emb[0])
+    assert np.allclose(e[0, 1:], frozen_emb)
+
+
+def test_frozen_save_load():
+    argv = make_argv()
+    vocab_word, vocab_label = make_vocabs()
+    # the padding, and 12 trainable and 8 frozen words
+    trainable_emb, frozen_emb = _create_tables(12, vocab_word.size() - 13, argv.dim_emb)
+
+    model_api = build_model_api(argv, vocab_word, vocab_label, init_emb=trainable_emb, frozen_emb=frozen_emb)
+    model_api.set_predict_f()
+    io_manager = model_api.io_manager
+    io_manager._save_params(model_api.model, 'frozen', io_manager.output_dir)
+    fn = os.path.join(io_manager.output_dir, 'param', 'param.frozen.pkl.gz')
+
+    rng = np.random.RandomState(1)
+    x_w = rng.randint(0, vocab_word.size(), size=(3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(3, 7)).astype('int32')
+    y = model_api.predict(x_w, x_p)[0]
+
+    # a model with the two tables
+    loaded = build_model_api(argv, vocab_word, vocab_label, init_emb=np.zeros_like(trainable_emb),
+                             frozen_emb=np.zeros_like(frozen_emb))
+    loaded.load_params(fn)
+    layer = loaded.model.emb_layers[0]
+    assert np.allclose(layer.emb.get_value(), trainable_emb)
+    assert np.allclose(layer.frozen.get_value(), frozen_emb)
+    loaded.set_predict_f()
+    assert np.allclose(loaded.predict(x_w, x_p)[0], y, atol=1e-5)
+
+    # a model built with one table at test time
+    loaded = build_model_api(argv, vocab_word, vocab_label)
+    loaded.load_params(fn)
+    layer = loaded.model.emb_layers[0]
+    assert layer.frozen is None
+    assert np.allclose(layer.emb.get_value(), np.concatenate([trainable_emb, frozen_emb]))
+    loaded.set_predict_f()
+    assert np.allclose(loaded.predict(x_w, x_p)[0], y, atol=1e-5)
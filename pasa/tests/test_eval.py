@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+import numpy as np
+
+
+def _write_results(n_sents):
+    lines = []
+    for i in xrange(n_sents):
+        for w in xrange(4):
+            lines.append('%d\tw%d\t%d\t%d' % (w, w, w / 2, 1 - w / 2))
+        lines.append('#\tPRD\t1:w1')
+        lines.append('*\tGold\tGa:0 O:%d' % (2 + i % 2))
+        lines.append('*\tSys\tGa:0 O:3')
+        lines.append('')
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, 'w') as fout:
+        fout.write('\n'.join(lines) + '\n')
+    return path
+
+
+def test_shards_add_up():
+    from ..api.eval import _eval_shard
+    from ..experimenter.evaluator import ResultEval
+    from ..utils.io_utils import get_shard_offsets
+
+    path = _write_results(n_sents=7)
+    data, n_sents, n_prds = _eval_shard((path, 0, os.path.getsize(path), 0))
+    whole = ResultEval.deserialize(data)
+    assert n_sents == 7 and n_prds == 7
+
+    # the shard boundaries fall on every kind of byte, including the newlines ending the lines of a sentence
+    for n_shards in xrange(1, 64):
+        offsets = get_shard_offsets(path, n_shards)
+        shards = [_eval_shard((path, offsets[i], offsets[i + 1], 0)) for i in xrange(n_shards)]
+        assert sum(shard[1] for shard in shards) == 7
+        assert sum(shard[2] for shard in shards) == 7
+
+        merged = ResultEval()
+        for shard in shards:
+            merged.merge(ResultEval.deserialize(shard[0]))
+        assert np.array_equal(merged.corrects, whole.corrects)
+        assert np.array_equal(merged.results_sys, whole.results_sys)
+        assert np.array_equal(merged.results_gold, whole.results_gold)
+
+
+def test_eval_in_shards_matches_sequential():
+    from ..experimenter.evaluator import BatchEval, eval_in_shards
+
+    rng = np.random.RandomState(0)
+    batches = [(rng.randint(0, 5, size=(2, 6)), rng.randint(0, 5, size=(2, 6))) for i in xrange(10)]
+
+    def update(evaluator, batch):
+        evaluator.update_results(*batch)
+
+    sequential = eval_in_shards(BatchEval, update, batches)
+    sharded = eval_in_shards(BatchEval, update, batches, n_workers=3)
+    assert np.array_equal(sequential.corrects, sharded.corrects)
+    assert np.array_equal(sequential.results_sys, sharded.results_sys)
+    assert np.array_equal(sequential.results_gold, sharded.results_gold)
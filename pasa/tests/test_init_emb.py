@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+import numpy as np
+
+LINES = ['the 0.5 1.0 -1.0',
+         'a 1.0 2.0 3.0',
+         'the 9.0 9.0 9.0',
+         'short 1.0 2.0',
+         'cat -1.5 0.0 1.0']
+
+
+def _write_emb(lines):
+    fn = os.path.join(tempfile.mkdtemp(), 'emb.txt')
+    with open(fn, 'w') as fout:
+        fout.write('\n'.join(lines) + '\n')
+    return fn
+
+
+def _get_rows(vocab_word, emb, words):
+    return emb[[vocab_word.get_id(w) for w in words]]
+
+
+def test_convert_init_emb():
+    from ..utils.io_utils import convert_init_emb, get_binary_emb_fns
+    from ..ling.vocab import Vocab
+
+    fn = _write_emb(LINES)
+    convert_init_emb(fn, 3)
+    matrix_fn, vocab_fn = get_binary_emb_fns(fn, 3)
+    assert not os.path.exists(matrix_fn + '.tmp')
+
+    # the duplicate and the wrong-dimension lines are skipped
+    emb_vocab = Vocab.load(vocab_fn)
+    assert [emb_vocab.get_word(i) for i in xrange(emb_vocab.size())] == [u'the', u'a', u'cat']
+    matrix = np.fromfile(matrix_fn, dtype='float32').reshape((-1, 3))
+    assert np.array_equal(matrix, [[0.5, 1., -1.], [1., 2., 3.], [-1.5, 0., 1.]])
+
+
+def test_load_init_emb():
+    from ..utils.io_utils import load_init_emb, get_binary_emb_fns
+    from ..ling.vocab import UNK
+
+    fn = _write_emb(LINES)
+    expected = np.asarray([[0.5, 1., -1.], [1., 2., 3.], [-1.5, 0., 1.]])
+
+    vocab_word, emb = load_init_emb(fn, 3)
+    assert vocab_word.size() == emb.shape[0] == 4
+    assert np.allclose(_get_rows(vocab_word, emb, [u'the', u'a', u'cat']), expected)
+    assert np.allclose(emb[vocab_word.get_id(UNK)], np.mean(expected, axis=0))
+
+    # the binary cache is written once and reused, even if the text file changes
+    matrix_fn, vocab_fn = get_binary_emb_fns(fn, 3)
+    mtime = os.path.getmtime(matrix_fn)
+    os.rename(_write_emb(['the 0.0 0.0 0.0']), fn)
+    vocab_word, cached_emb = load_init_emb(fn, 3)
+    assert os.path.getmtime(matrix_fn) == mtime
+    assert np.array_equal(cached_emb, emb)
+
+    # only the given words and UNK, whose row is still the mean of all the rows
+    vocab_word, emb = load_init_emb(fn, 3, words=[u'cat', u'dog', u'the'])
+    assert vocab_word.size() == emb.shape[0] == 3
+    assert np.allclose(_get_rows(vocab_word, emb, [u'the', u'cat']), expected[[0, 2]])
+    assert not vocab_word.has_key(u'dog')
+    assert np.allclose(emb[vocab_word.get_id(UNK)], np.mean(expected, axis=0))
+
+
+def test_load_init_emb_with_unk():
+    from ..utils.io_utils import load_init_emb
+    from ..ling.vocab import UNK
+
+    fn = _write_emb(LINES + ['%s 7.0 7.0 7.0' % UNK])
+    vocab_word, emb = load_init_emb(fn, 3, words=[u'a'])
+    assert vocab_word.size() == emb.shape[0] == 2
+    assert np.allclose(emb[vocab_word.get_id(UNK)], [7., 7., 7.])
+
+
+def test_get_mean_emb():
+    from ..utils.io_utils import get_mean_emb
+
+    matrix = np.random.RandomState(0).randn(7, 3).astype('float32')
+    for chunk_size in [1, 2, 3, 7, 100]:
+        assert np.allclose(get_mean_emb(matrix, chunk_size=chunk_size), np.mean(matrix, axis=0, dtype='float64'))
+    assert np.array_equal(get_mean_emb(np.zeros((0, 3), dtype='float32')), np.zeros(3))
@@ -0,0 +1,127 @@
+import os
+import tempfile
+
+import numpy as np
+import theano
+
+from . import make_argv, build_model_api
+
+theano.config.floatX = 'float32'
+
+
+def _build_model_api(model, unit, layers=2):
+    model_api = build_model_api(make_argv(model=model, unit=unit, layers=layers))
+    model_api.set_predict_f()
+    return model_api
+
+
+def _check_export(model_api, inputs):
+    from ..model.numpy_model import NumpyModel
+
+    fn = os.path.join(tempfile.mkdtemp(), 'model.npz')
+    model_api.io_manager.export_numpy_model(model_api.model)
+    exported = os.path.join(model_api.io_manager.output_dir, 'numpy', 'numpy.test.npz')
+    os.rename(exported, fn)
+
+    y_theano = model_api.predict(*inputs)[0]
+    y_numpy = NumpyModel(fn).predict(*inputs)[0]
+    assert y_theano.shape == y_numpy.shape
+    assert np.allclose(y_theano, y_numpy, atol=1e-4)
+
+
+def test_base_gru():
+    rng = np.random.RandomState(1)
+    model_api = _build_model_api('base', 'gru')
+    x_w = rng.randint(0, 21, size=(3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(3, 7)).astype('int32')
+    _check_export(model_api, [x_w, x_p])
+
+
+def test_base_lstm():
+    rng = np.random.RandomState(1)
+    model_api = _build_model_api('base', 'lstm', layers=3)
+    x_w = rng.randint(0, 21, size=(3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(3, 7)).astype('int32')
+    _check_export(model_api, [x_w, x_p])
+
+
+def test_grid():
+    rng = np.random.RandomState(1)
+    model_api = _build_model_api('grid', 'gru')
+    x_w = rng.randint(0, 21, size=(2, 3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(2, 3, 7)).astype('int32')
+    _check_export(model_api, [x_w, x_p])
+
+
+def test_engine_without_graph():
+    from ..model.model_api import BaseModelAPI
+
+    rng = np.random.RandomState(1)
+    model_api = _build_model_api('base', 'gru')
+    model_api.io_manager.export_numpy_model(model_api.model)
+    fn = os.path.join(model_api.io_manager.output_dir, 'numpy', 'numpy.test.npz')
+
+    engine_api = BaseModelAPI(model_api.argv)
+    engine_api.compile_io(vocab_word=model_api.vocab_word, vocab_label=model_api.vocab_label)
+    engine_api.load_numpy_model(fn)
+    assert engine_api.model is None
+    assert engine_api.io_manager is not None and engine_api.decoder is not None
+
+    x_w = rng.randint(0, 21, size=(3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(3, 7)).astype('int32')
+    assert np.allclose(model_api.predict(x_w, x_p)[0], engine_api.predict(x_w, x_p)[0], atol=1e-4)
+
+
+def test_quantized():
+    from ..model.numpy_model import NumpyModel, QuantizedMatrix, load_arrays
+
+    rng = np.random.RandomState(1)
+    model_api = _build_model_api('base', 'gru')
+    model_api.io_manager.export_numpy_model(model_api.model, quantize=True)
+    fn = os.path.join(model_api.io_manager.output_dir, 'numpy', 'numpy.test.int8.npz')
+
+    data = np.load(fn)
+    arrays = load_arrays(data)
+    assert data['W_out.q'].dtype == np.int8
+    assert data['W_out.scale'].shape == (arrays['W_out'].shape[1],)
+    # kept as int8 in memory
+    assert isinstance(arrays['rnn.0.W_xr'], QuantizedMatrix)
+    assert arrays['rnn.0.W_xr'].q.dtype == np.int8
+    assert 'word_emb.q' not in data.files
+    data.close()
+
+    engine = NumpyModel(fn)
+    assert isinstance(engine.params['W_out'], QuantizedMatrix)
+    assert engine.units[0].W_x.q.dtype == np.int8
+
+    x_w = rng.randint(0, 21, size=(3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(3, 7)).astype('int32')
+    y_theano = model_api.predict(*[x_w, x_p])[0]
+    y_numpy = engine.predict(x_w, x_p)[0]
+    assert np.allclose(y_theano, y_numpy, atol=0.05)
+
+    # a float model quantized when loaded predicts the same as the exported int8 model
+    model_api.io_manager.export_numpy_model(model_api.model)
+    float_fn = os.path.join(model_api.io_manager.output_dir, 'numpy', 'numpy.test.npz')
+    assert np.allclose(NumpyModel(float_fn, quantize=True).predict(x_w, x_p)[0], y_numpy, atol=1e-5)
+
+
+def test_ensemble():
+    rng = np.random.RandomState(1)
+    model_api = _build_model_api('grid', 'gru')
+    x_w = rng.randint(0, 21, size=(2, 3, 7, 6)).astype('int32')
+    x_p = rng.randint(0, 2, size=(2, 3, 7)).astype('int32')
+
+    io_manager = model_api.io_manager
+    param_fns = []
+    y_probs = []
+    for seed in xrange(2):
+        np.random.seed(seed)
+        model_api.compile(vocab_word=model_api.vocab_word, vocab_label=model_api.vocab_label, init_emb=None)
+        model_api.set_predict_f()
+        y_probs.append(model_api.predict(x_w, x_p)[0])
+        io_manager._save_params(model_api.model, 'seed-%d' % seed, io_manager.output_dir)
+        param_fns.append(os.path.join(io_manager.output_dir, 'param', 'param.seed-%d.pkl.gz' % seed))
+
+    model_api.set_ensemble_predict_f(param_fns)
+    assert np.allclose(model_api.predict(x_w, x_p)[0], np.mean(y_probs, axis=0), atol=1e-5)
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def _check_rows_not_looked_up(opt):
+    import theano
+    import theano.tensor as T
+    from ..nn.layers import EmbeddingLayer
+    from ..nn.optimizers import sparse_emb_grads, ada_grad, adam
+
+    np.random.seed(0)
+    # id 0: padding, ids 1-4: trainable rows 0-3, ids 5-6: frozen rows
+    frozen_emb = np.random.randn(2, 3).astype(theano.config.floatX)
+    layer = EmbeddingLayer(init_emb=None, n_vocab=5, dim_emb=3, pad=1, frozen_emb=frozen_emb)
+    x = T.imatrix('x')
+    cost = T.sum(layer.lookup(x) ** 2)
+    lookups = [(layer.emb, ids, e, layer.offset) for ids, e in layer.lookups]
+    sparse_grads = sparse_emb_grads(cost=cost, lookups=lookups, reg=0.1)
+    optimize = adam if opt == 'adam' else ada_grad
+    train = theano.function(inputs=[x], outputs=cost, updates=optimize(cost=cost, params=[],
+                                                                      sparse_grads=sparse_grads))
+
+    emb = layer.emb.get_value()
+    for i in xrange(3):
+        # row 0 (id 1) and row 3 (id 4) are never looked up
+        train(np.asarray([[0, 2, 5], [3, 6, 0]], dtype='int32'))
+    updated = layer.emb.get_value()
+    assert np.array_equal(updated[[0, 3]], emb[[0, 3]])
+    assert not np.allclose(updated[[1, 2]], emb[[1, 2]])
+
+
+def test_adam_rows_not_looked_up():
+    _check_rows_not_looked_up('adam')
+
+
+def test_ada_grad_rows_not_looked_up():
+    _check_rows_not_looked_up('adagrad')
+
+
+def test_lookup_once_per_input():
+    import theano.tensor as T
+    from ..nn.layers import EmbeddingLayer
+
+    layer = EmbeddingLayer(init_emb=None, n_vocab=5, dim_emb=3, pad=1)
+    x = T.imatrix('x')
+    e = layer.lookup(x)
+    assert layer.lookup(x) is e
+    layer.lookup(T.imatrix('x_other'))
+    assert len(layer.lookups) == 2
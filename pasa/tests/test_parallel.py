@@ -0,0 +1,118 @@
+import numpy as np
+import theano
+
+from . import make_argv, make_vocabs, build_model_api
+
+theano.config.floatX = 'float32'
+
+
+def _get_batches(argv, vocab_word, n_batches=5):
+    rng = np.random.RandomState(1)
+    batches = []
+    for i in xrange(n_batches):
+        batch, n_words = argv.batch_size, rng.randint(2, 6)
+        x_w = rng.randint(0, vocab_word.size(), size=(batch, n_words, 1 + argv.window)).astype('int32')
+        x_p = rng.randint(0, 2, size=(batch, n_words)).astype('int32')
+        y = rng.randint(0, 5, size=(batch, n_words)).astype('int32')
+        batches.append([x_w, x_p, y])
+    return batches
+
+
+def test_sync_one_worker_matches_adam():
+    argv = make_argv(parallel='sync')
+    vocab_word, vocab_label = make_vocabs()
+    batches = _get_batches(argv, vocab_word)
+
+    serial = build_model_api(argv, vocab_word, vocab_label)
+    serial.set_train_f()
+    serial_nll = [serial.train(*batch)[2] for batch in batches]
+
+    parallel = build_model_api(argv, vocab_word, vocab_label)
+    parallel.set_parallel_trainer(n_workers=1)
+    parallel_nll = [outputs[2] for index, outputs in parallel.parallel.train(batches)]
+    parallel.parallel.close()
+
+    assert np.allclose(serial_nll, parallel_nll, atol=1e-5)
+    for p1, p2 in zip(serial.model.params, parallel.model.params):
+        assert np.allclose(p1.get_value(), p2.get_value(), atol=1e-5)
+
+
+def test_sync_two_workers_update_all_params():
+    argv = make_argv(parallel='sync', n_workers=2)
+    vocab_word, vocab_label = make_vocabs()
+    batches = _get_batches(argv, vocab_word)
+
+    model_api = build_model_api(argv, vocab_word, vocab_label)
+    init_params = [p.get_value() for p in model_api.model.params]
+    model_api.set_parallel_trainer(n_workers=2)
+    indices = [index for index, outputs in model_api.parallel.train(batches)]
+    model_api.parallel.close()
+
+    assert indices == range(len(batches))
+    for p, init_p in zip(model_api.model.params, init_params):
+        assert not np.allclose(p.get_value(), init_p)
+
+
+def test_hogwild_rejects_unsupported_opt():
+    argv = make_argv(parallel='hogwild')
+    vocab_word, vocab_label = make_vocabs()
+    model_api = build_model_api(argv, vocab_word, vocab_label)
+    try:
+        model_api.set_parallel_trainer(n_workers=1)
+    except ValueError:
+        return
+    model_api.parallel.close()
+    assert False, 'hogwild accepted --opt adam'
+
+
+def _get_accumulators(model):
+    """
+    :return: 1D: n_params; elem=AdaGrad accumulator of each param, which ada_grad updates right before the param
+    """
+    keys = list(model.update.keys())
+    accum = dict((id(keys[i]), keys[i - 1]) for i in xrange(1, len(keys)) if keys[i] in model.params)
+    return [accum[id(p)] for p in model.params]
+
+
+def test_hogwild_one_worker_matches_adagrad():
+    argv = make_argv(parallel='hogwild', opt='adagrad', sparse_emb=1)
+    vocab_word, vocab_label = make_vocabs()
+    batches = _get_batches(argv, vocab_word)
+    # the word ids 10 and above are never looked up
+    for batch in batches:
+        batch[0] %= 10
+
+    serial = build_model_api(argv, vocab_word, vocab_label)
+    serial.set_train_f()
+    serial_nll = [serial.train(*batch)[2] for batch in batches]
+
+    hogwild = build_model_api(argv, vocab_word, vocab_label)
+    emb = hogwild.model.emb_layers[0].emb
+    init_emb = emb.get_value()
+    hogwild.set_parallel_trainer(n_workers=1)
+    trainer = hogwild.parallel
+    hogwild_nll = [outputs[2] for index, outputs in trainer.train(batches)]
+    trainer.close()
+
+    assert np.allclose(serial_nll, hogwild_nll, atol=1e-5)
+    for p1, p2 in zip(serial.model.params, hogwild.model.params):
+        assert np.allclose(p1.get_value(), p2.get_value(), atol=1e-5)
+    for r, shared_r in zip(_get_accumulators(serial.model), trainer.shared_accum):
+        assert np.allclose(r.get_value(), shared_r, atol=1e-5)
+
+    # the rows of the word embeddings: ids - offset
+    offset = hogwild.model.emb_layers[0].offset
+    assert not np.allclose(emb.get_value()[:10 - offset], init_emb[:10 - offset])
+    assert np.array_equal(emb.get_value()[10 - offset:], init_emb[10 - offset:])
+
+    # the out-of-range ids (e.g. the padding) update no rows
+    emb_index = trainer.emb_lookups[0][0]
+    n_rows = init_emb.shape[0]
+    values = emb.get_value()
+    accum = np.array(trainer.shared_accum[emb_index])
+    g = np.ones((4, init_emb.shape[1]), dtype=init_emb.dtype)
+    trainer._update_rows(emb_index, np.asarray([-1, 0, n_rows, 0]), g)
+    assert not np.allclose(emb.get_value()[0], values[0])
+    assert np.array_equal(emb.get_value()[1:], values[1:])
+    assert np.allclose(trainer.shared_accum[emb_index][0], accum[0] + np.square(2. + argv.reg * values[0]))
+    assert np.array_equal(trainer.shared_accum[emb_index][1:], accum[1:])
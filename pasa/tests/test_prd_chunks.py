@@ -0,0 +1,16 @@
+def test_prd_chunks():
+    from ..preprocessor.sample import get_prd_chunks
+
+    assert get_prd_chunks(3, 0, 2) == [(0, 3, 0, 3)]
+    assert get_prd_chunks(3, 4, 2) == [(0, 3, 0, 3)]
+
+    for n_prds, max_prds, overlap in [(10, 4, 2), (5, 4, 1), (9, 3, 0), (7, 2, 5)]:
+        chunks = get_prd_chunks(n_prds, max_prds, overlap)
+        assert chunks[0][0] == 0 and chunks[-1][1] == n_prds
+        owned = []
+        for first, last, own_first, own_last in chunks:
+            assert last - first == max_prds
+            assert first <= own_first < own_last <= last
+            owned.extend(range(own_first, own_last))
+        assert owned == range(n_prds)
+
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+
+
+def test_profiler():
+    from ..utils.profiler import Profiler
+
+    profiler = Profiler()
+    f = lambda x: x + 1
+    assert profiler.timed('f', f) is f
+
+    fn = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+    profiler.enable(trace_fn=fn)
+    timed_f = profiler.timed('f', f)
+    assert [timed_f(i) for i in xrange(3)] == [1, 2, 3]
+    with profiler.timer('outer'):
+        with profiler.timer('inner'):
+            profiler.count('n', 2)
+    profiler.show_summary()
+
+    assert profiler.calls['f'] == 3 and profiler.calls['inner'] == 1
+    assert profiler.seconds['outer'] >= profiler.seconds['inner']
+    with open(fn) as fin:
+        records = [json.loads(line) for line in fin]
+    assert [record['name'] for record in records] == ['f', 'f', 'f', 'inner', 'outer', 'summary']
+    assert records[-1]['counts'] == {'n': 2}
+
+
+def test_profiler_ignores_child_processes():
+    from ..utils.profiler import Profiler
+
+    fn = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+    profiler = Profiler()
+    profiler.enable(trace_fn=fn)
+    timed_f = profiler.timed('f', lambda x: x + 1)
+
+    # as seen from a forked worker
+    profiler.pid = os.getpid() + 1
+    assert timed_f(1) == 2
+    profiler.count('n')
+    profiler.pid = os.getpid()
+
+    assert profiler.calls['f'] == 0 and profiler.counts['n'] == 0
+    profiler.show_summary()
+    with open(fn) as fin:
+        assert [json.loads(line)['name'] for line in fin] == ['summary']
+
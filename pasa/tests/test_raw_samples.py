@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from . import make_argv, make_vocabs
+
+# kare (noun) ha (particle) | hashiru (verb, marked) ookii (adjective) da (copula)
+WORDS = [(u'彼', u'名詞', u'id="1"'),
+         (u'は', u'助詞', u'_'),
+         (u'走る', u'動詞', u'alt="active"/ga="1"/ga_type="dep"/type="pred"'),
+         (u'大きい', u'形容詞', u'_'),
+         (u'だ', u'判定詞', u'_')]
+
+
+def _load_sent(words):
+    from ..utils.io_utils import NTCLoader
+
+    lines = ['* 0 1D']
+    for i, (form, pos, pas_info) in enumerate(words):
+        if i == 2:
+            lines.append('* 1 -1D')
+        lines.append(u'\t'.join([form, form, form, pos, u'*', u'*', u'*', pas_info]).encode('utf-8'))
+    lines.append('EOS')
+    return list(NTCLoader(min_unit='word', data_size=None).iter_sents(lines))[0]
+
+
+def _create_factory(prd_pos=0):
+    from ..ling.vocab import UNK
+    from ..preprocessor.sample_factory import BaseSampleFactory
+
+    argv = make_argv(prd_pos=prd_pos, gzip_pas=0)
+    vocab_word, vocab_label = make_vocabs()
+    vocab_word.add_word(UNK)
+    return BaseSampleFactory(argv, vocab_word, vocab_label)
+
+
+def test_raw_sample_prds():
+    sent = _load_sent(WORDS)
+
+    sample = _create_factory().create_raw_samples([sent])[0]
+    assert sample.prd_indices == [2]
+    assert sample.y is None and sample.label_ids == []
+    assert sample.x[0].shape == (1, 5, 6) and sample.x[1].shape == (1, 5)
+
+    sample = _create_factory(prd_pos=1).create_raw_samples([sent])[0]
+    assert sample.prd_indices == [2, 3, 4]
+    assert sample.n_prds == 3 and sample.y is None
+
+    # without the annotated arguments, the predicate is not marked as type="pred"
+    raw_words = [(form, pos, u'_') for form, pos, pas_info in WORDS]
+    sample = _create_factory().create_raw_samples([_load_sent(raw_words)])[0]
+    assert sample.prd_indices == [] and sample.n_prds == 0
+
+
+def test_raw_sample_pas_result():
+    from ..model.model_io import IOManager
+
+    sent = _load_sent(WORDS)
+    factory = _create_factory()
+    io_manager = IOManager(factory.argv, factory.vocab_word, factory.vocab_label)
+    # Ga, NA, V, NA, NA
+    result = [[1, 0, 4, 0, 0]]
+
+    gold_sample = factory.create_samples([sent])[0]
+    assert gold_sample.prd_indices == [2]
+    gold_lines = io_manager.format_pas_result(result, gold_sample).split(u'\n')
+    assert u'*\tGold\tGa:0:彼 ' in gold_lines
+
+    raw_sample = factory.create_raw_samples([sent])[0]
+    raw_lines = io_manager.format_pas_result(result, raw_sample).split(u'\n')
+    assert [line for line in raw_lines if line.startswith(u'*\tGold')] == []
+    assert u'#\tPRD\t2:走る' in raw_lines and u'*\tSys\tGa:0:彼 ' in raw_lines
+    assert [line for line in gold_lines if not line.startswith(u'*\tGold')] == raw_lines
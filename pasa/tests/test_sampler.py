@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def _create_batches(lengths, window=5):
+    # 1D: n_inputs (x_w, y), 2D: batch_size; x_w of a sample: 1D: n_words, 2D: window + 1
+    return [[[np.zeros((n_words, window + 1), dtype='int32')], [np.zeros(n_words, dtype='int32')]]
+            for n_words in lengths]
+
+
+def test_curriculum_sampler():
+    from ..preprocessor.sampler import CurriculumSampler
+
+    lengths = [3, 40, 10, 25, 5, 60, 15, 8, 30, 20]
+    batches = _create_batches(lengths)
+    sampler = CurriculumSampler(n_epochs=3, start=0.2)
+
+    n_batches = []
+    for epoch in xrange(4):
+        indices = sampler.sample(batches)
+        assert len(set(indices)) == len(indices)
+        n_batches.append(len(indices))
+        if epoch == 0:
+            assert max(lengths[i] for i in indices) < 10
+    assert n_batches == sorted(n_batches)
+    assert n_batches[-1] == n_batches[-2] == len(batches)
+
+
+def test_loss_sampler():
+    from ..preprocessor.sampler import LossSampler
+
+    np.random.seed(0)
+    batches = _create_batches([5] * 10)
+    sampler = LossSampler(alpha=1., mix=0.1)
+
+    indices = sampler.sample(batches)
+    assert indices == range(len(batches))
+    for index in indices:
+        sampler.update(index, 10. if index == 3 else 0.1)
+
+    counts = np.bincount([i for epoch in xrange(20) for i in sampler.sample(batches)], minlength=len(batches))
+    assert counts.sum() == 20 * len(batches)
+    assert counts[3] > counts.sum() / 2
+    assert np.all(counts > 0)
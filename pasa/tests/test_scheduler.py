@@ -0,0 +1,132 @@
+import argparse
+import time
+
+import numpy as np
+
+
+class _StubModelAPI(object):
+
+    def __init__(self):
+        self.batches = []
+
+    def get_bucket_key(self, sample):
+        return sample.n_prds, sample.n_words
+
+    def predict_samples(self, samples):
+        self.batches.append(samples)
+        if any(sample.fail for sample in samples):
+            raise ValueError('failed batch')
+        return [sample.index for sample in samples]
+
+
+def _create_sample(index, n_prds=1, n_words=5, fail=False):
+    return argparse.Namespace(index=index, n_prds=n_prds, n_words=n_words, fail=fail)
+
+
+def _add(scheduler, sample, arrival):
+    from ..server.scheduler import Future
+
+    future = Future()
+    scheduler._add_to_bucket((sample, future, arrival))
+    return future
+
+
+def test_flush_at_max_batch_size():
+    from ..server.scheduler import BatchScheduler
+
+    model_api = _StubModelAPI()
+    scheduler = BatchScheduler(model_api, max_batch_size=3, max_wait=10.)
+    futures = [_add(scheduler, _create_sample(i), arrival=0.) for i in xrange(7)]
+
+    scheduler._dispatch(now=0.)
+    assert [len(batch) for batch in model_api.batches] == [3, 3]
+    assert [future.done() for future in futures] == [True] * 6 + [False]
+    assert scheduler.n_pending == 1
+
+    scheduler._dispatch(now=10.)
+    assert [len(batch) for batch in model_api.batches] == [3, 3, 1]
+    assert [future.result(timeout=0) for future in futures] == range(7)
+    assert scheduler.n_pending == 0 and not scheduler.buckets
+
+
+def test_flush_at_max_wait():
+    from ..server.scheduler import BatchScheduler
+
+    model_api = _StubModelAPI()
+    scheduler = BatchScheduler(model_api, max_batch_size=32, max_wait=1.)
+    first = _add(scheduler, _create_sample(0, n_words=5), arrival=0.)
+    second = _add(scheduler, _create_sample(1, n_words=8), arrival=0.5)
+
+    scheduler._dispatch(now=0.9)
+    assert not model_api.batches
+
+    scheduler._dispatch(now=1.)
+    assert first.done() and not second.done()
+    assert [[sample.index for sample in batch] for batch in model_api.batches] == [[0]]
+
+    scheduler._dispatch(now=1.5)
+    assert second.result(timeout=0) == 1
+
+
+def test_bucket_grouping():
+    from ..server.scheduler import BatchScheduler
+
+    model_api = _StubModelAPI()
+    scheduler = BatchScheduler(model_api, max_batch_size=2, max_wait=1.)
+    shapes = [(1, 5), (2, 5), (1, 5), (1, 7), (2, 5), (1, 5), (1, 7), (2, 5)]
+    for i, (n_prds, n_words) in enumerate(shapes):
+        _add(scheduler, _create_sample(i, n_prds, n_words), arrival=0.)
+    assert sorted(scheduler.buckets.keys()) == [(1, 5), (1, 7), (2, 5)]
+
+    scheduler._dispatch(now=1.)
+    assert sum(len(batch) for batch in model_api.batches) == len(shapes)
+    for batch in model_api.batches:
+        assert len(batch) <= 2
+        assert len(set((sample.n_prds, sample.n_words) for sample in batch)) == 1
+
+
+def test_futures():
+    from ..server.scheduler import BatchScheduler
+
+    model_api = _StubModelAPI()
+    scheduler = BatchScheduler(model_api, max_batch_size=4, max_wait=0.001)
+    scheduler.start()
+    try:
+        assert scheduler.submit(_create_sample(0, n_prds=0)).result(timeout=0) == []
+        futures = [scheduler.submit(_create_sample(i)) for i in xrange(1, 6)]
+        failed = scheduler.submit(_create_sample(6, n_words=9, fail=True))
+        assert [future.result(timeout=5) for future in futures] == range(1, 6)
+
+        try:
+            failed.result(timeout=5)
+            assert False
+        except ValueError as e:
+            assert str(e) == 'failed batch'
+    finally:
+        scheduler.stop()
+
+
+def test_get_stats():
+    from ..server.scheduler import BatchScheduler
+
+    model_api = _StubModelAPI()
+    scheduler = BatchScheduler(model_api, max_batch_size=4, max_wait=1.)
+    stats = scheduler.get_stats()
+    assert stats['batches'] == 0 and stats['fill_ratio'] == 0. and stats['p99_latency'] == 0.
+
+    now = time.time()
+    for i in xrange(6):
+        _add(scheduler, _create_sample(i), arrival=now - i)
+    assert scheduler.get_stats()['queue_depth'] == 6
+
+    scheduler._dispatch(now=now + 1.)
+    stats = scheduler.get_stats()
+    assert stats['queue_depth'] == 0
+    assert stats['batches'] == 2
+    assert stats['fill_ratio'] == 6 / 8.
+
+    latencies = list(scheduler.latencies)
+    assert len(latencies) == 6 and min(latencies) >= 0.
+    assert stats['p50_latency'] == np.percentile(latencies, 50)
+    assert stats['p99_latency'] == np.percentile(latencies, 99)
+    assert 2. <= stats['p50_latency'] < stats['p99_latency'] and 4.9 <= stats['p99_latency']
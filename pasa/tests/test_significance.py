@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def _get_counts(rng, n_sents):
+    gold = rng.randint(0, 4, size=(n_sents, 3, 3)).astype('float32')
+    sys = rng.randint(0, 4, size=(n_sents, 3, 3)).astype('float32')
+    corrects = np.minimum(gold, sys) * (rng.rand(n_sents, 3, 3) < 0.7)
+    return np.stack([corrects, sys, gold], axis=1)
+
+
+def test_metrics_match_sample_eval():
+    from ..experimenter.evaluator import SampleEval
+    from ..experimenter.significance import calc_metrics
+
+    counts = _get_counts(np.random.RandomState(0), 50)
+    pred_eval = SampleEval()
+    pred_eval.corrects, pred_eval.results_sys, pred_eval.results_gold = counts.sum(axis=0)
+    pred_eval._summarize()
+
+    metrics = calc_metrics(counts.sum(axis=0, keepdims=True))[0]
+    assert np.allclose(metrics[2, -1], pred_eval.all_f1)
+    assert np.allclose(metrics[:, 0], [pred_eval.precision[0, 1], pred_eval.recall[0, 1], pred_eval.f1[0, 1]])
+
+
+def test_identical_systems():
+    from ..experimenter.significance import approximate_randomization, paired_bootstrap, calc_metrics
+
+    counts = _get_counts(np.random.RandomState(0), 50)
+    resampled = paired_bootstrap([counts, counts.copy()], n_resamples=500)
+    assert np.array_equal(resampled[0], resampled[1])
+
+    observed = calc_metrics(counts.sum(axis=0, keepdims=True))[0]
+    lower, upper = np.percentile(resampled[0], [2.5, 97.5], axis=0)
+    assert np.all(lower <= observed + 1e-6) and np.all(observed <= upper + 1e-6)
+
+    assert np.allclose(approximate_randomization(counts, counts.copy(), n_trials=200), 1.)
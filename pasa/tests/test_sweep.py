@@ -0,0 +1,15 @@
+import argparse
+
+
+def test_sweep_rejects_parallel():
+    from ..api import sweep
+
+    for parallel in ['sync', 'hogwild']:
+        argv = argparse.Namespace(parallel=parallel, n_workers=2, sweep='layers=1,2', sweep_workers=2)
+        try:
+            sweep.main(argv)
+        except ValueError as e:
+            assert '--parallel' in str(e)
+        else:
+            assert False, 'sweep accepted --parallel %s' % parallel
+
@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+
+def test_synthetic_corpus():
+    from ..bench.synthetic import write_corpus
+    from ..utils.io_utils import NTCLoader
+
+    path = os.path.join(tempfile.mkdtemp(), 'synthetic.ntc')
+    write_corpus(path, n_sents=25, n_sents_per_doc=10, length_dist='uniform', min_words=3, max_words=20)
+    corpus = NTCLoader(min_unit='word', data_size=None).load_corpus(path)
+
+    assert [len(doc) for doc in corpus] == [10, 10, 5]
+    sents = [sent for doc in corpus for sent in doc]
+    assert all(3 <= len(sent) <= 20 for sent in sents)
+    prds = [w for sent in sents for w in sent if w.is_prd]
+    assert prds and any(prd.has_args() for prd in prds)
+    for sent in sents:
+        for prd in sent:
+            for arg_index in prd.arg_indices:
+                assert arg_index == -1 or sent[arg_index].chunk_index != prd.chunk_index
+
+
+def test_synthetic_arg_types():
+    from ..bench.synthetic import NTCGenerator
+    from ..ling.word import DEP, INTRA_ZERO
+    from ..utils.io_utils import NTCLoader
+
+    path = os.path.join(tempfile.mkdtemp(), 'synthetic.ntc')
+    loader = NTCLoader(min_unit='word', data_size=None)
+    for zero_rate, arg_type in [(0., DEP), (1., INTRA_ZERO)]:
+        NTCGenerator(zero_rate=zero_rate, inter_rate=0., exo_rate=0.).write(path, n_docs=5)
+        arg_types = [t for doc in loader.load_corpus(path) for sent in doc for w in sent if w.is_prd
+                     for t in w.arg_types if t > -1]
+        assert arg_types and set(arg_types) == {arg_type}
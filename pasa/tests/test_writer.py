@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import gzip
+import os
+import tempfile
+
+
+def _write(path, records, compress):
+    from ..utils.io_utils import BulkWriter
+
+    with BulkWriter(path, compress=compress, buffer_size=16) as writer:
+        for record in records:
+            writer.write(record)
+
+
+def test_bulk_writer():
+    records = [u'%d\t語%d\t\n' % (i, i) for i in xrange(100)]
+    expected = u''.join(records).encode('utf-8')
+    dn = os.path.join(tempfile.mkdtemp(), 'pas')
+
+    path = os.path.join(dn, 'pas.txt')
+    _write(path, records, compress=False)
+    with open(path) as fin:
+        assert fin.read() == expected
+
+    path = os.path.join(dn, 'pas.txt.gz')
+    _write(path, records, compress=True)
+    with gzip.open(path) as fin:
+        assert fin.read() == expected
+    assert sorted(os.listdir(dn)) == ['pas.txt', 'pas.txt.gz']
+
+
+def test_bulk_writer_abort():
+    path = os.path.join(tempfile.mkdtemp(), 'pas.txt')
+    try:
+        _write(path, [u'a\n', None], compress=True)
+    except TypeError:
+        pass
+    assert os.listdir(os.path.dirname(path)) == []
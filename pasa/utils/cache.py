@@ -0,0 +1,99 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from io_utils import say, dump_data, load_data
+
+
+class LRUCache(object):
+    """
+    Least-recently-used cache bounded by the total bytes of the values.
+    The keys are content hashes, so the cache can be saved and reused by later runs.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        # key: content hash, value: (value, n_bytes); the least recently used first
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.pop(key, None)
+            if item is None:
+                self.n_misses += 1
+                return None
+            self.items[key] = item
+            self.n_hits += 1
+            return item[0]
+
+    def put(self, key, value, n_bytes=None):
+        if n_bytes is None:
+            n_bytes = get_nbytes(value)
+        if n_bytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.items:
+                self.n_bytes -= self.items.pop(key)[1]
+            self.items[key] = (value, n_bytes)
+            self.n_bytes += n_bytes
+            while self.n_bytes > self.max_bytes:
+                _, (_, size) = self.items.popitem(last=False)
+                self.n_bytes -= size
+
+    def save(self, fn):
+        with self.lock:
+            dump_data(self.items.items(), fn)
+
+    def load(self, fn):
+        for key, (value, n_bytes) in load_data(fn):
+            self.put(key, value, n_bytes)
+
+    def show_stats(self):
+        say('\n\tCache: Hits: %d  Misses: %d  Items: %d  Size: %.1f MB\n' % (
+            self.n_hits, self.n_misses, len(self.items), self.n_bytes / float(2 ** 20)))
+
+
+def get_fingerprint(values):
+    """
+    :param values: 1D: n_values; elem=numpy array, theano shared variable, or any object with a stable repr
+    :return: hex digest of the contents of the values
+    """
+    h = hashlib.md5()
+    for value in values:
+        if hasattr(value, 'get_value'):
+            value = value.get_value(borrow=True)
+        if isinstance(value, np.ndarray):
+            h.update('%s%s' % (value.dtype, value.shape))
+            h.update(np.ascontiguousarray(value).data)
+        else:
+            h.update(repr(value))
+    return h.hexdigest()
+
+
+def get_sent_key(sent):
+    """
+    :param sent: 1D: n_words; elem=Word
+    :return: hex digest of the attributes of the words used for the samples and their evaluation
+    """
+    return get_fingerprint([(w.form, w.pos, w.is_prd, w.arg_indices, w.arg_types, w.chunk_index, w.chunk_head)
+                            for w in sent])
+
+
+def get_nbytes(value):
+    """
+    :return: the bytes of the arrays in the value; other objects are counted shallowly
+    """
+    if value is None:
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(get_nbytes(v) for v in value)
+    return sys.getsizeof(value)
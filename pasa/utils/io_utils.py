@@ -3,6 +3,8 @@ import os
 import shutil
 import gzip
 import cPickle
+import threading
+import Queue
 from abc import ABCMeta, abstractmethod
 
 import numpy as np
@@ -83,6 +85,39 @@ class NTCLoader(CorpusLoader):
 
         return corpus
 
+    def iter_sents(self, lines):
+        """
+        Yield each sentence as soon as its EOS line is read; e.g., from a stream.
+        :param lines: iterable of lines in the NTC format
+        :return: generator of sentences; 1D: n_words; elem=Word
+        """
+        BOD = '#'
+        BOC = '*'
+        EOS = 'EOS'
+
+        sent = []
+        chunk_index = None
+        chunk_head = None
+
+        for line in lines:
+            elem = line.rstrip().split()
+            if len(elem) == 0 or line.startswith(BOD):
+                continue
+            elif line.startswith(BOC):
+                chunk_index, chunk_head = self._get_chunk_info(elem)
+            elif line.startswith(EOS):
+                for w in sent:
+                    w.set_cases(sent)
+                yield sent
+                sent = []
+            else:
+                word = self._get_word(w_index=len(sent),
+                                      chunk_index=chunk_index,
+                                      chunk_head=chunk_head,
+                                      sent_index=0,
+                                      elem=elem)
+                sent.append(word)
+
     @staticmethod
     def _get_doc_id(elem):
         return elem[1].split(':')[1].split('-')[0]
@@ -103,30 +138,73 @@ class NTCLoader(CorpusLoader):
 class CONLLLoader(CorpusLoader):
 
     def load_corpus(self, path):
+        with open(path) as f:
+            return list(self.iter_sents(f))
+
+    @staticmethod
+    def iter_sents(lines):
+        """
+        Yield each sentence as soon as its terminating empty line is read.
+        :param lines: iterable of lines in the format of the pas.*.txt files
+        :return: generator of Sentence
+        """
         PRD = '#'
         RESULT = '*'
-        corpus = []
-        with open(path) as f:
-            sent = Sentence()
-            for line in f:
-                line = line.rstrip()
-                elem = line.split('\t')
-
-                if len(line) == 0:
-                    corpus.append(sent)
-                    sent = Sentence()
-                elif elem[0] == PRD:
-                    sent.set_prd(elem)
-                elif elem[0] == RESULT:
-                    sent.set_args(elem)
-                else:
-                    sent.words.append(ConllWord(elem))
-        return corpus
+        sent = Sentence()
+        for line in lines:
+            line = line.rstrip()
+            elem = line.split('\t')
+
+            if len(line) == 0:
+                yield sent
+                sent = Sentence()
+            elif elem[0] == PRD:
+                sent.set_prd(elem)
+            elif elem[0] == RESULT:
+                sent.set_args(elem)
+            else:
+                sent.words.append(ConllWord(elem))
 
 
-def load_init_emb(fn, dim_emb):
+def get_shard_offsets(path, n_shards):
+    """
+    Split a file of sentences separated by empty lines into byte ranges of about the same size.
+    :return: 1D: n_shards + 1; elem=byte offset; each offset but the last is at the beginning of a sentence
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path) as f:
+        for i in xrange(1, n_shards):
+            offset = max(size * i / n_shards, offsets[-1])
+            # finish the line that includes the offset; the offset may be just after its newline
+            f.seek(max(offset - 1, 0))
+            f.readline()
+            # skip the rest of the sentence
+            line = f.readline()
+            while line and line.strip():
+                line = f.readline()
+            offsets.append(f.tell())
+    offsets.append(size)
+    return offsets
+
+
+def iter_lines(path, start, end):
+    """
+    :return: generator of the lines of the file that begin in [start, end)
+    """
+    with open(path) as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def load_init_emb(fn, dim_emb, words=None):
     """
     :param fn: each line: e.g., [the 0.418 0.24968 -0.41242 ...]
+    :param words: if given, only the embeddings of these words (and UNK) are loaded
     """
     vocab_word = Vocab()
 
@@ -135,29 +213,67 @@ def load_init_emb(fn, dim_emb):
         return vocab_word, None
 
     say('\nLoad Initial Word Embedding...')
-    emb = []
-    with open(fn) as lines:
+    matrix_fn, vocab_fn = get_binary_emb_fns(fn, dim_emb)
+    if not os.path.exists(matrix_fn):
+        say('\n\tConverting %s into %s...' % (fn, matrix_fn))
+        convert_init_emb(fn, dim_emb)
+
+    emb_vocab = Vocab.load(vocab_fn)
+    emb_matrix = np.memmap(matrix_fn, dtype='float32', mode='r', shape=(emb_vocab.size(), dim_emb))
+
+    if words is None:
+        rows = range(emb_vocab.size())
+    else:
+        rows = sorted(emb_vocab.get_id(w) for w in set(words) | {UNK} if emb_vocab.has_key(w))
+    for row in rows:
+        vocab_word.add_word(emb_vocab.get_word(row))
+
+    emb = np.empty((len(rows) + 1, dim_emb), dtype=theano.config.floatX)
+    emb[:len(rows)] = emb_matrix[rows]
+    if vocab_word.has_key(UNK):
+        emb = emb[:len(rows)]
+    else:
+        emb[len(rows)] = get_mean_emb(emb_matrix)
+    vocab_word.add_word(UNK)
+
+    assert emb.shape[0] == vocab_word.size(), 'emb: %d  vocab: %d' % (emb.shape[0], vocab_word.size())
+    return vocab_word, emb
+
+
+def get_binary_emb_fns(fn, dim_emb):
+    prefix = '%s.dim-%d' % (fn, dim_emb)
+    return prefix + '.f32', prefix + '.vocab'
+
+
+def convert_init_emb(fn, dim_emb):
+    """
+    Write the text embeddings as a binary float32 matrix (one row per word) and its vocabulary.
+    The matrix is written under a temporary name, so an existing matrix file is always complete.
+    """
+    matrix_fn, vocab_fn = get_binary_emb_fns(fn, dim_emb)
+    tmp_fn = matrix_fn + '.tmp'
+    vocab_word = Vocab()
+
+    with open(fn) as lines, open(tmp_fn, 'wb') as fout:
         for line in lines:
             line = line.strip().decode('utf-8').split()
             if len(line[1:]) != dim_emb or vocab_word.has_key(line[0]):
                 continue
             vocab_word.add_word(line[0])
-            emb.append(line[1:])
-
-    emb = set_unk(vocab_word, emb)
-    emb = np.asarray(emb, dtype=theano.config.floatX)
-    vocab_word.add_word(UNK)
+            np.asarray(line[1:], dtype='float32').tofile(fout)
 
-    assert emb.shape[0] == vocab_word.size(), 'emb: %d  vocab: %d' % (emb.shape[0], vocab_word.size())
-    return vocab_word, emb
+    vocab_word.save(vocab_fn)
+    os.rename(tmp_fn, matrix_fn)
 
 
-def set_unk(vocab_word, emb):
-    if vocab_word.has_key(UNK):
-        return emb
-    unk = list(np.mean(np.asarray(emb, dtype=theano.config.floatX), 0))
-    emb.append(unk)
-    return emb
+def get_mean_emb(emb_matrix, chunk_size=65536):
+    """
+    :param emb_matrix: 1D: n_words, 2D: dim_emb; read chunk by chunk (e.g., np.memmap)
+    """
+    total = np.zeros(emb_matrix.shape[1], dtype='float64')
+    for i in xrange(0, emb_matrix.shape[0], chunk_size):
+        total += np.sum(emb_matrix[i: i + chunk_size], axis=0, dtype='float64')
+    return total / max(emb_matrix.shape[0], 1)
 
 
 def move_data(src, dst):
@@ -173,6 +289,99 @@ def move_data(src, dst):
     shutil.move(src, dst)
 
 
+def create_dir(dn):
+    if dn and not os.path.exists(dn):
+        os.makedirs(dn)
+
+
+class BulkWriter(object):
+    """
+    Text file writer for many small records.
+    The records are buffered in a list and written as one encoded block every buffer_size characters.
+    The file is written under a temporary name in the destination directory and renamed when closed,
+    so the destination never holds a partial file.
+    With compress, the blocks are gzipped in another thread while the records are formatted.
+    """
+
+    def __init__(self, path, compress=False, buffer_size=2 ** 20, encoding='utf-8'):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.records = []
+        self.n_chars = 0
+
+        create_dir(os.path.dirname(path))
+        self.fout = open(self.tmp_path, 'wb', buffer_size)
+        self.queue = None
+        self.thread = None
+        self.error = None
+        if compress:
+            self.queue = Queue.Queue(maxsize=8)
+            self.thread = threading.Thread(target=self._compress, args=(gzip.GzipFile(fileobj=self.fout, mode='wb'),))
+            self.thread.daemon = True
+            self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, record):
+        self.records.append(record)
+        self.n_chars += len(record)
+        if self.n_chars >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        block = u''.join(self.records).encode(self.encoding)
+        self.records = []
+        self.n_chars = 0
+        if self.queue is not None:
+            self.queue.put(block)
+        else:
+            self.fout.write(block)
+
+    def _compress(self, gzip_file):
+        block = self.queue.get()
+        try:
+            while block is not None:
+                gzip_file.write(block)
+                block = self.queue.get()
+            gzip_file.close()
+        except Exception as e:
+            self.error = e
+            # keep taking the blocks, so that the writing thread is not blocked on the full queue
+            while block is not None:
+                block = self.queue.get()
+
+    def close(self):
+        self.flush()
+        self._close_file()
+        os.rename(self.tmp_path, self.path)
+
+    def abort(self):
+        self.records = []
+        try:
+            self._close_file()
+        finally:
+            os.remove(self.tmp_path)
+
+    def _close_file(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+        self.fout.close()
+        if self.error is not None:
+            raise self.error
+
+
 def dump_data(data, fn):
     if not fn.endswith(".pkl.gz"):
         fn += ".gz" if fn.endswith(".pkl") else ".pkl.gz"
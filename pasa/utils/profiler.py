@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from io_utils import say
+
+
+class Profiler(object):
+    """
+    Named timers and counters of a run.
+    Nothing is measured until enable() is called; the functions wrapped by timed() before that are not wrapped.
+    The timers may nest, e.g. create_batches within create_samples, so their times do not add up to the run time.
+    Only the process which enabled the profiler records; the calls in forked workers, e.g. grad_step of
+    --parallel, are not included, and the workers do not write into the inherited trace file.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.pid = None
+        self.theano_profile = False
+        self.start_time = time.time()
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counts = defaultdict(int)
+        self.trace = None
+
+    def enable(self, trace_fn=None, theano_profile=False):
+        """
+        :param trace_fn: write one JSON line per timed call into this file
+        :param theano_profile: compile the theano functions with profile, whose stats theano shows at exit
+        """
+        self.enabled = True
+        self.pid = os.getpid()
+        self.theano_profile = theano_profile
+        self.start_time = time.time()
+        if trace_fn:
+            self.trace = open(trace_fn, 'w')
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_time(name, start, time.time())
+
+    def timed(self, name, f):
+        """
+        :return: f, which adds the time of each call to the timer of the name
+        """
+        if not self.enabled:
+            return f
+
+        def timed_f(*args):
+            start = time.time()
+            try:
+                return f(*args)
+            finally:
+                self.add_time(name, start, time.time())
+        return timed_f
+
+    def add_time(self, name, start, end):
+        if os.getpid() != self.pid:
+            return
+        self.seconds[name] += end - start
+        self.calls[name] += 1
+        if self.trace is not None:
+            self.trace.write(json.dumps({'name': name, 'start': start - self.start_time, 'sec': end - start}) + '\n')
+
+    def count(self, name, n=1):
+        if self.enabled and os.getpid() == self.pid:
+            self.counts[name] += n
+
+    def get_theano_profile(self, name):
+        """
+        :return: the profile argument of theano.function; None or the name shown in the stats of the function
+        """
+        return name if self.theano_profile else None
+
+    def show_summary(self):
+        if not self.enabled:
+            return
+        total = time.time() - self.start_time
+        say('\n\nPROFILE (%.1f sec)\n' % total)
+        say('\t{:<20}{:>10}{:>12}{:>12}{:>8}\n'.format('TIMER', 'CALLS', 'SEC', 'MSEC/CALL', '%'))
+        for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            say('\t{:<20}{:>10d}{:>12.2f}{:>12.3f}{:>8.1%}\n'.format(name, calls, seconds, 1000. * seconds / calls,
+                                                                   seconds / total))
+        for name, count in sorted(self.counts.items()):
+            say('\t{:<20}{:>10d}\n'.format(name, count))
+
+        if self.trace is not None:
+            self.trace.write(json.dumps({'name': 'summary', 'sec': total,
+                                         'timers': dict((name, [self.calls[name], seconds])
+                                                        for name, seconds in self.seconds.items()),
+                                         'counts': self.counts}) + '\n')
+            self.trace.close()
+            self.trace = None
+
+
+# the profiler of this process
+PROFILER = Profiler()